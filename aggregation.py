@@ -0,0 +1,100 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Readings aggregation package.
+    Reduces any number of readings to count, min, max, mean and standard deviation in constant memory.
+********************************************************************************************************************'''
+
+from collections import namedtuple
+from threading import Lock
+
+import math
+
+# Statistics of channel readings over aggregation window
+ChannelStats = namedtuple('ChannelStats', 'count min max mean std')
+
+class RunningStats(object):
+    """
+    Streaming statistics of a series of readings.
+
+    Mean and variance are updated with Welford algorithm, which is numerically stable,
+    so no readings are kept and precision does not degrade with their number.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forgets all readings."""
+        self.count = 0
+        self.mean = 0.0
+        self.min = None
+        self.max = None
+        self._squares = 0.0
+
+    def add(self, value):
+        """Adds reading."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._squares += delta * (value - self.mean)
+
+        if self.min is None or value < self.min:
+            self.min = value
+
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def variance(self):
+        """Returns population variance of readings, 0 if there are less than two of them."""
+        return self._squares / self.count if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        """Returns population standard deviation of readings."""
+        return math.sqrt(self.variance)
+
+    def stats(self):
+        """Returns ChannelStats of readings, None if there are none."""
+        if not self.count:
+            return None
+
+        return ChannelStats(self.count, self.min, self.max, self.mean, self.std)
+
+class WindowAggregator(object):
+    """
+    Aggregates readings of several channels until collected, then starts a new window.
+
+    Every consumer (upload, log) has its own aggregator, so each gets statistics of its own interval.
+    """
+
+    def __init__(self, channels):
+        self._stats = dict((channel, RunningStats()) for channel in channels)
+        self._lock = Lock()
+
+    def add(self, values):
+        """Adds readings from dictionary of channel to value, None values and unknown channels are skipped."""
+        with self._lock:
+            for channel, value in values.items():
+                if value is not None and channel in self._stats:
+                    self._stats[channel].add(value)
+
+    def collect(self):
+        """
+        Closes current window and starts a new one.
+
+        Returns:
+            dict: channel to ChannelStats, for channels which got readings in the window
+        """
+        result = {}
+
+        with self._lock:
+            for channel, channel_stats in self._stats.items():
+                if channel_stats.count:
+                    result[channel] = channel_stats.stats()
+                    channel_stats.reset()
+
+        return result
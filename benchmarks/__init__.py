@@ -0,0 +1 @@
+"""Weather Station Benchmarks Package."""
\ No newline at end of file
@@ -0,0 +1,52 @@
+#!/usr/bin/python
+
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Compares per-call latency of CPU temperature sources.
+    Run on the station itself: python benchmarks/cpu_temperature_benchmark.py [calls]
+********************************************************************************************************************'''
+
+from __future__ import print_function
+from timeit import default_timer
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cpu_temperature import CachedCpuTemperature, SysfsCpuTemperature, VcgencmdCpuTemperature
+
+def measure(source, calls):
+    """Returns average seconds per source.read() call."""
+    start = default_timer()
+
+    for _ in range(calls):
+        source.read()
+
+    return (default_timer() - start) / calls
+
+def available_sources(cache_ttl=1):
+    """Yields every CPU temperature source which can be created on this machine."""
+    for factory in (SysfsCpuTemperature, VcgencmdCpuTemperature):
+        try:
+            source = factory()
+            source.read()
+        except (IOError, OSError, ValueError):
+            print('Skipping unavailable source:', factory.__name__)
+            continue
+
+        yield source
+
+        # Cached source gets its own source, as the one measured above is closed after measuring
+        yield CachedCpuTemperature(factory(), cache_ttl)
+
+def main(calls):
+    for source in available_sources():
+        print('%-20s %10.1f us per call' % (source.source_name, measure(source, calls) * 1e6))
+        source.close()
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,329 @@
+#!/usr/bin/python
+
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Times station hot paths (sensors reading, visual styles, upload payload, plugins calculations and parsing)
+    and compares results with stored baseline, so performance regressions are caught before deployment.
+    Sensors are read from simulated Sense HAT, so benchmarks run on any machine.
+    Committed baseline.json is recorded on a development machine, re-save it on the station to compare like with like.
+
+    Examples:
+        python benchmarks/run_benchmarks.py --save-baseline
+        python benchmarks/run_benchmarks.py --threshold 0.1
+        python benchmarks/run_benchmarks.py --filter visual_styles
+********************************************************************************************************************'''
+
+from __future__ import print_function
+from collections import OrderedDict
+from itertools import cycle
+from timeit import Timer
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Benchmark name to setup function, which prepares state and returns callable to be timed
+BENCHMARKS = OrderedDict()
+
+# Fixed time of simulated readings and observations, so every run does the same work
+BENCHMARK_TIME = 1500000000
+
+# Fixed moment solar radiation is checked at, 2017-07-14 12:30 UTC, when the sun is up in London
+SOLAR_CHECK_TIME = 1500035400
+
+# Values cycled through by display benchmarks, including negative and more than 2 digits ones
+DISPLAY_VALUES = (23.6, 24.1, -5.4, 0, 99.5, 101.3, 45.0, 64.7)
+
+DYSON_SENSORS_MESSAGE = json.dumps({
+    'msg': 'ENVIRONMENTAL-CURRENT-SENSOR-DATA',
+    'time': '2017-09-14T09:12:37.000Z',
+    'data': {'tact': '2956', 'hact': '0052', 'pact': '0003', 'vact': '0004', 'sltm': 'OFF'}
+})
+
+DYSON_STATE_MESSAGE = json.dumps({
+    'msg': 'STATE-CHANGE',
+    'time': '2017-09-14T09:12:37.000Z',
+    'mode-reason': 'LAPP',
+    'product-state': {
+        'fmod': ['OFF', 'FAN'], 'fnst': ['OFF', 'FAN'], 'fnsp': ['AUTO', '0004'], 'qtar': ['0003', '0003'],
+        'oson': ['OFF', 'ON'], 'rhtm': ['ON', 'ON'], 'filf': ['2209', '2209'], 'ercd': ['NONE', 'NONE'],
+        'nmod': ['OFF', 'OFF'], 'wacd': ['NONE', 'NONE']
+    }
+})
+
+def benchmark(name):
+    """Registers benchmark setup function under given name."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+def create_station():
+    """Creates station reading simulated Sense HAT and CPU temperature at fixed time."""
+    from clock import VirtualClock
+    from simulation import SimulatedCpuTemperature, SimulatedSenseHat, SyntheticTrace
+    from weather_station import WeatherStation
+
+    clock = VirtualClock(BENCHMARK_TIME)
+    trace = SyntheticTrace(seed=1)
+
+    return WeatherStation(clock, SimulatedSenseHat(clock, trace), SimulatedCpuTemperature(clock, trace))
+
+@benchmark('station.get_sensors_data')
+def get_sensors_data():
+    return create_station().get_sensors_data
+
+@benchmark('station.build_weather_data')
+def build_weather_data():
+    from sampler import SensorsSnapshot
+
+    station = create_station()
+    snapshot = SensorsSnapshot(BENCHMARK_TIME, 23.6, 74.5, 48.0, 29.9, 51.5, {})
+
+    return lambda: station.build_weather_data(snapshot)
+
+@benchmark('upload.build_url')
+def build_url():
+    from config import Config
+    from upload_queue import UploadSender
+
+    sender = UploadSender(None, Config.WU_URL, 'STATION_ID', 'STATION_KEY', 1, 60)
+    data = {'tempf': 74.5, 'humidity': 48.0, 'baromin': 29.9, 'dewptf': 53.2, 'solarradiation': 812.4}
+
+    return lambda: sender.build_url(BENCHMARK_TIME, data)
+
+def visual_style_benchmark(style_class):
+    """Returns setup function for visual style benchmark."""
+    def setup():
+        from config import Config
+
+        style = style_class(Config.TEMP_POSITIVE, Config.TEMP_NEGATIVE)
+        values = cycle(DISPLAY_VALUES)
+
+        return lambda: style.apply_style(next(values))
+
+    return setup
+
+def weather_entity_benchmark(entity_class):
+    """Returns setup function for weather entity benchmark, going through all entity visual styles."""
+    def setup():
+        entity = entity_class()
+        values = cycle(DISPLAY_VALUES)
+
+        def show_pixels():
+            # Switches entity to its next visual style
+            entity.next_item
+            return entity.show_pixels(next(values))
+
+        return show_pixels
+
+    return setup
+
+def register_display_benchmarks():
+    """Registers benchmark for every visual style and weather entity."""
+    import visual_styles
+    import weather_entities
+
+    for style_class in (visual_styles.NumericStyle, visual_styles.ArrowStyle, visual_styles.SquareStyle):
+        benchmark('visual_styles.{}.apply_style'.format(style_class.__name__))(visual_style_benchmark(style_class))
+
+    for entity_class in (weather_entities.TemperatureEntity, weather_entities.HumidityEntity, weather_entities.PressureEntity):
+        benchmark('weather_entities.{}.show_pixels'.format(entity_class.__name__))(weather_entity_benchmark(entity_class))
+
+@benchmark('framebuffer.Rgb565Packer.pack')
+def pack_frame():
+    from config import Config
+    from framebuffer import Rgb565Packer
+    from visual_styles import FrameTable
+
+    packer = Rgb565Packer()
+    frames = cycle(FrameTable.get(Config.TEMP_POSITIVE, Config.TEMP_NEGATIVE).numbers[0])
+    rotations = cycle((0, 90, 180, 270))
+
+    return lambda: packer.pack(next(frames), next(rotations))
+
+@benchmark('solar_radiation.calcluate_solar_radiation')
+def calcluate_solar_radiation():
+    from plugins.solar_radiation import SolarRadiation
+
+    plugin = SolarRadiation()
+    plugin.config = {'LATITUDE': 51.5074, 'LONGITUDE': -0.1278, 'TIME_ZONE': 'Europe/London'}
+
+    # Noon of today, so sunrise and sunset are calculated once and the sun is up
+    noon = plugin.current_date.replace(hour=12, minute=30, second=0, microsecond=0)
+
+    return lambda: plugin.calcluate_solar_radiation(noon)
+
+@benchmark('solar_radiation.clear_sky_radiation')
+def clear_sky_radiation():
+    import pytz
+    from plugins.solar_radiation import SolarRadiation, clear_sky_radiation
+
+    plugin = SolarRadiation()
+    plugin.config = {'LATITUDE': 51.5074, 'LONGITUDE': -0.1278, 'TIME_ZONE': 'Europe/London'}
+
+    # Batch and scalar calculation use the same model, so they should agree while the sun is well above horizon
+    for timestamp in (SOLAR_CHECK_TIME, SOLAR_CHECK_TIME - 4 * 3600, SOLAR_CHECK_TIME + 4 * 3600):
+        date = datetime.datetime.fromtimestamp(timestamp, pytz.utc).astimezone(plugin.timezone)
+        scalar = plugin.calcluate_solar_radiation(date)
+        batch = clear_sky_radiation([timestamp], plugin.latitude, plugin.config['LONGITUDE'])[0]
+
+        if abs(scalar - batch) > 1E-6:
+            raise AssertionError('Scalar solar radiation %s differs from batch %s at %s' % (scalar, batch, date))
+
+    # Every minute of a day for 10 stations
+    timestamps = [SOLAR_CHECK_TIME + minute * 60 for minute in range(-720, 720)]
+    latitudes = [[latitude] for latitude in range(0, 60, 6)]
+
+    return lambda: clear_sky_radiation(timestamps, latitudes, 0)
+
+@benchmark('dyson_pure_link.SensorsData')
+def parse_sensors_data():
+    from plugins.dyson_pure_link import SensorsData
+
+    return lambda: SensorsData(json.loads(DYSON_SENSORS_MESSAGE))
+
+@benchmark('dyson_pure_link.StateData')
+def parse_state_data():
+    from plugins.dyson_pure_link import StateData
+
+    return lambda: StateData(json.loads(DYSON_STATE_MESSAGE))
+
+def measure(function, repeat=5, min_time=0.2):
+    """
+    Times function, calls number is doubled until single run takes at least min_time.
+
+    Returns:
+        float: best seconds per call of all runs
+    """
+    timer = Timer(function)
+    number = 1
+
+    while timer.timeit(number) < min_time:
+        number *= 2
+
+    return min(timer.repeat(repeat, number)) / number
+
+def load_baseline(path):
+    """Returns stored baseline, or None if there is no baseline file."""
+    if not os.path.isfile(path):
+        return None
+
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+def save_baseline(path, results):
+    """Stores results as baseline, results of benchmarks which were not run are kept."""
+    baseline = load_baseline(path) or {'results': {}}
+    baseline['results'].update(results)
+    baseline.update({
+        'created': datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+        'machine': platform.machine(),
+        'python': platform.python_version()
+    })
+
+    with open(path, 'w') as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+
+def run(names, repeat, min_time):
+    """
+    Runs given benchmarks, station console output is hidden.
+
+    Returns:
+        OrderedDict: seconds per call by benchmark name, benchmarks with missing dependencies are skipped
+    """
+    results = OrderedDict()
+    stdout = sys.stdout
+
+    with open(os.devnull, 'w') as devnull:
+        for name in names:
+            sys.stdout = devnull
+
+            try:
+                results[name] = measure(BENCHMARKS[name](), repeat, min_time)
+            except ImportError as error:
+                sys.stdout = stdout
+                print('%-55s skipped: %s' % (name, error))
+            finally:
+                sys.stdout = stdout
+
+    return results
+
+def compare(results, baseline, threshold):
+    """
+    Prints results next to baseline values.
+
+    Returns:
+        list: names of benchmarks slower than baseline by more than threshold
+    """
+    baseline_results = baseline['results'] if baseline else {}
+    regressions = []
+
+    for name, seconds in results.items():
+        if name not in baseline_results:
+            print('%-55s %10.2f us' % (name, seconds * 1e6))
+            continue
+
+        change = seconds / baseline_results[name] - 1
+        regressed = change > threshold
+
+        if regressed:
+            regressions.append(name)
+
+        print('%-55s %10.2f us %10.2f us %+7.1f%%%s' % (
+            name, seconds * 1e6, baseline_results[name] * 1e6, change * 100, '  REGRESSION' if regressed else ''))
+
+    return regressions
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Benchmarks Weather Station hot paths and compares them with baseline.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help='baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='store results as new baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown against baseline, 0.2 is 20%%')
+    parser.add_argument('--filter', default='', help='run only benchmarks which names contain given text')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs of each benchmark, the best one is used')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds single timed run takes at least')
+
+    return parser.parse_args()
+
+def main():
+    arguments = parse_arguments()
+    register_display_benchmarks()
+
+    names = [name for name in BENCHMARKS if arguments.filter in name]
+    results = run(names, arguments.repeat, arguments.min_time)
+
+    if arguments.save_baseline:
+        compare(results, None, arguments.threshold)
+        save_baseline(arguments.baseline, results)
+        print('Baseline saved to', arguments.baseline)
+        return 0
+
+    baseline = load_baseline(arguments.baseline)
+
+    if not baseline:
+        print('No baseline found at %s, use --save-baseline to store one' % arguments.baseline)
+    elif baseline.get('machine') != platform.machine():
+        print('Baseline was recorded on %s, results may not be comparable' % baseline.get('machine'))
+
+    regressions = compare(results, baseline, arguments.threshold)
+
+    if regressions:
+        print('%s benchmarks regressed by more than %.0f%%' % (len(regressions), arguments.threshold * 100))
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Clocks package.
+********************************************************************************************************************'''
+
+from threading import Lock
+
+import os
+import time
+
+# Linux clock id, not affected by system time changes, e.g. NTP steps on a Pi without real time clock
+CLOCK_MONOTONIC = 1
+
+def _libc_monotonic():
+    """Internal. Returns function reading CLOCK_MONOTONIC through ctypes, None if C library does not provide it."""
+    try:
+        import ctypes
+        import ctypes.util
+    except ImportError:
+        return None
+
+    class Timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+    for name in ('c', 'rt'):
+        path = ctypes.util.find_library(name)
+
+        try:
+            clock_gettime = ctypes.CDLL(path, use_errno=True).clock_gettime if path else None
+        except (AttributeError, OSError):
+            clock_gettime = None
+
+        if clock_gettime:
+            break
+    else:
+        return None
+
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(Timespec)]
+
+    def libc_monotonic():
+        timespec = Timespec()
+
+        if clock_gettime(CLOCK_MONOTONIC, ctypes.byref(timespec)) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        return timespec.tv_sec + timespec.tv_nsec * 1e-9
+
+    try:
+        libc_monotonic()
+    except OSError:
+        return None
+
+    return libc_monotonic
+
+# Python 2 has no time.monotonic, C library one is used there, wall clock only if there is none
+monotonic = getattr(time, 'monotonic', None) or _libc_monotonic() or time.time
+
+class SystemClock(object):
+    """Real time clock, used by station by default."""
+
+    # Background threads can wait on the clock
+    realtime = True
+
+    def time(self):
+        """Returns current UNIX timestamp."""
+        return time.time()
+
+    def monotonic(self):
+        """Returns monotonic clock seconds."""
+        return monotonic()
+
+    def sleep(self, seconds):
+        """Sleeps given seconds."""
+        time.sleep(seconds)
+
+    def wait(self, condition, timeout):
+        """Waits on acquired condition for notification or timeout."""
+        condition.wait(timeout)
+
+class VirtualClock(object):
+    """
+    Clock which time moves only when someone waits or sleeps on it.
+
+    Waiting returns immediately with time advanced by timeout, so hours of station run
+    take as long as the work done in between. Intended for single threaded simulation.
+    """
+
+    realtime = False
+
+    def __init__(self, start_time=None):
+        self._start_time = time.time() if start_time is None else start_time
+        self._elapsed = 0.0
+        self._lock = Lock()
+
+    def time(self):
+        return self._start_time + self._elapsed
+
+    def monotonic(self):
+        return self._elapsed
+
+    def advance(self, seconds):
+        """Moves time forward by given seconds."""
+        with self._lock:
+            self._elapsed += max(seconds, 0)
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def wait(self, condition, timeout):
+        if timeout is None:
+            raise RuntimeError('Virtual clock would wait forever, nothing is scheduled')
+
+        self.advance(timeout)
@@ -0,0 +1,618 @@
+#!/usr/bin/python
+
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Snapshots collector package.
+    Stations push snapshots over HTTP or UDP, collector drops retransmits, writes snapshots into
+    shared SQLite store in batches and forwards them to upstream service in bulk.
+
+    Examples:
+        python collector.py --http-port 8700 --udp-port 8701 --upstream http://upstream.example.com/snapshots
+        python collector.py --stand-in-upstream
+********************************************************************************************************************'''
+
+from __future__ import print_function
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from collections import OrderedDict, namedtuple
+from Queue import Empty, Full, Queue
+from SocketServer import BaseRequestHandler, ThreadingMixIn, UDPServer
+from threading import Event, Lock, Thread
+
+import argparse
+import json
+import logging
+import random
+import socket
+import sqlite3
+import time
+import urllib2
+
+# Single snapshot of a station, data is snapshot fields dictionary
+CollectedSnapshot = namedtuple('CollectedSnapshot', 'station timestamp data')
+
+def encode_snapshot(station, snapshot):
+    """Returns JSON message for SensorsSnapshot pushed by station."""
+    return json.dumps({'station': station, 'timestamp': snapshot.timestamp, 'data': snapshot._asdict()})
+
+def decode_snapshots(payload):
+    """
+    Parses JSON message with one snapshot object or list of them.
+
+    Returns:
+        list: CollectedSnapshot values
+
+    Raises:
+        ValueError: if payload is not valid snapshots message
+    """
+    messages = json.loads(payload)
+
+    if isinstance(messages, dict):
+        messages = [messages]
+
+    try:
+        return [CollectedSnapshot(str(message['station']), float(message['timestamp']), message['data'])
+            for message in messages]
+    except (KeyError, TypeError) as error:
+        raise ValueError('Invalid snapshot message: {}'.format(error))
+
+class DedupCache(object):
+    """
+    Bounded LRU set of recently seen keys.
+
+    Stations retransmit snapshots which were not acknowledged (or just in case over UDP),
+    cache remembers enough recent stored keys to drop them without touching the store.
+    """
+
+    def __init__(self, capacity):
+        self._capacity = capacity
+        self._keys = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        """Returns True if key was seen recently."""
+        with self._lock:
+            if key not in self._keys:
+                return False
+
+            # Refresh key, so steadily retransmitted one is not evicted
+            del self._keys[key]
+            self._keys[key] = None
+            return True
+
+    def add(self, key):
+        """Remembers key, the oldest one is forgotten if cache is full."""
+        with self._lock:
+            self._keys[key] = None
+
+            if len(self._keys) > self._capacity:
+                self._keys.popitem(last=False)
+
+class SnapshotStore(object):
+    """
+    Shared SQLite store of collected snapshots.
+
+    Snapshot is unique by station and timestamp, so retransmits which got past dedup cache
+    (e.g. after collector restart) are ignored by the store itself.
+    """
+
+    def __init__(self, path):
+        self._lock = Lock()
+
+        # Connection is shared by collector worker and stats readers, access is serialized with lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS snapshots (id INTEGER PRIMARY KEY AUTOINCREMENT, station TEXT, timestamp REAL, '
+            'data TEXT, forwarded INTEGER DEFAULT 0, UNIQUE (station, timestamp))')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS snapshots_forwarded ON snapshots (forwarded, id)')
+        self._connection.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0]
+
+    def write(self, snapshots):
+        """
+        Writes snapshots in one transaction.
+
+        Returns:
+            int: number of snapshots stored, duplicates are not counted
+        """
+        with self._lock:
+            before = self._connection.total_changes
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO snapshots (station, timestamp, data) VALUES (?, ?, ?)',
+                [(snapshot.station, snapshot.timestamp, json.dumps(snapshot.data)) for snapshot in snapshots])
+            self._connection.commit()
+
+            return self._connection.total_changes - before
+
+    def pending(self, limit):
+        """Returns list of the oldest (id, CollectedSnapshot) not forwarded yet."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT id, station, timestamp, data FROM snapshots WHERE forwarded = 0 ORDER BY id LIMIT ?',
+                (limit, )).fetchall()
+
+        return [(row_id, CollectedSnapshot(station, timestamp, json.loads(data))) for row_id, station, timestamp, data in rows]
+
+    def mark_forwarded(self, row_ids):
+        """Marks snapshots as forwarded to upstream."""
+        with self._lock:
+            self._connection.executemany('UPDATE snapshots SET forwarded = 1 WHERE id = ?', [(row_id, ) for row_id in row_ids])
+            self._connection.commit()
+
+    def close(self):
+        """Closes underlying database."""
+        with self._lock:
+            self._connection.close()
+
+class HttpForwarder(object):
+    """Posts batches of snapshots to upstream service as one JSON list."""
+
+    def __init__(self, url, timeout=30):
+        self._url = url
+        self._timeout = timeout
+
+    def forward(self, snapshots):
+        """Sends snapshots, raises exception if upstream did not accept them."""
+        payload = json.dumps([snapshot._asdict() for snapshot in snapshots])
+        request = urllib2.Request(self._url, payload, {'Content-Type': 'application/json'})
+
+        response = urllib2.urlopen(request, timeout=self._timeout)
+        response.read()
+        response.close()
+
+class Collector(object):
+    """
+    Accepts snapshots from receivers, stores and forwards them in batches from a single worker thread.
+
+    Submitting only appends to in-memory batch, so receivers are never blocked by disk or upstream.
+    Batch is written when it reaches batch size or flush interval expires, then stored snapshots
+    which were not forwarded yet are sent upstream, failed forwarding is retried on the next flush.
+    Snapshots are remembered as seen only once they are stored, batch which could not be written is
+    kept for the next flush, up to max batch snapshots, the oldest ones are dropped beyond that.
+    """
+
+    def __init__(self, store, forwarder=None, batch_size=500, flush_interval=1, forward_batch_size=1000, dedup_size=100000,
+            max_batch=100000):
+        self._store = store
+        self._forwarder = forwarder
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._forward_batch_size = forward_batch_size
+        self._max_batch = max_batch
+        self._dedup = DedupCache(dedup_size)
+        self._batch = []
+
+        # Keys of snapshots in batch, so their retransmits are dropped before batch is stored
+        self._batch_keys = set()
+        self._lock = Lock()
+        self._wake = Event()
+        self._stopped = Event()
+        self._thread = None
+
+        # Collector statistics
+        self.received = 0
+        self.duplicates = 0
+        self.stored = 0
+        self.dropped = 0
+        self.write_failures = 0
+        self.forwarded = 0
+        self.forward_failures = 0
+
+    @property
+    def stats(self):
+        """Returns dictionary of collector counters."""
+        return {
+            'received': self.received,
+            'duplicates': self.duplicates,
+            'stored': self.stored,
+            'dropped': self.dropped,
+            'write_failures': self.write_failures,
+            'forwarded': self.forwarded,
+            'forward_failures': self.forward_failures
+        }
+
+    def submit(self, snapshots):
+        """Adds snapshots to the current batch, retransmitted ones are dropped."""
+        with self._lock:
+            fresh = 0
+
+            for snapshot in snapshots:
+                key = (snapshot.station, snapshot.timestamp)
+
+                if key not in self._batch_keys and key not in self._dedup:
+                    self._batch_keys.add(key)
+                    self._batch.append(snapshot)
+                    fresh += 1
+
+            self.received += len(snapshots)
+            self.duplicates += len(snapshots) - fresh
+            self._limit_batch()
+            full = len(self._batch) >= self._batch_size
+
+        if full:
+            self._wake.set()
+
+    def start(self):
+        """Starts worker thread."""
+        self._thread = Thread(target=self._run, name='Collector')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops worker thread, after it stores the last batch."""
+        self._stopped.set()
+        self._wake.set()
+
+        if self._thread:
+            self._thread.join()
+
+    def flush(self):
+        """Writes current batch to store and forwards pending snapshots upstream."""
+        with self._lock:
+            batch, self._batch = self._batch, []
+
+        if batch:
+            try:
+                stored = self._store.write(batch)
+            except:
+                # Batch goes back before snapshots submitted meanwhile, so it is written on the next flush
+                with self._lock:
+                    self._batch[:0] = batch
+                    self.write_failures += 1
+                    self._limit_batch()
+
+                raise
+
+            with self._lock:
+                self.stored += stored
+
+                for snapshot in batch:
+                    key = (snapshot.station, snapshot.timestamp)
+                    self._batch_keys.discard(key)
+                    self._dedup.add(key)
+
+        if self._forwarder:
+            self._forward_pending()
+
+    def _limit_batch(self):
+        """Internal. Drops the oldest snapshots beyond max batch, called with lock acquired."""
+        excess = len(self._batch) - self._max_batch
+
+        if excess > 0:
+            for snapshot in self._batch[:excess]:
+                self._batch_keys.discard((snapshot.station, snapshot.timestamp))
+
+            del self._batch[:excess]
+            self.dropped += excess
+
+    def _forward_pending(self):
+        """Internal. Forwards not forwarded snapshots in bulk, until store has none or upstream fails."""
+        while True:
+            pending = self._store.pending(self._forward_batch_size)
+
+            if not pending:
+                return
+
+            try:
+                self._forwarder.forward([snapshot for _, snapshot in pending])
+            except:
+                self.forward_failures += 1
+                logging.warning('Could not forward %s snapshots upstream', len(pending), exc_info=True)
+                return
+
+            self._store.mark_forwarded([row_id for row_id, _ in pending])
+            self.forwarded += len(pending)
+
+    def _run(self):
+        """Internal. Flushes batches until stopped."""
+        while not self._stopped.is_set():
+            self._wake.wait(self._flush_interval)
+            self._wake.clear()
+
+            try:
+                self.flush()
+            except:
+                logging.warning('Unexpected error occured while flushing snapshots', exc_info=True)
+
+                # Full batch wakes worker at once, failing store is not retried more often than flush interval
+                self._stopped.wait(self._flush_interval)
+
+        self.flush()
+
+class CollectorHttpHandler(BaseHTTPRequestHandler):
+    """Accepts POST of snapshot message, answers 202 after snapshots are queued."""
+
+    def do_POST(self):
+        try:
+            payload = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.server.collector.submit(decode_snapshots(payload))
+        except ValueError as error:
+            self.send_error(400, str(error))
+            return
+
+        self.send_response(202)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        # Every station pushes every few seconds, access log would be huge
+        pass
+
+class CollectorHttpServer(ThreadingMixIn, HTTPServer):
+    """HTTP receiver, every connection is handled in its own thread."""
+    daemon_threads = True
+
+    def __init__(self, address, collector):
+        HTTPServer.__init__(self, address, CollectorHttpHandler)
+        self.collector = collector
+
+class CollectorUdpHandler(BaseRequestHandler):
+    """Accepts datagram with snapshot message, invalid datagrams are dropped."""
+
+    def handle(self):
+        try:
+            self.server.collector.submit(decode_snapshots(self.request[0]))
+        except ValueError:
+            logging.warning('Dropped invalid datagram from %s', self.client_address[0])
+
+class CollectorUdpServer(UDPServer):
+    """
+    UDP receiver, datagrams are handled one by one in server thread.
+
+    Handling is only parsing and appending to batch, so a thread per datagram would cost more than it saves.
+    """
+
+    # Bigger receive buffer absorbs bursts of many stations pushing on the same interval boundary
+    RECEIVE_BUFFER_SIZE = 4 * 1024 * 1024
+
+    def __init__(self, address, collector):
+        UDPServer.__init__(self, address, CollectorUdpHandler)
+        self.collector = collector
+
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.RECEIVE_BUFFER_SIZE)
+        UDPServer.server_bind(self)
+
+class StandInUpstreamHandler(BaseHTTPRequestHandler):
+    """Accepts bulk snapshots like upstream service would, failing some requests if configured to."""
+
+    def do_POST(self):
+        payload = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        if random.random() < self.server.failure_rate:
+            self.send_error(503)
+            return
+
+        self.server.batches.append(json.loads(payload))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+class StandInUpstream(ThreadingMixIn, HTTPServer):
+    """
+    Local replacement of upstream service for testing, keeps received batches in memory.
+
+    Args:
+        address (tuple): host and port to listen on, port 0 picks a free one
+        failure_rate (float): share of requests answered with 503
+    """
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), failure_rate=0.0):
+        HTTPServer.__init__(self, address, StandInUpstreamHandler)
+        self.failure_rate = failure_rate
+        self.batches = []
+
+    @property
+    def url(self):
+        """Returns URL collector should forward to."""
+        return 'http://{0}:{1}/snapshots'.format(*self.server_address)
+
+    @property
+    def received(self):
+        """Returns number of snapshots received."""
+        return sum(len(batch) for batch in self.batches)
+
+class CollectorClient(object):
+    """
+    Pushes station snapshots to collector, subscribed to station sampler.
+
+    UDP datagram is sent right away, it costs less than a sensor read. Every snapshot is sent
+    repeat times, duplicates are dropped by collector. Collector host is resolved in a background
+    thread and datagrams go to the cached address, so sampling never waits for DNS, snapshots pushed
+    while host is not resolved yet are dropped. HTTP requests are sent from a background thread,
+    failed request is retried, so sampling is never blocked by network.
+    """
+
+    # Snapshots waiting for HTTP push, the oldest are dropped when collector is unreachable for long
+    QUEUE_SIZE = 1000
+
+    # In seconds, wait after failed HTTP push or host resolution before retry
+    RETRY_INTERVAL = 10
+
+    # In seconds, UDP collector host is resolved again, so its address change is picked up
+    RESOLVE_INTERVAL = 300
+
+    def __init__(self, host, port, station, protocol='udp', repeat=1):
+        self._address = (host, port)
+        self._station = station
+        self._protocol = protocol
+        self._repeat = repeat
+        self._socket = None
+        self._queue = None
+        self._resolved_address = None
+        self._stopped = Event()
+
+        if protocol == 'udp':
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+            # The first snapshot is pushed right after start, so host is resolved before that
+            self._resolve()
+            thread = Thread(target=self._run_resolver, name='CollectorResolver')
+            thread.daemon = True
+            thread.start()
+        elif protocol == 'http':
+            self._queue = Queue(self.QUEUE_SIZE)
+            thread = Thread(target=self._run, name='CollectorClient')
+            thread.daemon = True
+            thread.start()
+        else:
+            raise ValueError('Unknown collector protocol: {}'.format(protocol))
+
+    def push(self, snapshot):
+        """Sends snapshot to collector, called by sampler for every new snapshot."""
+        message = encode_snapshot(self._station, snapshot)
+
+        if self._socket:
+            address = self._resolved_address
+
+            if address:
+                for _ in range(self._repeat):
+                    self._socket.sendto(message, address)
+            return
+
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return
+            except Full:
+                self._drop_oldest()
+
+    def close(self):
+        """Stops pushing, queued HTTP messages are dropped."""
+        self._stopped.set()
+
+        if self._socket:
+            self._socket.close()
+        else:
+            # Wakes up sender thread waiting for message
+            self._drop_oldest()
+            self._queue.put_nowait(None)
+
+    def _resolve(self):
+        """
+        Internal. Resolves collector host to IPv4 address used by push, previous address is kept on failure.
+
+        Returns:
+            bool: True if host was resolved
+        """
+        try:
+            self._resolved_address = socket.getaddrinfo(self._address[0], self._address[1], socket.AF_INET, socket.SOCK_DGRAM)[0][4]
+            return True
+        except socket.error as error:
+            logging.warning('Could not resolve collector host %s: %s', self._address[0], error)
+            return False
+
+    def _run_resolver(self):
+        """Internal. Resolves collector host periodically until closed."""
+        resolved = self._resolved_address is not None
+
+        while not self._stopped.wait(self.RESOLVE_INTERVAL if resolved else self.RETRY_INTERVAL):
+            resolved = self._resolve()
+
+    def _drop_oldest(self):
+        """Internal. Makes room in full HTTP queue."""
+        try:
+            self._queue.get_nowait()
+        except Empty:
+            pass
+
+    def _run(self):
+        """Internal. Posts queued messages one by one until closed."""
+        url = 'http://{0}:{1}/snapshots'.format(*self._address)
+
+        while not self._stopped.is_set():
+            message = self._queue.get()
+
+            while message is not None and not self._stopped.is_set():
+                try:
+                    request = urllib2.Request(url, message, {'Content-Type': 'application/json'})
+                    urllib2.urlopen(request, timeout=self.RETRY_INTERVAL).close()
+                    break
+                except urllib2.HTTPError as error:
+                    # Collector rejected the message, retransmit would be rejected as well
+                    logging.warning('Collector rejected snapshot: %s', error)
+                    break
+                except:
+                    self._stopped.wait(self.RETRY_INTERVAL)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Collects snapshots pushed by many weather stations.')
+    parser.add_argument('--host', default='', help='interface to listen on, all interfaces by default')
+    parser.add_argument('--http-port', type=int, default=8700, help='HTTP receiver port, 0 disables')
+    parser.add_argument('--udp-port', type=int, default=8701, help='UDP receiver port, 0 disables')
+    parser.add_argument('--store', default='collector.db', help='SQLite store file')
+    parser.add_argument('--upstream', help='URL snapshots are forwarded to in bulk')
+    parser.add_argument('--stand-in-upstream', action='store_true', help='forward to local stand-in upstream')
+    parser.add_argument('--batch-size', type=int, default=500, help='snapshots written in one transaction')
+    parser.add_argument('--flush-interval', type=float, default=1, help='max seconds snapshot waits in batch')
+    parser.add_argument('--max-batch', type=int, default=100000, help='snapshots kept while store fails, the oldest are dropped beyond')
+
+    return parser.parse_args()
+
+def serve(server):
+    """Starts serving requests of server in background thread."""
+    thread = Thread(target=server.serve_forever, name=type(server).__name__)
+    thread.daemon = True
+    thread.start()
+
+def main():
+    arguments = parse_arguments()
+    upstream_url = arguments.upstream
+    stand_in = None
+    servers = []
+
+    if arguments.stand_in_upstream:
+        stand_in = StandInUpstream()
+        serve(stand_in)
+        upstream_url = stand_in.url
+
+    store = SnapshotStore(arguments.store)
+    collector = Collector(store, HttpForwarder(upstream_url) if upstream_url else None,
+        arguments.batch_size, arguments.flush_interval, max_batch=arguments.max_batch)
+    collector.start()
+
+    if arguments.http_port:
+        servers.append(CollectorHttpServer((arguments.host, arguments.http_port), collector))
+
+    if arguments.udp_port:
+        servers.append(CollectorUdpServer((arguments.host, arguments.udp_port), collector))
+
+    for server in servers:
+        serve(server)
+
+    print('Collecting snapshots, forwarding to', upstream_url or 'nowhere')
+
+    try:
+        while True:
+            time.sleep(60)
+            print('Collector:', collector.stats)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+        # The last batch is stored and forwarded before upstream goes away
+        collector.stop()
+        store.close()
+
+        if stand_in:
+            print('Stand-in upstream received %s snapshots' % stand_in.received)
+            stand_in.shutdown()
+            stand_in.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+    
+    Configuration package.
+********************************************************************************************************************'''
+
+# Uncomment together with UPLOAD_SINKS example below
+# from upload_sinks import InfluxLineSink, NdjsonFileSink
+
+class Config:
+    """Configuration class for Weather Station"""
+
+    # Weather Underground configuration
+    STATION_ID = 'STATION_ID'
+    STATION_KEY = 'STATION_KEY'
+    WU_URL = 'http://weatherstation.wunderground.com/weatherstation/updateweatherstation.php'
+    WU_RAPIDFIRE = False # Set to True to send every sample in real time, in addition to regular uploads
+    WU_RAPIDFIRE_URL = 'http://rtupdate.wunderground.com/weatherstation/updateweatherstation.php'
+
+    # Runtime configuration
+    SAMPLE_INTERVAL = 5 # in seconds, the only rate sensors are read at
+    SAMPLE_HISTORY_SIZE = 720 # number of recent snapshots kept in memory
+    CPU_TEMP_SOURCE = 'auto' # one of 'auto', 'sysfs', 'vcgencmd'
+    CPU_TEMP_CACHE_TTL = 0 # in seconds, 0 reads CPU temperature every time
+    SENSORS_BACKEND = 'auto' # one of 'auto', 'i2c', 'sense_hat', auto reads chips registers over I2C if smbus is installed
+    OVERSAMPLE_INTERVAL = None # in seconds, e.g. 0.25 reads sensors 4 times a second and uploads/logs interval means and statistics, None disables
+    # Smoothing filter per channel, None or filter type with arguments: ('mean', window), ('ema', alpha),
+    # ('median', window, spike_threshold), ('kalman', process_variance, measurement_variance)
+    # Plugins data keys, e.g. 'solarradiation', can be channels too
+    FILTERS = {
+        'temperature': ('mean', 3),
+        'humidity': None,
+        'pressure': None
+    }
+    HISTORY_BUFFER_PATH = '/home/pi/weather_station/readings.buf' # set to None to disable readings history on disk
+    HISTORY_BUFFER_SIZE = 17280 # number of readings kept, one day with 5 seconds sample interval
+    HISTORY_PLUGIN_FIELDS = ('indoortempf', 'indoorhumidity', 'solarradiation') # plugin values kept in history
+    ROLLUP_TIERS = (('raw', None, 720), ('1m', 60, 1440), ('1h', 3600, 720), ('1d', 86400, 3650)) # (name, resolution in seconds or None for raw, buckets kept), empty disables rollups
+    WEATHER_UPLOAD = True # Set to False when testing the code and/or hardware and don't want to upload data to Weather Underground
+    UPLOAD_INTERVAL = 600 # in seconds
+    UPLOAD_QUEUE_PATH = '/home/pi/weather_station/upload_queue.db' # observations waiting for upload survive restarts
+    UPLOAD_QUEUE_RATE = 1 # max observations sent per second, when backfilling after an outage
+    UPLOAD_RETRY_INTERVAL = 60 # in seconds, wait after failed upload before retry
+    UPLOAD_FLUSH_TIMEOUT = 10 # in seconds, time to send pending observations on exit
+    UPLOAD_SINKS = tuple() # additional sinks every upload goes to besides Weather Underground, see upload_sinks.py
+    # e.g. UPLOAD_SINKS = (NdjsonFileSink('/home/pi/weather_station/snapshots.ndjson'), InfluxLineSink('http://localhost:8086', 'weather', STATION_ID))
+    COLLECTOR_HOST = None # host of snapshots collector shared by many stations, None disables pushing
+    COLLECTOR_PORT = 8701 # 8701 for UDP, 8700 for HTTP with collector defaults
+    COLLECTOR_PROTOCOL = 'udp' # one of 'udp', 'http'
+    LOG_TO_CONSOLE = True
+    LOG_INTERVAL = 5 # in seconds
+    UPDATE_DISPLAY = True
+    UPDATE_INTERVAL = 60 # in seconds
+    LED_FRAMEBUFFER = True # write frames straight to memory mapped Sense HAT framebuffer if it is found, otherwise through sense_hat library
+    METRICS_HOST = '127.0.0.1' # interface metrics endpoint listens on, local only by default, empty string for all interfaces
+    METRICS_PORT = 9800 # Prometheus metrics served on http://<host>:<port>/metrics, set to None to disable
+    API_HOST = '127.0.0.1' # interface HTTP API listens on, local only by default, empty string for all interfaces
+    API_PORT = 8800 # latest readings, history and rollups served as JSON on http://<host>:<port>/api/latest etc., set to None to disable
+    API_CORS_ORIGIN = None # origin browser pages may read API from, e.g. 'http://dashboard.local' or '*' for any, None allows none
+    API_MAX_CLIENTS = 16 # max connections served at the same time, others get 503
+
+    # Visual styles configuration
+    TEMP_POSITIVE = (255, 0, 0)    # red
+    TEMP_NEGATIVE = (0, 0, 255)    # blue
+    HUM_POSITIVE = (0, 255, 0)     # green
+    HUM_NEGATIVE = (255, 255, 255) # white
+    PRESS_POSITIVE = (148, 0, 211)  # purple
+    PRESS_NEGATIVE = (255, 140, 0)   # orange
+    SCROLL_TEXT = True
+    SCROLL_TEXT_SPEED = .05
+
+    # Plugins section
+    PLUGINS = tuple()
+    PLUGIN_WORKERS = 4 # max plugins collecting data at the same time
+    PLUGIN_DEADLINE = 15 # in seconds, plugins data arrived later is not uploaded
@@ -0,0 +1,152 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    CPU temperature sources package.
+********************************************************************************************************************'''
+
+from abc import ABCMeta, abstractmethod, abstractproperty
+from threading import Lock
+
+import glob
+import os
+
+from clock import monotonic
+
+class CpuTemperatureSource(object):
+    """
+    Base class for CPU temperature sources.
+
+    These classes contain logic to read CPU temperature in celsius, used to compensate CPU heating.
+    """
+    __metaclass__ = ABCMeta
+
+    @abstractproperty
+    def source_name(self):
+        """Returns source name."""
+        pass
+
+    @abstractmethod
+    def read(self):
+        """Returns CPU temperature in celsius."""
+        pass
+
+    def close(self):
+        """Releases resources held by source if any."""
+        pass
+
+class SysfsCpuTemperature(CpuTemperatureSource):
+    """
+    Reads CPU temperature from kernel thermal zone.
+
+    Thermal zone file is kept open and re-read, so no fork/exec or file open happens per reading.
+    """
+
+    THERMAL_ZONES_PATTERN = '/sys/class/thermal/thermal_zone*'
+
+    def __init__(self, path=None):
+        self._path = path or self.find_thermal_zone()
+
+        if not self._path:
+            raise IOError('No thermal zone found')
+
+        # Unbuffered, so every read goes to the kernel and returns fresh value
+        self._file = open(self._path, 'rb', 0)
+        self._lock = Lock()
+
+    @property
+    def source_name(self):
+        return 'sysfs'
+
+    @staticmethod
+    def find_thermal_zone():
+        """Returns path of CPU thermal zone temperature file, or first available one, or None."""
+        zones = sorted(glob.glob(SysfsCpuTemperature.THERMAL_ZONES_PATTERN))
+
+        for zone in zones:
+            try:
+                with open(os.path.join(zone, 'type')) as zone_type:
+                    if 'cpu' in zone_type.read().lower():
+                        return os.path.join(zone, 'temp')
+            except IOError:
+                pass
+
+        return os.path.join(zones[0], 'temp') if zones else None
+
+    def read(self):
+        with self._lock:
+            self._file.seek(0)
+            value = self._file.read()
+
+        # Kernel reports temperature in millidegrees
+        return int(value) / 1000.0
+
+    def close(self):
+        self._file.close()
+
+class VcgencmdCpuTemperature(CpuTemperatureSource):
+    """
+    Executes a command at the OS to pull in the CPU temperature.
+    Thanks to https://www.raspberrypi.org/forums/viewtopic.php?f=104&t=111457
+    """
+
+    @property
+    def source_name(self):
+        return 'vcgencmd'
+
+    def read(self):
+        res = os.popen('vcgencmd measure_temp').readline()
+        return float(res.replace('temp=', '').replace("'C\n", ''))
+
+class CachedCpuTemperature(CpuTemperatureSource):
+    """Wraps another source and reuses its value for configured time to live."""
+
+    def __init__(self, source, ttl):
+        self._source = source
+        self._ttl = ttl
+        self._value = None
+        self._expires = 0
+        self._lock = Lock()
+
+    @property
+    def source_name(self):
+        return 'cached {}'.format(self._source.source_name)
+
+    def read(self):
+        with self._lock:
+            now = monotonic()
+
+            if self._value is None or now >= self._expires:
+                self._value = self._source.read()
+                self._expires = now + self._ttl
+
+            return self._value
+
+    def close(self):
+        self._source.close()
+
+def create_cpu_temperature_source(source='auto', cache_ttl=0):
+    """
+    Creates CPU temperature source by its name.
+
+    Args:
+        source (str): one of 'auto', 'sysfs', 'vcgencmd', auto prefers sysfs and falls back to vcgencmd
+        cache_ttl (float): seconds to reuse read value, 0 disables caching
+
+    Returns:
+        CpuTemperatureSource: source instance
+    """
+    if source == 'vcgencmd':
+        result = VcgencmdCpuTemperature()
+    elif source == 'sysfs':
+        result = SysfsCpuTemperature()
+    elif source == 'auto':
+        try:
+            result = SysfsCpuTemperature()
+        except IOError:
+            result = VcgencmdCpuTemperature()
+    else:
+        raise ValueError('Unknown CPU temperature source: {}'.format(source))
+
+    return CachedCpuTemperature(result, cache_ttl) if cache_ttl else result
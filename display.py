@@ -0,0 +1,215 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    LED matrix display package.
+********************************************************************************************************************'''
+
+from threading import Lock
+
+from metrics import STAGE_SECONDS
+
+class IndexedFrame(object):
+    """
+    Frame of 64 palette indices, one byte per pixel, and palette of RGB colors they refer to.
+
+    Frames of the same shape share index bytes, so recoloring a frame is just a palette swap.
+    Frame is also a sequence of 64 RGB tuples for sense_hat, these are built once on first access.
+    """
+    __slots__ = ('indices', 'palette', '_pixels')
+
+    def __init__(self, indices, palette):
+        self.indices = indices
+        self.palette = tuple(palette)
+        self._pixels = None
+
+    @classmethod
+    def from_pixels(cls, pixels):
+        """Creates frame from 64 RGB colors, palette has every color once in order of appearance."""
+        palette = []
+        positions = {}
+        indices = bytearray(64)
+
+        for index, pixel in enumerate(pixels):
+            pixel = tuple(pixel)
+
+            if pixel not in positions:
+                positions[pixel] = len(palette)
+                palette.append(pixel)
+
+            indices[index] = positions[pixel]
+
+        return cls(bytes(indices), palette)
+
+    @property
+    def pixels(self):
+        """Returns tuple of 64 RGB colors."""
+        if self._pixels is None:
+            self._pixels = tuple(self.palette[index] for index in bytearray(self.indices))
+
+        return self._pixels
+
+    def recolor(self, palette):
+        """Returns frame of the same shape with another palette."""
+        return IndexedFrame(self.indices, palette)
+
+    def __len__(self):
+        return 64
+
+    def __iter__(self):
+        return iter(self.pixels)
+
+    def __getitem__(self, index):
+        return self.pixels[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, IndexedFrame):
+            return NotImplemented
+
+        return self.indices == other.indices and self.palette == other.palette
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return hash((self.indices, self.palette))
+
+    def __repr__(self):
+        return 'IndexedFrame({!r}, {!r})'.format(self.indices, self.palette)
+
+class DisplayWriter(object):
+    """
+    Writes frames to Sense HAT LED matrix, skipping redundant framebuffer writes.
+
+    Remembers the last written frame and rotation:
+        a) if nothing changed write is skipped
+        b) if only a few pixels changed only these pixels are written
+        c) otherwise the whole frame is written
+    Anything drawing on the matrix bypassing the writer should be followed by invalidate call.
+
+    If framebuffer is provided, frames are written there in full, packed without per pixel conversion,
+    otherwise through sense_hat library.
+    """
+
+    # Max number of changed pixels written one by one instead of the whole frame
+    PARTIAL_WRITE_LIMIT = 4
+
+    # All pixels are off
+    EMPTY_FRAME = IndexedFrame(bytes(bytearray(64)), ((0, 0, 0), ))
+
+    def __init__(self, sense_hat, framebuffer=None):
+        self._sense_hat = sense_hat
+        self._framebuffer = framebuffer
+        self._frame = None
+        self._rotation = None
+        self._lock = Lock()
+
+        # Counters of writes done and avoided
+        self.full_writes = 0
+        self.partial_writes = 0
+        self.skipped_writes = 0
+        self.pixels_written = 0
+
+    @property
+    def stats(self):
+        """Returns dictionary of write counters."""
+        return {
+            'full_writes': self.full_writes,
+            'partial_writes': self.partial_writes,
+            'skipped_writes': self.skipped_writes,
+            'pixels_written': self.pixels_written
+        }
+
+    def write(self, pixels, rotation=0):
+        """Writes IndexedFrame or 64 RGB pixels frame with given rotation, only if it differs from what is shown."""
+        if not isinstance(pixels, IndexedFrame):
+            pixels = IndexedFrame.from_pixels(pixels)
+
+        with self._lock:
+            if self._framebuffer:
+                self._write_framebuffer(pixels, rotation)
+                return
+
+            if rotation != self._rotation:
+                # Whole frame is written below anyway, so no need to redraw current one
+                self._sense_hat.set_rotation(rotation, False)
+                self._rotation = rotation
+                self._frame = None
+
+            if self._frame is not None:
+                if self._frame is pixels or self._frame == pixels:
+                    self.skipped_writes += 1
+                    return
+
+                shown, new = self._frame.pixels, pixels.pixels
+                changed = [index for index in range(64) if shown[index] != new[index]]
+
+                # Frames of different palettes may still look the same
+                if not changed:
+                    self._frame = pixels
+                    self.skipped_writes += 1
+                    return
+
+                if len(changed) <= self.PARTIAL_WRITE_LIMIT:
+                    with STAGE_SECONDS.time(stage='display_write'):
+                        for index in changed:
+                            self._sense_hat.set_pixel(index % 8, index // 8, pixels[index])
+
+                    self._frame = pixels
+                    self.partial_writes += 1
+                    self.pixels_written += len(changed)
+                    return
+
+            with STAGE_SECONDS.time(stage='display_write'):
+                self._sense_hat.set_pixels(pixels.pixels)
+
+            self._frame = pixels
+            self.full_writes += 1
+            self.pixels_written += 64
+
+    def _write_framebuffer(self, frame, rotation):
+        """Internal. Writes whole frame to framebuffer, unless it is shown already, called with lock acquired."""
+        if frame == self._frame and rotation == self._rotation:
+            self.skipped_writes += 1
+            return
+
+        with STAGE_SECONDS.time(stage='display_write'):
+            self._framebuffer.write(frame, rotation)
+
+        self._frame = frame
+        self._rotation = rotation
+        self.full_writes += 1
+        self.pixels_written += 64
+
+    def clear(self):
+        """Turns all pixels off, skipped if they are off already."""
+        with self._lock:
+            if self._framebuffer:
+                self._write_framebuffer(self.EMPTY_FRAME, self._rotation or 0)
+                return
+
+            if self._frame == self.EMPTY_FRAME:
+                self.skipped_writes += 1
+                return
+
+            with STAGE_SECONDS.time(stage='display_write'):
+                self._sense_hat.clear()
+
+            self._frame = self.EMPTY_FRAME
+            self.full_writes += 1
+            self.pixels_written += 64
+
+    def invalidate(self):
+        """Forgets shown frame and rotation, next write is a full one."""
+        with self._lock:
+            self._frame = None
+            self._rotation = None
+
+    def close(self):
+        """Closes framebuffer, if any."""
+        with self._lock:
+            if self._framebuffer:
+                self._framebuffer.close()
+                self._framebuffer = None
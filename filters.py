@@ -0,0 +1,230 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Readings filters package.
+    Every filter keeps its own state and is updated incrementally, one reading at a time,
+    without going through the whole window again.
+********************************************************************************************************************'''
+
+from abc import ABCMeta, abstractmethod
+from bisect import bisect_left, insort
+from collections import deque
+
+import numbers
+
+class Filter(object):
+    """Base class for readings filters."""
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def update(self, value):
+        """Adds reading, returns filtered value."""
+        pass
+
+    @abstractmethod
+    def reset(self):
+        """Forgets all readings."""
+        pass
+
+    def seed(self, values):
+        """Restores state from previous readings, the oldest first."""
+        self.reset()
+
+        for value in values:
+            self.update(value)
+
+class RunningMean(Filter):
+    """
+    Moving average of the last window readings, with running sum.
+
+    Until window is full the average is of the readings there are,
+    so the first reading is not weighted as if it was read window times.
+    """
+
+    # Running sum is recalculated once in a while, so float rounding errors do not pile up
+    RESUM_INTERVAL = 10000
+
+    def __init__(self, window):
+        self._window = window
+        self.reset()
+
+    def reset(self):
+        self._values = deque(maxlen=self._window)
+        self._sum = 0.0
+        self._updates = 0
+
+    def update(self, value):
+        if len(self._values) == self._window:
+            self._sum -= self._values[0]
+
+        self._values.append(value)
+        self._sum += value
+        self._updates += 1
+
+        if self._updates % self.RESUM_INTERVAL == 0:
+            self._sum = float(sum(self._values))
+
+        return self._sum / len(self._values)
+
+class ExponentialMean(Filter):
+    """Exponential moving average, alpha is the weight of the new reading from 0 to 1."""
+
+    def __init__(self, alpha):
+        self._alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self._value = None
+
+    def update(self, value):
+        if self._value is None:
+            self._value = float(value)
+        else:
+            self._value += self._alpha * (value - self._value)
+
+        return self._value
+
+class RollingMedian(Filter):
+    """
+    Median of the last window readings, optionally rejecting spikes.
+
+    Reading which differs from the current median by more than spike threshold is rejected and
+    the median is returned unchanged. If window readings in a row are rejected, it is a real jump
+    rather than a spike, so filter starts over from the new level.
+    """
+
+    def __init__(self, window, spike_threshold=None):
+        self._window = window
+        self._spike_threshold = spike_threshold
+        self.rejected = 0
+        self.reset()
+
+    def reset(self):
+        # Readings in arrival order, to know which one leaves the window, and the same readings sorted
+        self._values = deque()
+        self._sorted = []
+        self._rejected_in_row = 0
+
+    @property
+    def median(self):
+        """Returns median of readings in the window, None if there are none."""
+        count = len(self._sorted)
+
+        if not count:
+            return None
+
+        middle = count // 2
+        return self._sorted[middle] if count % 2 else (self._sorted[middle - 1] + self._sorted[middle]) / 2.0
+
+    def update(self, value):
+        median = self.median
+
+        if self._spike_threshold is not None and median is not None and abs(value - median) > self._spike_threshold:
+            self.rejected += 1
+            self._rejected_in_row += 1
+
+            if self._rejected_in_row < self._window:
+                return median
+
+            self.reset()
+
+        self._rejected_in_row = 0
+
+        if len(self._values) == self._window:
+            del self._sorted[bisect_left(self._sorted, self._values.popleft())]
+
+        self._values.append(value)
+        insort(self._sorted, value)
+
+        return self.median
+
+class KalmanFilter(Filter):
+    """
+    One dimensional Kalman filter for slowly changing value.
+
+    Process variance is how much the real value is expected to change between readings,
+    measurement variance is the sensor noise, the smaller their ratio the smoother the output.
+    """
+
+    def __init__(self, process_variance, measurement_variance):
+        self._process_variance = process_variance
+        self._measurement_variance = measurement_variance
+        self.reset()
+
+    def reset(self):
+        self._estimate = None
+        self._error = None
+
+    def update(self, value):
+        if self._estimate is None:
+            self._estimate = float(value)
+            self._error = self._measurement_variance
+            return self._estimate
+
+        self._error += self._process_variance
+        gain = self._error / (self._error + self._measurement_variance)
+        self._estimate += gain * (value - self._estimate)
+        self._error *= 1 - gain
+
+        return self._estimate
+
+# Filter types by name used in config
+FILTER_TYPES = {
+    'mean': RunningMean,
+    'ema': ExponentialMean,
+    'median': RollingMedian,
+    'kalman': KalmanFilter
+}
+
+def create_filter(spec):
+    """
+    Creates filter from config spec.
+
+    Args:
+        spec (tuple): filter type name followed by its arguments, e.g. ('mean', 3) or ('median', 5, 2.0)
+
+    Returns:
+        Filter: new filter instance
+    """
+    name, arguments = spec[0], spec[1:]
+
+    if name not in FILTER_TYPES:
+        raise ValueError('Unknown filter type: {}'.format(name))
+
+    return FILTER_TYPES[name](*arguments)
+
+class ChannelFilters(object):
+    """
+    Independent filter per readings channel.
+
+    Channels are sensors ('temperature', 'humidity', 'pressure') and plugins data keys.
+    Values of channels without configured filter are returned as they are.
+    """
+
+    def __init__(self, specs):
+        self._filters = dict((channel, create_filter(spec)) for channel, spec in specs.items() if spec)
+
+    def __contains__(self, channel):
+        return channel in self._filters
+
+    def update(self, channel, value):
+        """Adds channel reading, returns filtered value."""
+        channel_filter = self._filters.get(channel)
+
+        if channel_filter is None or value is None:
+            return value
+
+        return channel_filter.update(value)
+
+    def update_values(self, values):
+        """Returns new dictionary with numeric values of filtered channels replaced by filtered ones."""
+        return dict((channel, self.update(channel, value) if isinstance(value, numbers.Number) else value)
+            for channel, value in values.items())
+
+    def seed(self, channels_values):
+        """Restores filters state from dictionary of channel to previous readings, the oldest first."""
+        for channel, values in channels_values.items():
+            if channel in self._filters:
+                self._filters[channel].seed(values)
@@ -0,0 +1,132 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    LED matrix framebuffer package.
+    Writes palette indexed frames straight into memory mapped Sense HAT framebuffer device,
+    packing them to RGB565 with byte translation tables instead of converting every pixel.
+********************************************************************************************************************'''
+
+from operator import itemgetter
+
+import glob
+import mmap
+import os
+
+# Name of Sense HAT LED matrix framebuffer, as reported by sysfs
+SENSE_HAT_FB_NAME = 'RPi-Sense FB'
+SYSFS_FB_PATTERN = '/sys/class/graphics/fb*'
+
+# 8x8 pixels, 2 bytes each
+FRAMEBUFFER_SIZE = 128
+
+def find_framebuffer_device(name=SENSE_HAT_FB_NAME):
+    """Returns path of framebuffer device with given name, None if there is none."""
+    for fb_path in sorted(glob.glob(SYSFS_FB_PATTERN)):
+        name_path = os.path.join(fb_path, 'name')
+
+        if not os.path.isfile(name_path):
+            continue
+
+        with open(name_path) as name_file:
+            if name_file.read().strip() == name:
+                return os.path.join('/dev', os.path.basename(fb_path))
+
+    return None
+
+def rgb565(color):
+    """Packs RGB color to 16 bits value the same way sense_hat does."""
+    red, green, blue = color[:3]
+    return ((red >> 3) & 0x1F) << 11 | ((green >> 2) & 0x3F) << 5 | (blue >> 3) & 0x1F
+
+def rotation_order(rotation):
+    """
+    Returns framebuffer pixels order for rotation, the same as sense_hat pixel map.
+
+    Returns:
+        tuple: frame pixel index for every framebuffer pixel
+    """
+    # Framebuffer pixel of frame pixel at row and column, rotation is counterclockwise as numpy.rot90
+    positions = {
+        0: lambda row, column: row * 8 + column,
+        90: lambda row, column: column * 8 + 7 - row,
+        180: lambda row, column: (7 - row) * 8 + 7 - column,
+        270: lambda row, column: (7 - column) * 8 + row
+    }
+
+    if rotation not in positions:
+        raise ValueError('Rotation must be 0, 90, 180 or 270 degrees')
+
+    order = [0] * 64
+
+    for index in range(64):
+        order[positions[rotation](index // 8, index % 8)] = index
+
+    return tuple(order)
+
+class Rgb565Packer(object):
+    """
+    Packs palette indexed frames to framebuffer bytes.
+
+    Pixels are reordered for rotation by one itemgetter call, then mapped to low and high RGB565 bytes
+    by two translate calls with tables built once per palette, so there is no Python code per pixel.
+    """
+
+    def __init__(self):
+        self._orders = dict((rotation, itemgetter(*rotation_order(rotation))) for rotation in (0, 90, 180, 270))
+        self._tables = {}
+        self._buffer = bytearray(FRAMEBUFFER_SIZE)
+
+    def _translation_tables(self, palette):
+        """Internal. Returns low and high bytes translation tables for palette, builds them on first request."""
+        tables = self._tables.get(palette)
+
+        if tables is None:
+            low, high = bytearray(256), bytearray(256)
+
+            for index, color in enumerate(palette):
+                value = rgb565(color)
+                low[index], high[index] = value & 0xFF, value >> 8
+
+            tables = self._tables[palette] = (bytes(low), bytes(high))
+
+        return tables
+
+    def pack(self, frame, rotation=0):
+        """Returns 128 bytes of IndexedFrame pixels in framebuffer order, little endian RGB565."""
+        low, high = self._translation_tables(frame.palette)
+        indices = bytearray(self._orders[rotation](bytearray(frame.indices)))
+
+        self._buffer[0::2] = indices.translate(low)
+        self._buffer[1::2] = indices.translate(high)
+
+        return bytes(self._buffer)
+
+class LedFramebuffer(object):
+    """Sense HAT LED matrix framebuffer device, memory mapped for writing."""
+
+    def __init__(self, path):
+        self.path = path
+        self._packer = Rgb565Packer()
+        self._fd = os.open(path, os.O_RDWR)
+
+        try:
+            self._map = mmap.mmap(self._fd, FRAMEBUFFER_SIZE, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        except:
+            os.close(self._fd)
+            raise
+
+    def write(self, frame, rotation=0):
+        """Writes IndexedFrame with given rotation."""
+        self._map[0:FRAMEBUFFER_SIZE] = self._packer.pack(frame, rotation)
+
+    def close(self):
+        """Unmaps and closes device."""
+        self._map.close()
+        os.close(self._fd)
+
+def open_led_framebuffer():
+    """Returns LedFramebuffer for Sense HAT framebuffer device, None if it is not found."""
+    path = find_framebuffer_device()
+    return LedFramebuffer(path) if path else None
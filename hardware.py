@@ -0,0 +1,42 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Hardware abstraction package.
+    Station talks to Sense HAT through objects with sense_hat.SenseHat interface,
+    created here either for real hardware or for simulation.
+********************************************************************************************************************'''
+
+# Joystick constants, values are the same as in sense_hat.stick
+ACTION_PRESSED = 'pressed'
+ACTION_RELEASED = 'released'
+ACTION_HELD = 'held'
+
+DIRECTION_UP = 'up'
+DIRECTION_DOWN = 'down'
+DIRECTION_LEFT = 'left'
+DIRECTION_RIGHT = 'right'
+DIRECTION_MIDDLE = 'middle'
+
+def create_sense_hat(backend='sense_hat', **options):
+    """
+    Creates Sense HAT like object for given backend.
+
+    Args:
+        backend (str): 'sense_hat' for real hardware, 'simulated' for SimulatedSenseHat
+        options: keyword arguments passed to SimulatedSenseHat
+
+    Returns:
+        object: object with sense_hat.SenseHat interface
+    """
+    if backend == 'sense_hat':
+        # Imported here, so simulation runs on machines without Sense HAT libraries
+        from sense_hat import SenseHat
+        return SenseHat()
+
+    if backend == 'simulated':
+        from simulation import SimulatedSenseHat
+        return SimulatedSenseHat(**options)
+
+    raise ValueError('Unknown hardware backend: {}'.format(backend))
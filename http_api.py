@@ -0,0 +1,353 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Read only HTTP API package.
+    Serves latest snapshot, recent snapshots and rollups as JSON from memory, sensors are never read here.
+    Responses are serialized once per sampled snapshot and have ETags, so polling clients get 304 cheaply.
+********************************************************************************************************************'''
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from threading import BoundedSemaphore, Lock, Thread
+from urlparse import parse_qs, urlparse
+
+import hashlib
+import json
+import logging
+import math
+import socket
+
+from sampler import finite_or_none
+
+class ApiError(Exception):
+    """Request can not be served, status is HTTP status code."""
+
+    def __init__(self, status, message):
+        super(ApiError, self).__init__(message)
+        self.status = status
+
+def snapshot_to_dict(snapshot):
+    """Returns JSON serializable dictionary of SensorsSnapshot."""
+    return dict(snapshot._asdict())
+
+def to_json(data):
+    """Returns compact JSON bytes of data, NaN and infinite values are written as null."""
+    try:
+        body = json.dumps(data, sort_keys=True, separators=(',', ':'), allow_nan=False)
+    except ValueError:
+        # Filters and plugins may give NaN, browsers do not parse it, data is rarely like that so it is cleaned only then
+        body = json.dumps(finite_or_none(data), sort_keys=True, separators=(',', ':'), allow_nan=False)
+
+    return body.encode('utf-8')
+
+def bucket_to_dict(bucket):
+    """Returns JSON serializable dictionary of RollupBucket."""
+    return {
+        'start': bucket.start,
+        'end': bucket.end,
+        'channels': dict((channel, dict(stats._asdict())) for channel, stats in bucket.channels.items())
+    }
+
+class ResponseCache(object):
+    """
+    Serialized response bodies with their ETags, all dropped at once when a new snapshot is sampled.
+
+    Bodies built for a snapshot which is already replaced are returned but not cached.
+    Number of cached bodies is limited, so arbitrary query values can not grow memory.
+    """
+
+    MAX_ENTRIES = 64
+
+    def __init__(self):
+        self._lock = Lock()
+        self._entries = {}
+        self._version = 0
+
+        # Counters of requests served from cache and built
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, snapshot=None):
+        """Drops cached bodies, used as sampler subscriber, so sampling thread only swaps a dictionary."""
+        with self._lock:
+            self._version += 1
+            self._entries = {}
+
+    def get(self, key, build_function):
+        """
+        Returns (body, etag) for key, body is JSON of what build function returns if it is not cached.
+
+        Build function should read data itself, so data older than cache version is never cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            version = self._version
+
+            if entry:
+                self.hits += 1
+                return entry
+
+            self.misses += 1
+
+        body = to_json(build_function())
+        entry = (body, '"{}"'.format(hashlib.sha1(body).hexdigest()))
+
+        with self._lock:
+            if version == self._version and len(self._entries) < self.MAX_ENTRIES:
+                self._entries[key] = entry
+
+        return entry
+
+class StationApi(object):
+    """
+    Builds API responses from sampler history and rollups.
+
+    Endpoints:
+        /api/latest - the latest snapshot
+        /api/history?seconds=N - snapshots of the last N seconds kept in memory, all of them if omitted
+        /api/rollups - rollup tiers and number of buckets they keep
+        /api/rollups?span=S&max_buckets=N - buckets of the last S seconds from the finest tier
+            covering them with at most N buckets, DEFAULT_MAX_BUCKETS if omitted
+        /api/rollups/<tier>?since=T - buckets of tier ending after UNIX timestamp T, all kept if omitted
+    """
+
+    DEFAULT_MAX_BUCKETS = 500
+
+    def __init__(self, sampler, rollups=None):
+        self._sampler = sampler
+        self._rollups = rollups
+        self.cache = ResponseCache()
+
+    def invalidate(self, snapshot=None):
+        """Drops cached responses, called with every new snapshot."""
+        self.cache.invalidate(snapshot)
+
+    def response(self, path, query):
+        """
+        Returns (body, etag) for request path and query dictionary.
+
+        Raises:
+            ApiError: if path is unknown or query is invalid
+        """
+        parts = [part for part in path.split('/') if part]
+
+        if parts[:1] != ['api'] or len(parts) < 2:
+            raise ApiError(404, 'Not found')
+
+        if parts[1:] == ['latest']:
+            return self.cache.get(('latest', ), self._latest)
+
+        if parts[1:] == ['history']:
+            seconds = self._number(query, 'seconds')
+
+            return self.cache.get(('history', seconds), lambda: {
+                'snapshots': [snapshot_to_dict(snapshot) for snapshot in self._sampler.window(seconds)]
+            })
+
+        if parts[1] == 'rollups' and self._rollups:
+            return self._rollups_response(parts[2:], query)
+
+        raise ApiError(404, 'Not found')
+
+    def _latest(self):
+        """Internal. Returns latest snapshot response, called by cache, so snapshot is read after cache version is noted."""
+        latest = self._sampler.latest
+
+        if latest is None:
+            raise ApiError(503, 'Nothing sampled yet')
+
+        return {'snapshot': snapshot_to_dict(latest)}
+
+    def _rollups_response(self, parts, query):
+        """Internal. Returns (body, etag) of rollups tiers or buckets of one tier."""
+        if not parts and 'span' in query:
+            return self._span_response(query)
+
+        if not parts:
+            return self.cache.get(('rollups', ), lambda: {'tiers': self._rollups.tiers, 'buckets': self._rollups.stats})
+
+        tier = parts[0]
+
+        if len(parts) > 1 or tier not in self._rollups.tiers:
+            raise ApiError(404, 'Unknown rollup tier')
+
+        since = self._number(query, 'since')
+
+        return self.cache.get(('rollups', tier, since), lambda: {
+            'tier': tier,
+            'buckets': [bucket_to_dict(bucket) for bucket in self._rollups.buckets(tier, since)]
+        })
+
+    def _span_response(self, query):
+        """Internal. Returns (body, etag) of buckets of the last span seconds, tier is selected by span and max buckets."""
+        span = self._number(query, 'span')
+        max_buckets = self._number(query, 'max_buckets') or self.DEFAULT_MAX_BUCKETS
+
+        if span <= 0 or max_buckets <= 0:
+            raise ApiError(400, 'Parameters span and max_buckets must be positive')
+
+        tier = self._rollups.select_tier(span, max_buckets)
+
+        def build():
+            latest = self._sampler.latest
+
+            if latest is None:
+                raise ApiError(503, 'Nothing sampled yet')
+
+            # Span is counted back from the latest snapshot, so it is in station clock time
+            return {
+                'tier': tier,
+                'buckets': [bucket_to_dict(bucket) for bucket in self._rollups.buckets(tier, latest.timestamp - span)]
+            }
+
+        return self.cache.get(('rollups', 'span', span, max_buckets), build)
+
+    @staticmethod
+    def _number(query, name):
+        """Internal. Returns numeric query parameter, None if it is omitted."""
+        if name not in query:
+            return None
+
+        try:
+            value = float(query[name][-1])
+        except ValueError:
+            value = None
+
+        if value is None or math.isnan(value) or math.isinf(value):
+            raise ApiError(400, 'Parameter {} must be a number'.format(name))
+
+        return value
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """Serves station API of the server, answers 304 if client has the same ETag."""
+
+    # Keep alive, so polling clients do not reconnect, idle connections are closed after timeout
+    protocol_version = 'HTTP/1.1'
+    timeout = 10
+
+    # Response is buffered and sent at once when request is handled, headers and body in separate
+    # packets would wait for delayed ACK of kept alive connection
+    wbufsize = -1
+
+    CONTENT_TYPE = 'application/json'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+
+        try:
+            body, etag = self.server.api.response(url.path, parse_qs(url.query))
+        except ApiError as error:
+            self._send(error.status, to_json({'error': str(error)}))
+            return
+        except Exception:
+            # Client gets status, rather than dropped connection, e.g. if plugin value can not be serialized
+            logging.warning('Unexpected error occured while serving %s', self.path, exc_info=True)
+            self._send(500, to_json({'error': 'Internal server error'}))
+            return
+
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self._send(304, etag=etag)
+        else:
+            self._send(200, body, etag)
+
+    def _send(self, status, body=b'', etag=None):
+        """Internal. Sends response, every response has length so connection can be kept alive."""
+        self.send_response(status)
+
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+
+        if status != 304:
+            self.send_header('Content-Type', self.CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+
+        # Browser pages of other origins may read responses only if it is configured
+        if self.server.cors_origin:
+            self.send_header('Access-Control-Allow-Origin', self.server.cors_origin)
+
+        self.end_headers()
+
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Polling is too frequent to be printed
+        pass
+
+class ApiHttpServer(ThreadingMixIn, HTTPServer):
+    """
+    HTTP server handling every connection in its own thread, up to max clients at once.
+
+    Further connections are answered with 503 and closed at once, so many clients can not start
+    unbounded threads, and kept alive idle connections can not stall new clients or server shutdown.
+    """
+    daemon_threads = True
+
+    BUSY_RESPONSE = b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nRetry-After: 1\r\nConnection: close\r\n\r\n'
+
+    def __init__(self, address, api, max_clients, cors_origin=None):
+        HTTPServer.__init__(self, address, ApiRequestHandler)
+        self.api = api
+        self.cors_origin = cors_origin
+        self._clients = BoundedSemaphore(max_clients)
+
+    def process_request(self, request, client_address):
+        # Python 2 semaphore can not be acquired with timeout, so server thread does not wait for a slot at all
+        if not self._clients.acquire(False):
+            self._reject(request)
+            return
+
+        try:
+            ThreadingMixIn.process_request(self, request, client_address)
+        except:
+            self._clients.release()
+            raise
+
+    def _reject(self, request):
+        """Internal. Answers 503 to connection over max clients and closes it."""
+        try:
+            request.sendall(self.BUSY_RESPONSE)
+        except socket.error:
+            pass
+
+        self.shutdown_request(request)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            ThreadingMixIn.process_request_thread(self, request, client_address)
+        finally:
+            self._clients.release()
+
+class ApiServer(object):
+    """Station API served in a background thread."""
+
+    def __init__(self, host, port, sampler, rollups=None, max_clients=16, cors_origin=None):
+        self._address = (host, port)
+        self._max_clients = max_clients
+        self._cors_origin = cors_origin
+        self.api = StationApi(sampler, rollups)
+        self._server = None
+        self._thread = None
+
+    @property
+    def port(self):
+        """Returns port server listens on, useful when started with port 0."""
+        return self._server.server_address[1] if self._server else None
+
+    def start(self):
+        """Starts listening and serving requests in background thread."""
+        self._server = ApiHttpServer(self._address, self.api, self._max_clients, self._cors_origin)
+
+        self._thread = Thread(target=self._server.serve_forever, name='ApiServer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops serving and closes listening socket."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
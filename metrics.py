@@ -0,0 +1,213 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Runtime metrics package.
+    Stages latency histograms and counters, rendered in Prometheus text format.
+********************************************************************************************************************'''
+
+from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
+from threading import Lock
+
+from clock import monotonic
+
+# Upper bounds in seconds, from cached CPU temperature reads to slow HTTP requests
+DEFAULT_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+
+class Metric(object):
+    """
+    Base class for metrics.
+
+    Metric keeps a value per combination of label values, labels are passed as keyword arguments.
+    """
+    __metaclass__ = ABCMeta
+
+    metric_type = None
+
+    def __init__(self, name, description, label_names=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = Lock()
+
+        # Metric without labels is reported from the start
+        if not self.label_names:
+            self._values[()] = self._initial_value()
+
+    @abstractmethod
+    def _initial_value(self):
+        """Internal. Returns value of label values combination seen for the first time."""
+        pass
+
+    @abstractmethod
+    def _render_value(self, key, value):
+        """Internal. Returns Prometheus text lines for value of given label values."""
+        pass
+
+    def _key(self, labels):
+        """Internal. Returns label values tuple in label names order."""
+        if set(labels) != set(self.label_names):
+            raise ValueError('{} expects labels {}, got {}'.format(self.name, self.label_names, tuple(labels)))
+
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _format_labels(self, key, extra=()):
+        """Internal. Formats label values as {name="value",...}, empty string if there are no labels."""
+        pairs = list(zip(self.label_names, key)) + list(extra)
+
+        if not pairs:
+            return ''
+
+        escape = lambda value: value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+        return '{' + ','.join('{0}="{1}"'.format(name, escape(value)) for name, value in pairs) + '}'
+
+    def render(self):
+        """Returns metric in Prometheus text format."""
+        lines = ['# HELP {0} {1}'.format(self.name, self.description), '# TYPE {0} {1}'.format(self.name, self.metric_type)]
+
+        with self._lock:
+            for key in sorted(self._values):
+                lines.extend(self._render_value(key, self._values[key]))
+
+        return '\n'.join(lines) + '\n'
+
+class Counter(Metric):
+    """Monotonically increasing counter."""
+
+    metric_type = 'counter'
+
+    def _initial_value(self):
+        return 0
+
+    def inc(self, amount=1, **labels):
+        """Increases counter by amount."""
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Returns current counter value."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_value(self, key, value):
+        return ['{0}{1} {2}'.format(self.name, self._format_labels(key), value)]
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets, with their sum and count."""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name, description, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super(Histogram, self).__init__(name, description, label_names)
+
+    def _initial_value(self):
+        # Non cumulative counts per bucket plus one for values above the last bucket, sum and count
+        return [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+    def observe(self, value, **labels):
+        """Adds observed value."""
+        key = self._key(labels)
+        index = next((index for index, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = self._initial_value()
+
+            counts = self._values[key]
+            counts[0][index] += 1
+            counts[1] += value
+            counts[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes seconds spent in with block, also when block raises exception."""
+        started = monotonic()
+
+        try:
+            yield
+        finally:
+            self.observe(monotonic() - started, **labels)
+
+    def count(self, **labels):
+        """Returns number of observed values."""
+        key = self._key(labels)
+
+        with self._lock:
+            return self._values[key][2] if key in self._values else 0
+
+    def _render_value(self, key, value):
+        bucket_counts, total, count = value
+        bucket_name = self.name + '_bucket'
+        lines = []
+        cumulative = 0
+
+        for bound, bucket_count in zip(self.buckets + ('+Inf', ), bucket_counts):
+            cumulative += bucket_count
+            lines.append('{0}{1} {2}'.format(bucket_name, self._format_labels(key, (('le', str(bound)), )), cumulative))
+
+        lines.append('{0}_sum{1} {2!r}'.format(self.name, self._format_labels(key), total))
+        lines.append('{0}_count{1} {2}'.format(self.name, self._format_labels(key), count))
+
+        return lines
+
+class Registry(object):
+    """Keeps metrics to be exposed together."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = Lock()
+
+    def register(self, metric):
+        """Adds metric, returns it back."""
+        with self._lock:
+            if any(existing.name == metric.name for existing in self._metrics):
+                raise ValueError('Metric {} is already registered'.format(metric.name))
+
+            self._metrics.append(metric)
+
+        return metric
+
+    def render(self):
+        """Returns all metrics in Prometheus text format."""
+        with self._lock:
+            metrics = tuple(self._metrics)
+
+        return ''.join(metric.render() for metric in metrics)
+
+# Default registry with station metrics, updated by station components
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'weather_station_stage_seconds',
+    'Time spent in station stages: sensors, cpu_temperature, oversample, upload_request, display_write.',
+    ('stage', )))
+
+PLUGIN_SECONDS = REGISTRY.register(Histogram(
+    'weather_station_plugin_seconds', 'Time spent in plugin get_data calls.', ('plugin', )))
+
+SCHEDULER_OVERRUNS = REGISTRY.register(Counter(
+    'weather_station_scheduler_overruns_total', 'Jobs which finished after their next deadline.', ('job', )))
+
+SCHEDULER_SKIPPED_TICKS = REGISTRY.register(Counter(
+    'weather_station_scheduler_skipped_ticks_total', 'Job ticks skipped because of overruns.', ('job', )))
+
+SINK_SECONDS = REGISTRY.register(Histogram(
+    'weather_station_sink_seconds', 'Time spent sending a batch to upload sink.', ('sink', )))
+
+SINK_FAILURES = REGISTRY.register(Counter(
+    'weather_station_sink_failures_total', 'Failed attempts to send a batch to upload sink.', ('sink', )))
+
+SINK_DROPPED = REGISTRY.register(Counter(
+    'weather_station_sink_dropped_total', 'Snapshots dropped by upload sink after retries or queue overflow.', ('sink', )))
+
+UPLOADS = REGISTRY.register(Counter(
+    'weather_station_uploads_total', 'Observations delivered to Weather Underground server.'))
+
+UPLOAD_FAILURES = REGISTRY.register(Counter(
+    'weather_station_upload_failures_total', 'Failed Weather Underground upload attempts.'))
@@ -0,0 +1,65 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Metrics endpoint package.
+    Kept apart from metrics, so HTTP server modules are imported only if endpoint is enabled.
+********************************************************************************************************************'''
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+
+from metrics import REGISTRY
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Serves registry of the server on /metrics."""
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        body = self.server.registry.render().encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', self.CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are too frequent to be printed
+        pass
+
+class MetricsServer(object):
+    """HTTP server exposing metrics registry in a background thread."""
+
+    def __init__(self, host, port, registry=REGISTRY):
+        self._address = (host, port)
+        self._registry = registry
+        self._server = None
+        self._thread = None
+
+    @property
+    def port(self):
+        """Returns port server listens on, useful when started with port 0."""
+        return self._server.server_address[1] if self._server else None
+
+    def start(self):
+        """Starts listening and serving requests in background thread."""
+        self._server = HTTPServer(self._address, MetricsRequestHandler)
+        self._server.registry = self._registry
+
+        self._thread = Thread(target=self._server.serve_forever, name='MetricsServer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops serving and closes listening socket."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -1,5 +1,5 @@
 from abc import ABCMeta, abstractmethod, abstractproperty
-import os, yaml
+import os
 
 class BasePlugin(object):
     """
@@ -31,6 +31,11 @@ class BasePlugin(object):
         """Returns config file name, should return None if no config file"""
         pass
 
+    @property
+    def deadline(self):
+        """Returns seconds plugin is given to return data, None to use configured default"""
+        return None
+
     @abstractmethod
     def get_data(self):
         """Gets valid data for plugin, should return empty dictionary if no data"""
@@ -39,4 +44,10 @@ class BasePlugin(object):
     def parse_config(self):
         """Parses config file if any"""
         if self.config_file_name and os.path.isfile(self.config_file_name):
-            self.config = yaml.safe_load(open(self.config_file_name))
\ No newline at end of file
+            # Imported here, so loading plugins does not slow down station start
+            import yaml
+            self.config = yaml.safe_load(open(self.config_file_name))
+
+    def close(self):
+        """Releases connections or other resources held by plugin"""
+        pass
\ No newline at end of file
@@ -1,6 +1,5 @@
 import base64, json, hashlib, os, time
-import paho.mqtt.client as mqtt
-from Queue import Queue, Empty
+from threading import Event, Lock
 
 from base_plugin import BasePlugin
 
@@ -126,12 +125,18 @@ class DysonPureLink(BasePlugin):
         super(DysonPureLink, self).__init__(self)
 
         self.client = None
-        self.connected = Queue()
-        self.disconnected = Queue()
-        self.state_data_available = Queue()
-        self.sensor_data_available = Queue()
+        self.connected = Event()
+        self.disconnected = Event()
+        self.connection_result = False
+        self.disconnection_result = False
+
+        # Latest value slots, every incoming message replaces previous value
+        self.state_data_available = Event()
+        self.sensor_data_available = Event()
         self.sensor_data = None
+        self.sensor_data_time = None
         self.state_data = None
+        self._data_lock = Lock()
 
         # In case sensors were disabled we upload previous readings
         # Required for Weather Underground data consistency
@@ -173,6 +178,24 @@ class DysonPureLink(BasePlugin):
     def connectivity_timeout(self):
         return self.config['CONNECTIVITY_TIMEOUT']
 
+    @property
+    def persistent_connection(self):
+        return self.config.get('PERSISTENT_CONNECTION', False)
+
+    @property
+    def reconnect_delay(self):
+        """Returns min and max seconds to wait before reconnect, delay doubles after every failed attempt"""
+        return (self.config.get('RECONNECT_MIN_DELAY', 1), self.config.get('RECONNECT_MAX_DELAY', 120))
+
+    @property
+    def data_max_age(self):
+        """Returns seconds cached sensors data is valid for in persistent connection mode, None if always valid"""
+        return self.config.get('DATA_MAX_AGE')
+
+    @property
+    def is_data_fresh(self):
+        return self.data_max_age is None or (self.sensor_data_time and time.time() - self.sensor_data_time <= self.data_max_age)
+
     @property
     def device_command(self):
         return '{0}/{1}/command'.format(self.device_type, self.serial_number)
@@ -186,21 +209,29 @@ class DysonPureLink(BasePlugin):
         """Static callback to handle on_connect event"""
         # Connection is successful with return_code: 0
         if return_code:
-            userdata.connected.put_nowait(False)
-            self.errors.append(ConnectionError(return_code))
+            userdata.errors.append(ConnectionError(return_code))
+            userdata.connection_result = False
+            userdata.connected.set()
+            return
 
-        # We subscribe to the status message
+        # We subscribe to the status message, it is called after every reconnect as well
         client.subscribe(userdata.device_status)
-        userdata.connected.put_nowait(True)
+        userdata.connection_result = True
+        userdata.connected.set()
+
+        # In persistent connection mode we refresh data as soon as connection is (re)established
+        if userdata.persistent_connection:
+            userdata._request_state()
 
     @staticmethod
     def on_disconnect(client, userdata, return_code):
         """Static callback to handle on_disconnect event"""
         if return_code:
-            self.errors.append(DisconnectionError(return_code))
-            userdata.disconnected.put_nowait(False)
+            userdata.errors.append(DisconnectionError(return_code))
 
-        userdata.disconnected.put_nowait(True)
+        userdata.connection_result = False
+        userdata.disconnection_result = not return_code
+        userdata.disconnected.set()
 
     @staticmethod
     def on_message(client, userdata, message):
@@ -209,10 +240,15 @@ class DysonPureLink(BasePlugin):
         json_message = json.loads(payload)
         
         if StateData.is_state_data(json_message):
-            userdata.state_data_available.put_nowait(StateData(json_message))
+            with userdata._data_lock:
+                userdata.state_data = StateData(json_message)
+            userdata.state_data_available.set()
 
         if SensorsData.is_sensors_data(json_message):
-            userdata.sensor_data_available.put_nowait(SensorsData(json_message))
+            with userdata._data_lock:
+                userdata.sensor_data = SensorsData(json_message)
+                userdata.sensor_data_time = time.time()
+            userdata.sensor_data_available.set()
 
     def _request_state(self):
         """Publishes request for current state message"""
@@ -234,11 +270,10 @@ class DysonPureLink(BasePlugin):
                 'data': data
             })
 
+            self.state_data_available.clear()
             self.client.publish(self.device_command, command, 1)
 
-            try:
-                self.state_data = self.state_data_available.get(timeout=5)
-            except Empty:
+            if not self.state_data_available.wait(5):
                 self.errors.append(DataRetrieveError())
 
     def _hashed_password(self):
@@ -257,33 +292,57 @@ class DysonPureLink(BasePlugin):
         if not self.config:
             self.parse_config()
 
-        self.client = mqtt.Client(clean_session=True, protocol=mqtt.MQTTv311, userdata=self)
-        self.client.username_pw_set(self.serial_number, self._hashed_password())
-        self.client.on_connect = self.on_connect
-        self.client.on_disconnect = self.on_disconnect
-        self.client.on_message = self.on_message
+        self.connected.clear()
+        self.state_data_available.clear()
+        self.sensor_data_available.clear()
+        self.client = self._create_client()
         self.client.connect(self.ip_address, port=self.port_number)
         self.client.loop_start()
 
-        try:
-            if self.connected.get(timeout=self.connectivity_timeout):
+        if self.connected.wait(self.connectivity_timeout):
+            if self.connection_result:
                 self._request_state()
 
-                try:
-                    self.state_data = self.state_data_available.get(timeout=5)
-                    self.sensor_data = self.sensor_data_available.get(timeout=5)
-
+                if self.state_data_available.wait(5) and self.sensor_data_available.wait(5):
                     # Return True in case of successful connect and data retrieval
                     return True
-                except Empty:
-                    self.errors.append(DataRetrieveError())
-        except Empty:
+
+                self.errors.append(DataRetrieveError())
+        else:
             self.errors.append(ConnectionError(99))
 
         # If any issue occurred return False
         self.client = None
         return False
 
+    def _create_client(self):
+        """Creates MQTT client with credentials and callbacks set"""
+        # Imported here, so loading plugins does not slow down station start
+        import paho.mqtt.client as mqtt
+
+        client = mqtt.Client(clean_session=True, protocol=mqtt.MQTTv311, userdata=self)
+        client.username_pw_set(self.serial_number, self._hashed_password())
+        client.on_connect = self.on_connect
+        client.on_disconnect = self.on_disconnect
+        client.on_message = self.on_message
+
+        return client
+
+    def start_session(self):
+        """
+        Starts long-lived connection to device.
+
+        Network loop thread connects in background and reconnects automatically with exponential backoff,
+        incoming messages keep latest state and sensors data up to date.
+        """
+        if not self.config:
+            self.parse_config()
+
+        self.client = self._create_client()
+        self.client.reconnect_delay_set(*self.reconnect_delay)
+        self.client.connect_async(self.ip_address, port=self.port_number)
+        self.client.loop_start()
+
     def set_fan_mode(self, mode):
         """Changes fan mode: ON|OFF|AUTO"""
         self._change_state({'fmod': mode})
@@ -293,36 +352,72 @@ class DysonPureLink(BasePlugin):
         self._change_state({'rhtm': mode})
 
     def get_data(self):
+        if not self.config:
+            self.parse_config()
+
+        if self.persistent_connection:
+            return self._get_session_data()
+
         result = {}
 
         if self.connect_device():
+            result = self._build_result()
+
+        self.disconnect_device()
+
+        return result
+
+    def _get_session_data(self):
+        """Returns cached data of long-lived connection and requests fresh data for the next call"""
+        if not self.client:
+            self.start_session()
+
+            # Only the very first call waits for data to arrive
+            self.sensor_data_available.wait(self.connectivity_timeout)
+        elif self.connection_result:
+            self._request_state()
+
+        return self._build_result() if self.sensor_data_available.is_set() and self.is_data_fresh else {}
+
+    def _build_result(self):
+        """Builds Weather Underground data from the latest sensors data"""
+        result = {}
+
+        with self._data_lock:
             if self.has_valid_data:
-                # Dictionary data for Weather Underground upload  
+                # Dictionary data for Weather Underground upload
                 if self.sensor_data.temperature is not None:
                     result['indoortempf'] = self.sensor_data.temperature
 
                 if self.sensor_data.humidity is not None:
                     result['indoorhumidity'] = self.sensor_data.humidity
-                
+
                 # Update previous readings value
                 self.previous_data = result
             else:
                 # If humidity and temperature are None, return previous value
                 result = self.previous_data
 
-        self.disconnect_device()
-
         return result
 
+    def close(self):
+        self.disconnect_device()
+
     def disconnect_device(self):
         """Disconnects device and return the boolean result"""
         if self.client:
-            self.client.loop_stop()
+            self.disconnected.clear()
             self.client.disconnect()
             
-            # Wait until we get on disconnect message
-            try:
-                return self.disconnected.get(timeout=5)
-            except Empty:
+            # Wait until we get on disconnect message, network loop should be running to deliver it
+            result = self.disconnected.wait(5)
+            self.client.loop_stop()
+            self.client = None
+
+            if not result:
                 self.errors.append(DisconnectionError(99))
                 return False
+
+            return self.disconnection_result
+
+        return False
@@ -0,0 +1,140 @@
+"""Concurrent Plugins Data Collection Logic"""
+
+from collections import namedtuple
+from Queue import Queue
+from threading import Event, Lock, Thread
+import logging, sys, time
+
+from metrics import PLUGIN_SECONDS
+
+class PluginsResult(namedtuple('PluginsResult', 'data late failed')):
+    """
+    Value type for plugins collection result.
+
+    data: dictionary of plugin to its data, for plugins finished in time
+    late: list of plugins which did not finish before their deadline
+    failed: dictionary of plugin to exc_info tuple of exception raised by its get_data
+    """
+    __slots__ = ()
+
+class PluginTask(object):
+    """Single get_data call of a plugin, filled in by worker"""
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+        self.data = None
+        self.exc_info = None
+        self.done = Event()
+
+class PluginRunner(object):
+    """
+    Collects plugins data in parallel through bounded pool of worker threads.
+
+    Every plugin has its own deadline, collection returns whatever arrived in time,
+    so upload latency is bounded by the deadline, not by the sum of all plugins timeouts.
+    Plugin which is still running since previous collection is not called again and reported as late.
+    Collection can run periodically in its own thread, so callers never wait for plugins.
+    """
+
+    def __init__(self, plugins, max_workers, default_deadline):
+        self._plugins = tuple(plugins)
+        self._max_workers = max_workers
+        self._default_deadline = default_deadline
+        self._tasks = Queue()
+        self._workers = []
+
+        # Plugins with get_data call in progress
+        self._busy = set()
+        self._lock = Lock()
+
+        # Periodic collection thread
+        self._stopped = Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        """Returns True if plugins data is collected periodically in background."""
+        return self._thread is not None and not self._stopped.is_set()
+
+    def deadline(self, plugin):
+        """Returns seconds plugin is given to return data"""
+        return plugin.deadline or self._default_deadline
+
+    def collect(self):
+        """Calls get_data of all plugins in parallel and waits until they finish or their deadlines expire"""
+        self._start_workers()
+        started = time.time()
+        submitted = []
+        late = []
+
+        with self._lock:
+            for plugin in self._plugins:
+                if plugin in self._busy:
+                    late.append(plugin)
+                else:
+                    self._busy.add(plugin)
+                    task = PluginTask(plugin)
+                    submitted.append(task)
+                    self._tasks.put(task)
+
+        data = {}
+        failed = {}
+
+        for task in submitted:
+            remaining = started + self.deadline(task.plugin) - time.time()
+
+            if not task.done.wait(max(remaining, 0)):
+                late.append(task.plugin)
+            elif task.exc_info:
+                failed[task.plugin] = task.exc_info
+            else:
+                data[task.plugin] = task.data
+
+        return PluginsResult(data, late, failed)
+
+    def start(self, interval, callback):
+        """Collects plugins data every interval seconds in background thread, starting now, PluginsResult is passed to callback"""
+        self._stopped.clear()
+        self._thread = Thread(target=self._run, args=(interval, callback), name='PluginCollector')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops periodic collection, plugins calls in progress are not interrupted"""
+        self._stopped.set()
+
+    def _run(self, interval, callback):
+        """Internal. Periodic collection loop, interval is counted from collection start"""
+        while not self._stopped.is_set():
+            started = time.time()
+
+            try:
+                callback(self.collect())
+            except:
+                logging.warning('Unexpected error occured while collecting plugins data', exc_info=True)
+
+            self._stopped.wait(max(interval - (time.time() - started), 0))
+
+    def _start_workers(self):
+        """Internal. Starts worker threads on first collection"""
+        while len(self._workers) < min(self._max_workers, len(self._plugins)):
+            worker = Thread(target=self._work, name='PluginWorker-{}'.format(len(self._workers)))
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def _work(self):
+        """Internal. Worker thread loop, runs plugin tasks one by one"""
+        while True:
+            task = self._tasks.get()
+
+            try:
+                with PLUGIN_SECONDS.time(plugin=type(task.plugin).__name__):
+                    task.data = task.plugin.get_data()
+            except:
+                task.exc_info = sys.exc_info()
+
+            with self._lock:
+                self._busy.discard(task.plugin)
+
+            task.done.set()
@@ -0,0 +1,128 @@
+"""Offline Solar Position Calculation Logic"""
+
+from collections import namedtuple
+import datetime, math
+
+class SunTimes(namedtuple('SunTimes', 'sunrise solar_noon sunset')):
+    """Value type for sun events of a day, timezone aware datetimes"""
+    __slots__ = ()
+
+class SolarPosition(object):
+    """
+    Calculates sunrise, sunset and solar noon for a location without network access.
+
+    Uses NOAA solar calculator equations, accurate to about a minute for latitudes within +/- 72 degrees.
+    https://gml.noaa.gov/grad/solcalc/calcdetails.html
+    Results are memoized per date.
+    """
+
+    # Sun is considered risen when its center is 0.833 degrees below horizon (refraction and sun radius)
+    SUNRISE_ZENITH = 90.833
+
+    # Number of dates kept in memo
+    CACHE_SIZE = 7
+
+    def __init__(self, latitude, longitude, timezone=None):
+        # Imported here, so loading plugins does not slow down station start
+        import pytz
+
+        self.latitude = latitude
+        self.longitude = longitude
+        self.timezone = timezone or pytz.utc
+        self._utc = pytz.utc
+        self._cache = {}
+
+    @staticmethod
+    def julian_day(date):
+        """Gets Julian day number at noon UTC for given date"""
+        a = (14 - date.month) // 12
+        year = date.year + 4800 - a
+        month = date.month + 12 * a - 3
+
+        return date.day + (153 * month + 2) // 5 + 365 * year + year // 4 - year // 100 + year // 400 - 32045
+
+    @staticmethod
+    def declination_and_equation_of_time(julian_day):
+        """Calculates sun declination and equation of time for given Julian day.
+
+        Args:
+            julian_day (float): Julian day, including fraction of the day
+
+        Returns:
+            tuple: declination in radians and equation of time in minutes
+        """
+        century = (julian_day - 2451545.0) / 36525
+        mean_longitude = math.radians((280.46646 + century * (36000.76983 + century * 0.0003032)) % 360)
+        mean_anomaly = math.radians(357.52911 + century * (35999.05029 - 0.0001537 * century))
+        eccentricity = 0.016708634 - century * (0.000042037 + 0.0000001267 * century)
+
+        center = (math.sin(mean_anomaly) * (1.914602 - century * (0.004817 + 0.000014 * century)) +
+            math.sin(2 * mean_anomaly) * (0.019993 - 0.000101 * century) + math.sin(3 * mean_anomaly) * 0.000289)
+        omega = math.radians(125.04 - 1934.136 * century)
+        apparent_longitude = math.radians(math.degrees(mean_longitude) + center - 0.00569 - 0.00478 * math.sin(omega))
+
+        mean_obliquity = 23 + (26 + (21.448 - century * (46.815 + century * (0.00059 - century * 0.001813))) / 60) / 60
+        obliquity = math.radians(mean_obliquity + 0.00256 * math.cos(omega))
+        declination = math.asin(math.sin(obliquity) * math.sin(apparent_longitude))
+
+        y = math.tan(obliquity / 2) ** 2
+        equation_of_time = 4 * math.degrees(
+            y * math.sin(2 * mean_longitude) - 2 * eccentricity * math.sin(mean_anomaly) +
+            4 * eccentricity * y * math.sin(mean_anomaly) * math.cos(2 * mean_longitude) -
+            0.5 * y * y * math.sin(4 * mean_longitude) - 1.25 * eccentricity * eccentricity * math.sin(2 * mean_anomaly))
+
+        return declination, equation_of_time
+
+    def _solar_noon(self, julian_day):
+        """Internal. Solar noon in minutes from UTC midnight"""
+        equation_of_time = self.declination_and_equation_of_time(julian_day)[1]
+        return 720 - 4 * self.longitude - equation_of_time
+
+    def _sun_event(self, midnight, noon, direction):
+        """Internal. Sunrise (direction -1) or sunset (direction 1) in minutes from UTC midnight"""
+        minutes = noon
+        latitude = math.radians(self.latitude)
+
+        # Second pass recalculates sun declination at the event time itself
+        for _ in range(2):
+            declination = self.declination_and_equation_of_time(midnight + minutes / 1440.0)[0]
+            cos_hour_angle = (math.cos(math.radians(self.SUNRISE_ZENITH)) / (math.cos(latitude) * math.cos(declination)) -
+                math.tan(latitude) * math.tan(declination))
+
+            # Out of range value means polar night (sun never rises) or polar day (sun never sets)
+            hour_angle = math.degrees(math.acos(max(-1, min(1, cos_hour_angle))))
+            minutes = noon + direction * 4 * hour_angle
+
+        return minutes
+
+    def sun_times(self, date):
+        """
+        Gets sunrise, solar noon and sunset for given local date.
+
+        During polar day sunrise and sunset are 12 hours from solar noon, during polar night they are equal to it.
+
+        Returns:
+            SunTimes: datetimes in configured timezone
+        """
+        if date in self._cache:
+            return self._cache[date]
+
+        # Julian day at UTC midnight of given date, solar noon is estimated by longitude and then refined
+        midnight = self.julian_day(date) - 0.5
+        noon = self._solar_noon(midnight + (720 - 4 * self.longitude) / 1440.0)
+        noon = self._solar_noon(midnight + noon / 1440.0)
+
+        utc_midnight = self._utc.localize(datetime.datetime(date.year, date.month, date.day))
+        to_datetime = lambda minutes: (utc_midnight + datetime.timedelta(minutes=minutes)).astimezone(self.timezone)
+
+        result = SunTimes(
+            to_datetime(self._sun_event(midnight, noon, -1)),
+            to_datetime(noon),
+            to_datetime(self._sun_event(midnight, noon, 1)))
+
+        # Station asks for one date at a time, so memo is simply dropped when full
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache.clear()
+
+        self._cache[date] = result
+        return result
@@ -1,7 +1,21 @@
 """Solar Radiation Calculation Logic"""
 
-import datetime, dateutil.parser, json, math, os, pytz, urllib, yaml
+import datetime, json, math, os
 from base_plugin import BasePlugin
+from solar_position import SolarPosition
+
+# NumPy is optional, it is required only for batch calculation
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class SunriseSunsetMismatchError(Exception):
+    """Custom error to report difference between local and API sunrise/sunset calculation"""
+
+    def __init__(self, event, local_value, api_value, *args):
+        super(SunriseSunsetMismatchError, self).__init__(*args)
+        self.message = 'Local {0} {1} differs from API value {2}'.format(event, local_value, api_value)
 
 class SolarRadiation(BasePlugin):
     """Plugin to calculate solar radiation by provided latitude"""
@@ -10,9 +24,11 @@ class SolarRadiation(BasePlugin):
         super(SolarRadiation, self).__init__(self)
         self.sunrise = None
         self.sunset = None
+        self.solar_noon = None
 
         self._timezone = None
         self._today = None
+        self._solar_position = None
 
     @property
     def plugin_name(self):
@@ -35,6 +51,7 @@ class SolarRadiation(BasePlugin):
     def timezone(self):
         """Checks if timezone was populated otherwise loads it from config"""
         if not self._timezone:
+            import pytz
             self._timezone = pytz.timezone(self.config['TIME_ZONE'] or pytz.utc)
         
         return self._timezone
@@ -78,6 +95,24 @@ class SolarRadiation(BasePlugin):
         """Returns latitude from config"""
         return self.config['LATITUDE'] if self.config else None
 
+    @property
+    def sunrise_sunset_source(self):
+        """Returns where sunrise and sunset come from: 'local' calculation (default) or 'api'"""
+        return self.config.get('SUNRISE_SUNSET_SOURCE', 'local')
+
+    @property
+    def sunrise_sunset_cross_check(self):
+        """Returns if local calculation should be compared with API values"""
+        return self.config.get('SUNRISE_SUNSET_CROSS_CHECK', False)
+
+    @property
+    def solar_position(self):
+        """Checks if solar position engine was created otherwise creates it for configured location"""
+        if not self._solar_position:
+            self._solar_position = SolarPosition(self.latitude, self.config['LONGITUDE'], self.timezone)
+
+        return self._solar_position
+
     @staticmethod
     def declination_angle(day):
         """Declination's angle is measured north or south of the celestial equator, along the hour circle passing through the point in question.
@@ -101,7 +136,7 @@ class SolarRadiation(BasePlugin):
         http://www.pveducation.org/pvcdrom/properties-of-sunlight/air-mass
 
         Args:
-            hour (float): local solar time
+            hour (float): local solar time, see local_solar_time
             day (number): day of year
             latitude (float): latitude value between -90 and 90 degrees
 
@@ -110,7 +145,7 @@ class SolarRadiation(BasePlugin):
         """
         declination_angle = math.radians(SolarRadiation.declination_angle(day));
         hour_angle = math.radians(SolarRadiation.hour_angle(hour));
-        elevation_angle = SolarRadiation.elevation_angle(hour_angle, declination_angle, latitude)
+        elevation_angle = SolarRadiation.elevation_angle(hour_angle, declination_angle, math.radians(latitude))
         declination = math.radians(90) - elevation_angle;
         return 1 / (1E-4 + math.cos(declination))
 
@@ -131,6 +166,28 @@ class SolarRadiation(BasePlugin):
         """
         return 15 * (hour - 12);
 
+    @staticmethod
+    def local_solar_time(utc_hour, day, longitude, math_module=math):
+        """The Local Solar Time is 12 when the sun is highest in the sky, it differs from clock time by longitude and the Equation of Time.
+
+        The Equation of Time corrects for the eccentricity of the Earth's orbit and the Earth's axial tilt.
+        https://www.pveducation.org/pvcdrom/2-properties-sunlight/solar-time
+        Used by both scalar and batch calculation, so they agree.
+
+        Args:
+            utc_hour (float): UTC time as hours since midnight
+            day (number): day of year, of UTC date
+            longitude (float): longitude between -180 and 180 degrees, east is positive
+            math_module (module): math for numbers, numpy for arrays
+
+        Returns:
+            float: local solar time
+        """
+        b = math_module.radians(360.0 / 365 * (day - 81))
+        equation_of_time = 9.87 * math_module.sin(2 * b) - 7.53 * math_module.cos(b) - 1.5 * math_module.sin(b)
+
+        return utc_hour + longitude / 15.0 + equation_of_time / 60.0
+
     @staticmethod
     def elevation_angle(hour_angle, declanation_angle, latitude):
         """The elevation angle (used interchangeably with altitude angle) is the angular height of the sun in the sky measured from the horizontal.
@@ -139,56 +196,111 @@ class SolarRadiation(BasePlugin):
         Args:
             hour_angle (float): hour angle in radians
             declanation_angle(float): declanation angle in radians
-            latitude (float): latitude value between -90 and 90 degrees
+            latitude (float): latitude in radians
         Returns:
             float: elevation angle in radians
         """
         return math.asin(math.sin(declanation_angle) * math.sin(latitude) + math.cos(declanation_angle) * math.cos(latitude) * math.cos(hour_angle))
 
+    def get_api_sunrise_sunset(self):
+        """Gets sunrise, sunset and solar noon from Sunrise/Sunset API by provided latitude and longitude.
+
+        Returns:
+            tuple: sunrise, sunset and solar noon in timezone provided in config
+        """
+        # Imported here, as API is used only if configured
+        import dateutil.parser, urllib
+
+        response = urllib.urlopen(self.sunrise_sunset_url)
+        data = json.loads(response.read())
+        result = data['results']
+
+        # Convert to provided in config timezone, as API returns in UTC by default
+        return tuple(dateutil.parser.parse(result[key]).astimezone(self.timezone) for key in ('sunrise', 'sunset', 'solar_noon'))
+
+    def check_sunrise_sunset(self, tolerance=300):
+        """Compares local sunrise and sunset with API values, reports difference bigger than tolerance seconds as error"""
+        try:
+            api_values = self.get_api_sunrise_sunset()
+        except Exception as error:
+            self.errors.append(error)
+            return
+
+        for event, local_value, api_value in zip(('sunrise', 'sunset'), (self.sunrise, self.sunset), api_values):
+            if abs((local_value - api_value).total_seconds()) > tolerance:
+                self.errors.append(SunriseSunsetMismatchError(event, local_value, api_value))
+
     def get_sunrise_sunset(self):
-        """Gets sunrise and sunset from API by provided latitude and longitude.
+        """Gets sunrise and sunset by provided latitude and longitude.
 
-        If date is the same, sunrise and sunset values are set return existing values, without calling API.
+        Values are calculated locally, or requested from API if it is configured as a source.
+        If date is the same, sunrise and sunset values are set return existing values, without calculation or calling API.
 
         Returns:
             tuple: sunrise and sunset in timezone provided in config
         """
         if (self.config and (not self.sunrise or not self.sunset or not self.is_date_today)):
             self._today = self.current_date.date()
-            try:
-                response = urllib.urlopen(self.sunrise_sunset_url)
-                data = json.loads(response.read())
-                result = data['results']
-                sunrise = result['sunrise']
-                sunset = result['sunset']
-
-                # Convert to provided in config timezone, as API returns in UTC by default
-                self.sunrise = dateutil.parser.parse(sunrise).astimezone(self.timezone)
-                self.sunset = dateutil.parser.parse(sunset).astimezone(self.timezone)
-            except Exception as error:
-                self.errors.append(error)
+
+            if self.sunrise_sunset_source == 'api':
+                try:
+                    self.sunrise, self.sunset, self.solar_noon = self.get_api_sunrise_sunset()
+                except Exception as error:
+                    self.errors.append(error)
+            else:
+                self.sunrise, self.solar_noon, self.sunset = self.solar_position.sun_times(self._today)
+
+                if self.sunrise_sunset_cross_check:
+                    self.check_sunrise_sunset()
         
         return (self.sunrise, self.sunset)
 
-    def calcluate_solar_radiation(self):
-        """Calculates current date and time solar radiation.
+    @staticmethod
+    def radiation_by_air_mass(air_mass):
+        """Calculates solar radiation reaching the ground for given air mass.
 
         http://www.pveducation.org/pvcdrom/properties-of-sunlight/calculation-of-solar-insolation
 
+        Args:
+            air_mass (float): path length which light takes through the atmosphere
+
+        Returns:
+            float: solar radiation in W/m2
+        """
+        result = math.pow(0.7, air_mass)
+        result = 1353 * math.pow(result, 0.678)
+
+        # We ignore case more than 1100 W/m2, because the peak solar radiation is 1 kW/m2
+        # http://www.pveducation.org/pvcdrom/average-solar-radiation
+        return 0 if result > 1100 else result
+
+    def calcluate_solar_radiation(self, date=None):
+        """Calculates solar radiation for given date and time.
+
+        Args:
+            date (datetime): timezone aware date and time, current date and time if None
+
         Returns:
             float: solar radiation in W/m2
         """
         if (self.config):
             self.get_sunrise_sunset()
 
-            if self.is_day:
-                air_mass = SolarRadiation.air_mass(self.current_hour, self.day_of_year, self.latitude)
-                result = math.pow(0.7, air_mass)
-                result = 1353 * math.pow(result, 0.678)
+            # Date is read once, so all calculations use the same moment
+            date = date or self.current_date
+            sunrise, sunset = self.sunrise, self.sunset
+            local_date = date.astimezone(self.timezone).date()
+
+            # Sunrise and sunset are kept for today, other dates get theirs from memoized solar position
+            if local_date != self.today:
+                sunrise, _, sunset = self.solar_position.sun_times(local_date)
 
-                # We ignore case more than 1100 W/m2, because the peak solar radiation is 1 kW/m2
-                # http://www.pveducation.org/pvcdrom/average-solar-radiation
-                return 0 if result > 1100 else result
+            if sunrise <= date <= sunset:
+                utc = date.utctimetuple()
+                hour = SolarRadiation.local_solar_time(
+                    utc.tm_hour + utc.tm_min / 60.0 + utc.tm_sec / 3600.0, utc.tm_yday, self.config['LONGITUDE'])
+                air_mass = SolarRadiation.air_mass(hour, utc.tm_yday, self.latitude)
+                return SolarRadiation.radiation_by_air_mass(air_mass)
 
             return 0
 
@@ -206,3 +318,49 @@ class SolarRadiation(BasePlugin):
             result['solarradiation'] = round(solar_radiation, 1)
 
         return result
+
+def clear_sky_radiation(timestamps, latitudes, longitudes):
+    """Calculates clear-sky solar radiation for arrays of timestamps and locations in one pass.
+
+    Uses the same model and local solar time as SolarRadiation.calcluate_solar_radiation, but the sun
+    below horizon instead of sunrise/sunset to detect night, so results may differ only around them.
+    Arguments are broadcast against each other, e.g. timestamps of shape (N, ) and
+    coordinates of shape (M, 1) give radiation of M stations at N moments.
+    http://www.pveducation.org/pvcdrom/properties-of-sunlight/calculation-of-solar-insolation
+
+    Args:
+        timestamps (array_like): UNIX timestamps in seconds
+        latitudes (array_like): latitudes between -90 and 90 degrees
+        longitudes (array_like): longitudes between -180 and 180 degrees, east is positive
+
+    Returns:
+        numpy.ndarray: solar radiation in W/m2
+    """
+    if numpy is None:
+        raise ImportError('NumPy is required for batch solar radiation calculation')
+
+    timestamps = numpy.asarray(timestamps, dtype=numpy.float64)
+    latitudes = numpy.radians(numpy.asarray(latitudes, dtype=numpy.float64))
+    longitudes = numpy.asarray(longitudes, dtype=numpy.float64)
+
+    # Day of year and UTC hour of every timestamp
+    seconds = numpy.floor(timestamps).astype('int64').astype('datetime64[s]')
+    day_of_year = (seconds.astype('datetime64[D]') - seconds.astype('datetime64[Y]')).astype('int64') + 1
+    utc_hour = numpy.mod(timestamps, 86400) / 3600.0
+
+    # Declination angle as in SolarRadiation.declination_angle
+    declination = numpy.radians(23.45 * numpy.sin(numpy.radians(360.0 / 365 * (day_of_year - 81))))
+
+    solar_hour = SolarRadiation.local_solar_time(utc_hour, day_of_year, longitudes, numpy)
+    hour_angle = numpy.radians(SolarRadiation.hour_angle(solar_hour))
+
+    # Sine of elevation angle is cosine of zenith angle used by air mass
+    sin_elevation = (numpy.sin(declination) * numpy.sin(latitudes) +
+        numpy.cos(declination) * numpy.cos(latitudes) * numpy.cos(hour_angle))
+
+    with numpy.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        air_mass = 1 / (1E-4 + sin_elevation)
+        radiation = 1353 * numpy.power(numpy.power(0.7, air_mass), 0.678)
+
+    # Night time and values over 1100 W/m2 (see SolarRadiation.radiation_by_air_mass) are zero
+    return numpy.where((sin_elevation > 0) & (radiation <= 1100), radiation, 0.0)
@@ -0,0 +1,186 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Readings history package.
+********************************************************************************************************************'''
+
+from collections import namedtuple
+from threading import Lock
+
+import mmap
+import os
+import struct
+
+# Record fields stored for every reading, followed by configured plugin fields
+READING_FIELDS = ('timestamp', 'temp_c', 'temp_f', 'humidity', 'pressure', 'cpu_temp')
+
+class ReadingRecord(namedtuple('ReadingRecord', 'index timestamp temp_c temp_f humidity pressure cpu_temp plugins_data')):
+    """Reading restored from buffer, plugins_data contains only plugin values present at write time."""
+    __slots__ = ()
+
+class ReadingsBuffer(object):
+    """
+    Fixed size memory mapped ring buffer of packed binary readings records.
+
+    File layout is a header followed by capacity records, each record is a row of little endian doubles.
+    Header keeps total number of written records, so readers (threads or other processes) can find
+    the oldest and the newest records without any locking and scan them in place.
+    Missing values are stored as NaN. Dirty pages are written back to disk by the kernel,
+    so restart resumes from the buffer instead of starting cold.
+    """
+
+    MAGIC = b'WSRBUF01'
+    VERSION = 1
+
+    # Magic, version, capacity, record size, total written records, comma separated plugin fields
+    FIELDS_SIZE = 256
+    HEADER = struct.Struct('<8sIIIQ{}s'.format(FIELDS_SIZE))
+    COUNT_OFFSET = struct.calcsize('<8sIII')
+    COUNT = struct.Struct('<Q')
+
+    def __init__(self, path, capacity=None, plugin_fields=(), readonly=False):
+        """
+        Opens existing buffer or creates new one.
+
+        Writer (readonly=False) recreates buffer if existing one has different layout.
+        Reader (readonly=True) takes capacity and plugin fields from existing buffer header.
+        """
+        self._path = path
+        self._readonly = readonly
+        self._lock = Lock()
+
+        if readonly:
+            self._file = open(path, 'rb')
+            header = self.HEADER.unpack(self._file.read(self.HEADER.size))
+            self._check_header(header)
+            capacity = header[2]
+            plugin_fields = tuple(field for field in header[5].rstrip(b'\0').decode('ascii').split(',') if field)
+        else:
+            plugin_fields = tuple(plugin_fields)
+
+        self._capacity = capacity
+        self._plugin_fields = plugin_fields
+        self._record = struct.Struct('<' + 'd' * (len(READING_FIELDS) + len(plugin_fields)))
+        self._size = self.HEADER.size + self._record.size * capacity
+
+        if readonly:
+            self._map = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+        else:
+            self._open_writer()
+
+    @property
+    def capacity(self):
+        """Maximum number of records kept."""
+        return self._capacity
+
+    @property
+    def plugin_fields(self):
+        """Plugin values stored in every record."""
+        return self._plugin_fields
+
+    @property
+    def count(self):
+        """Total number of records written since buffer creation."""
+        return self.COUNT.unpack_from(self._map, self.COUNT_OFFSET)[0]
+
+    def __len__(self):
+        return min(self.count, self._capacity)
+
+    def _check_header(self, header):
+        """Internal. Raises ValueError if header does not belong to readings buffer."""
+        if header[0] != self.MAGIC or header[1] != self.VERSION:
+            raise ValueError('{} is not a readings buffer'.format(self._path))
+
+    def _open_writer(self):
+        """Internal. Maps existing compatible buffer file, otherwise creates new empty one."""
+        fields = ','.join(self._plugin_fields).encode('ascii')
+
+        # Struct would silently truncate fields, so reader would get wrong record layout
+        if len(fields) > self.FIELDS_SIZE:
+            raise ValueError('Plugin fields take {} bytes, readings buffer header has room for {}'.format(len(fields), self.FIELDS_SIZE))
+
+        header = self.HEADER.pack(self.MAGIC, self.VERSION, self._capacity, self._record.size, 0, fields)
+        expected = self.HEADER.unpack(header)
+        resume = False
+
+        if os.path.isfile(self._path) and os.path.getsize(self._path) == self._size:
+            with open(self._path, 'rb') as existing:
+                existing_header = self.HEADER.unpack(existing.read(self.HEADER.size))
+
+            # Everything except written records counter should match to resume
+            resume = existing_header[:4] == expected[:4] and existing_header[5] == expected[5]
+
+        if not resume:
+            with open(self._path, 'wb') as new_file:
+                new_file.write(header)
+                new_file.truncate(self._size)
+
+        self._file = open(self._path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), self._size)
+
+    def append(self, snapshot):
+        """Packs snapshot into the next slot, overwriting the oldest record when buffer is full."""
+        plugins_data = snapshot.plugins_data or {}
+        values = [snapshot.timestamp, snapshot.temp_c, snapshot.temp_f, snapshot.humidity, snapshot.pressure, snapshot.cpu_temp]
+        values += [plugins_data.get(field) for field in self._plugin_fields]
+        values = [float('nan') if value is None else value for value in values]
+
+        with self._lock:
+            count = self.count
+            self._record.pack_into(self._map, self.HEADER.size + (count % self._capacity) * self._record.size, *values)
+
+            # Counter is updated after the record, so readers never see partially written newest record
+            self.COUNT.pack_into(self._map, self.COUNT_OFFSET, count + 1)
+
+    def records(self, last=None):
+        """
+        Yields records oldest first, unpacking them in place from the mapped file.
+
+        Once buffer is full, the oldest record is the next one to be overwritten, so capacity - 1 records are yielded.
+
+        Args:
+            last (int): number of the newest records to scan, all kept records if None
+        """
+        count = self.count
+        first = max(0, count - self._capacity)
+
+        if last is not None:
+            first = max(first, count - last)
+
+        for index in range(first, count):
+            values = self._record.unpack_from(self._map, self.HEADER.size + (index % self._capacity) * self._record.size)
+
+            # Writer packs record count into this slot before counter is incremented, so slot of
+            # index count - capacity (the oldest one, once buffer is full) may be half written, it is skipped
+            if index <= self.count - self._capacity:
+                continue
+
+            yield self._to_record(index, values)
+
+    def latest(self):
+        """Returns the newest record or None if buffer is empty."""
+        for record in self.records(last=1):
+            return record
+
+        return None
+
+    def _to_record(self, index, values):
+        """Internal. Converts unpacked values to ReadingRecord, NaN values become None."""
+        values = [None if value != value else value for value in values]
+        plugins_data = dict(
+            (field, value) for field, value in zip(self._plugin_fields, values[len(READING_FIELDS):]) if value is not None)
+
+        return ReadingRecord(index, *(values[:len(READING_FIELDS)] + [plugins_data]))
+
+    def flush(self):
+        """Forces mapped pages to disk."""
+        if not self._readonly:
+            self._map.flush()
+
+    def close(self):
+        """Flushes and unmaps buffer."""
+        self.flush()
+        self._map.close()
+        self._file.close()
@@ -0,0 +1,175 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Readings rollups package.
+    Rolls readings up into tiers of fixed resolution buckets (e.g. 1 minute, 1 hour, 1 day) as they arrive,
+    every tier keeps a fixed number of buckets, so memory is bounded however long station runs.
+********************************************************************************************************************'''
+
+from collections import deque, namedtuple
+from threading import Lock
+
+import numbers
+
+from aggregation import ChannelStats, RunningStats
+
+# Tiers as (name, resolution in seconds, number of buckets kept), resolution None keeps readings as they are
+DEFAULT_TIERS = (
+    ('raw', None, 720),
+    ('1m', 60, 1440),
+    ('1h', 3600, 720),
+    ('1d', 86400, 3650)
+)
+
+# Snapshot fields rolled up besides plugins values
+SNAPSHOT_CHANNELS = ('temp_c', 'humidity', 'pressure', 'cpu_temp')
+
+# Bucket of readings from start inclusive to end exclusive, channels is dictionary of channel to ChannelStats
+RollupBucket = namedtuple('RollupBucket', 'start end channels')
+
+class RawTier(object):
+    """Keeps the last size readings as they are, every reading is a bucket of one."""
+
+    def __init__(self, name, size):
+        self.name = name
+        self.resolution = None
+        self.size = size
+        self._readings = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self._readings)
+
+    def add(self, timestamp, values):
+        self._readings.append((timestamp, values))
+
+    def buckets(self, since=None, include_current=True):
+        """Returns list of RollupBucket of readings not older than since."""
+        return [RollupBucket(timestamp, timestamp, dict(
+                (channel, ChannelStats(1, value, value, value, 0.0)) for channel, value in values.items()))
+            for timestamp, values in self._readings if since is None or timestamp >= since]
+
+class RollupTier(object):
+    """
+    Aggregates readings into buckets aligned to multiples of resolution since epoch.
+
+    Only the current bucket keeps running statistics, it is closed once a reading of a later bucket arrives.
+    Readings older than the current bucket are added to it rather than reopening closed ones.
+    """
+
+    def __init__(self, name, resolution, size):
+        self.name = name
+        self.resolution = resolution
+        self.size = size
+        self._buckets = deque(maxlen=size)
+        self._start = None
+        self._stats = {}
+
+    def __len__(self):
+        # Only closed buckets, so full tier reports its size, the current bucket is not counted
+        return len(self._buckets)
+
+    def add(self, timestamp, values):
+        start = timestamp - timestamp % self.resolution
+
+        if self._start is not None and start > self._start:
+            self._close()
+
+        if self._start is None:
+            self._start = start
+
+        for channel, value in values.items():
+            channel_stats = self._stats.get(channel)
+
+            if channel_stats is None:
+                channel_stats = self._stats[channel] = RunningStats()
+
+            channel_stats.add(value)
+
+    def _close(self):
+        """Internal. Moves current bucket to closed ones, the oldest closed bucket is dropped if there are size of them."""
+        self._buckets.append(self._current())
+        self._start = None
+        self._stats = {}
+
+    def _current(self):
+        """Internal. Returns RollupBucket of current bucket statistics."""
+        return RollupBucket(self._start, self._start + self.resolution,
+            dict((channel, channel_stats.stats()) for channel, channel_stats in self._stats.items()))
+
+    def buckets(self, since=None, include_current=True):
+        """Returns list of RollupBucket ending after since, current not closed bucket is the last one if included."""
+        result = [bucket for bucket in self._buckets if since is None or bucket.end > since]
+
+        if include_current and self._start is not None:
+            result.append(self._current())
+
+        return result
+
+class Rollups(object):
+    """
+    Tiers of readings rollups, every reading is added to all tiers.
+
+    Readings are dictionaries of channel to numeric value, snapshots are rolled up with their
+    sensors values and numeric plugins values.
+    """
+
+    def __init__(self, tiers=DEFAULT_TIERS):
+        self._tiers = [RawTier(name, size) if resolution is None else RollupTier(name, resolution, size)
+            for name, resolution, size in tiers]
+        self._lock = Lock()
+
+    @property
+    def tiers(self):
+        """Returns tuple of tier names, from the finest to the coarsest."""
+        return tuple(tier.name for tier in self._tiers)
+
+    @property
+    def stats(self):
+        """Returns dictionary of tier name to number of closed buckets (readings for raw tier) it keeps."""
+        with self._lock:
+            return dict((tier.name, len(tier)) for tier in self._tiers)
+
+    def add(self, timestamp, values):
+        """Adds reading to all tiers, None and not numeric values are skipped."""
+        values = dict((channel, value) for channel, value in values.items()
+            if isinstance(value, numbers.Number) and not isinstance(value, bool))
+
+        with self._lock:
+            for tier in self._tiers:
+                tier.add(timestamp, values)
+
+    def add_snapshot(self, snapshot):
+        """Adds sensors snapshot, used as sampler subscriber."""
+        values = dict(snapshot.plugins_data or {})
+        values.update((channel, getattr(snapshot, channel)) for channel in SNAPSHOT_CHANNELS)
+
+        self.add(snapshot.timestamp, values)
+
+    def buckets(self, tier, since=None, include_current=True):
+        """
+        Returns buckets of tier.
+
+        Args:
+            tier (str): tier name
+            since (float): UNIX timestamp, older buckets are skipped, None returns all kept buckets
+            include_current (bool): if True current not closed bucket is included
+
+        Returns:
+            list: RollupBucket objects, the oldest first
+        """
+        with self._lock:
+            for rollup_tier in self._tiers:
+                if rollup_tier.name == tier:
+                    return rollup_tier.buckets(since, include_current)
+
+        raise KeyError('Unknown rollup tier: {}'.format(tier))
+
+    def select_tier(self, span, max_buckets):
+        """Returns name of the finest tier, which covers span seconds with at most max_buckets buckets."""
+        for tier in self._tiers:
+            if tier.resolution and span / float(tier.resolution) <= max_buckets and tier.resolution * tier.size >= span:
+                return tier.name
+
+        return self._tiers[-1].name
@@ -0,0 +1,108 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Sensors sampling package.
+********************************************************************************************************************'''
+
+from collections import deque, namedtuple
+from threading import Lock
+
+import logging
+import math
+
+class SensorsSnapshot(namedtuple('SensorsSnapshot', 'timestamp temp_c temp_f humidity pressure cpu_temp plugins_data aggregates')):
+    """
+    Immutable timestamped sensors readings, shared by all consumers.
+
+    Plugins data is the latest collected plugins values dictionary, consumers should not modify it.
+    Aggregates are set only for snapshots reduced from oversampled readings: dictionary of channel
+    to its count, min, max, mean and std dictionary, sensors values are then the means.
+    """
+    __slots__ = ()
+
+    @property
+    def sensors_data(self):
+        """Returns sensors data tuple in the same order as WeatherStation.get_sensors_data."""
+        return (self.temp_c, self.temp_f, self.humidity, self.pressure)
+
+# Only oversampled snapshots have aggregates
+SensorsSnapshot.__new__.__defaults__ = (None, )
+
+def finite_or_none(value):
+    """Returns value with NaN and infinite floats, which JSON can not represent, replaced by None."""
+    if isinstance(value, float):
+        return value if not (math.isnan(value) or math.isinf(value)) else None
+
+    if isinstance(value, dict):
+        return dict((key, finite_or_none(item)) for key, item in value.items())
+
+    if isinstance(value, (list, tuple)):
+        return [finite_or_none(item) for item in value]
+
+    return value
+
+class Sampler(object):
+    """
+    Single source of sensors readings.
+
+    Sample is called by scheduler at one configured rate and keeps the latest snapshots,
+    so logging, display and upload never touch the hardware themselves.
+    """
+
+    def __init__(self, read_function, history_size):
+        # Function returning new SensorsSnapshot, the only place hardware is touched
+        self._read_function = read_function
+
+        # We use deque with maxlen here, so old snapshots are dropped without extra work
+        self._history = deque(maxlen=history_size)
+        self._lock = Lock()
+
+        # Functions called with every new snapshot
+        self._subscribers = []
+
+    @property
+    def latest(self):
+        """Returns the latest snapshot or None if nothing was sampled yet."""
+        with self._lock:
+            return self._history[-1] if self._history else None
+
+    def window(self, seconds=None):
+        """
+        Returns tuple of recent snapshots, oldest first.
+
+        If seconds are provided, only snapshots not older than given seconds from the latest one are returned.
+        """
+        with self._lock:
+            snapshots = tuple(self._history)
+
+        if seconds is None or not snapshots:
+            return snapshots
+
+        since = snapshots[-1].timestamp - seconds
+        return tuple(snapshot for snapshot in snapshots if snapshot.timestamp >= since)
+
+    def subscribe(self, callback):
+        """Registers function to be called with every new snapshot."""
+        self._subscribers.append(callback)
+
+    def seed(self, snapshots):
+        """Fills history with previously stored snapshots, oldest first, e.g. after restart."""
+        with self._lock:
+            self._history.extend(snapshots)
+
+    def sample(self):
+        """Reads sensors once, stores, notifies subscribers and returns the new snapshot."""
+        snapshot = self._read_function()
+
+        with self._lock:
+            self._history.append(snapshot)
+
+        for callback in self._subscribers:
+            try:
+                callback(snapshot)
+            except:
+                logging.warning('Snapshot subscriber failed', exc_info=True)
+
+        return snapshot
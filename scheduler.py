@@ -0,0 +1,180 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Periodic jobs scheduler package.
+********************************************************************************************************************'''
+
+from threading import Condition, Thread, current_thread
+
+import heapq
+import logging
+import math
+
+from clock import SystemClock
+from metrics import SCHEDULER_OVERRUNS, SCHEDULER_SKIPPED_TICKS
+
+class Job(object):
+    """Periodic job, keeps its schedule and run statistics."""
+
+    def __init__(self, name, interval, callback, order):
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+
+        # Jobs with the same deadline run in the order they were added
+        self.order = order
+        self.deadline = None
+
+        # Run statistics
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.last_delay = 0
+        self.last_duration = 0
+
+    def __repr__(self):
+        """Return a String representation"""
+        return 'Job {0}: every {1} s, runs: {2}, overruns: {3}, skipped ticks: {4}'.format(
+            self.name, self.interval, self.runs, self.overruns, self.skipped)
+
+class Scheduler(object):
+    """
+    Runs all periodic jobs in one thread from a heap of deadlines.
+
+    Deadlines are aligned to monotonic clock interval boundaries and do not drift by callback duration.
+    If a job runs late, missed ticks are skipped (coalesced into one run) and overrun is reported.
+    Jobs run either in scheduler thread (start) or in calling thread for given time (run).
+    """
+
+    def __init__(self, clock=None):
+        self._clock = clock or SystemClock()
+        self._heap = []
+        self._jobs = []
+        self._condition = Condition()
+        self._running = False
+        self._thread = None
+
+    @property
+    def jobs(self):
+        """Returns tuple of scheduled jobs."""
+        return tuple(self._jobs)
+
+    def add_job(self, name, interval, callback, run_now=False):
+        """
+        Schedules callback to be called every interval seconds.
+
+        Args:
+            name (str): job name used for reporting
+            interval (float): interval in seconds
+            callback (function): function without arguments
+            run_now (bool): if True first run is immediate, otherwise on the next interval boundary
+
+        Returns:
+            Job: scheduled job
+        """
+        with self._condition:
+            job = Job(name, interval, callback, len(self._jobs))
+            now = self._clock.monotonic()
+            job.deadline = now if run_now else math.floor(now / interval + 1) * interval
+
+            self._jobs.append(job)
+            heapq.heappush(self._heap, (job.deadline, job.order, job))
+            self._condition.notify()
+
+        return job
+
+    def start(self):
+        """Starts scheduler thread, running flag is set here, so stop called before thread runs is not lost."""
+        self._running = True
+        self._thread = Thread(target=self._run_jobs, name='Scheduler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops scheduler thread, job running at the moment is not interrupted."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+    def join(self, timeout=None):
+        """
+        Waits until scheduler thread exits, after stop it is when job running at the moment returns.
+
+        Returns:
+            bool: True if thread is not running, False if timeout expired
+        """
+        if self._thread is None or self._thread is current_thread():
+            return True
+
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _next_job(self, until):
+        """Internal. Waits until the earliest deadline, returns due job or None if stopped or until time is reached."""
+        with self._condition:
+            while self._running:
+                now = self._clock.monotonic()
+
+                if self._heap and self._heap[0][0] <= now:
+                    return heapq.heappop(self._heap)[2]
+
+                if until is not None and now >= until:
+                    break
+
+                timeout = self._heap[0][0] - now if self._heap else None
+
+                if until is not None:
+                    timeout = until - now if timeout is None else min(timeout, until - now)
+
+                self._clock.wait(self._condition, timeout)
+
+        return None
+
+    def _reschedule(self, job, finished):
+        """Internal. Sets next deadline on interval boundary, skipping ticks which are already missed."""
+        next_deadline = job.deadline + job.interval
+
+        if next_deadline <= finished:
+            missed = int((finished - job.deadline) // job.interval)
+            next_deadline = job.deadline + (missed + 1) * job.interval
+            job.overruns += 1
+            job.skipped += missed
+            SCHEDULER_OVERRUNS.inc(job=job.name)
+            SCHEDULER_SKIPPED_TICKS.inc(missed, job=job.name)
+            logging.warning('%s job overran: started %.3f s late, took %.3f s, skipped %s ticks',
+                job.name, job.last_delay, job.last_duration, missed)
+
+        with self._condition:
+            job.deadline = next_deadline
+            heapq.heappush(self._heap, (job.deadline, job.order, job))
+
+    def run(self, duration=None):
+        """Runs due jobs in calling thread until stopped or, if provided, for duration seconds of scheduler clock."""
+        self._running = True
+        self._run_jobs(duration)
+
+    def _run_jobs(self, duration=None):
+        """Internal. Runs due jobs until stopped or duration expires, running flag should be already set."""
+        until = None if duration is None else self._clock.monotonic() + duration
+
+        while True:
+            job = self._next_job(until)
+
+            if not job:
+                return
+
+            started = self._clock.monotonic()
+
+            try:
+                job.callback()
+            except:
+                logging.warning('Unexpected error occured in %s job', job.name, exc_info=True)
+
+            finished = self._clock.monotonic()
+            job.runs += 1
+            job.last_delay = started - job.deadline
+            job.last_duration = finished - started
+
+            self._reschedule(job, finished)
@@ -0,0 +1,265 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Scrolling text package.
+    Renders text scroll frames the same way SenseHat.show_message does, caches them per message
+    and plays them in background, so scrolling does not block the caller and can be interrupted.
+********************************************************************************************************************'''
+
+from threading import Condition, Thread
+
+import logging
+
+from clock import SystemClock
+from display import IndexedFrame
+
+# SenseHat.show_message scrolls text with rotation turned by 90 degrees counterclockwise,
+# so glyph rows become columns, station always shows messages from rotation 0
+SCROLL_ROTATION = 270
+
+# Glyph pixel which is part of a character, the rest are background
+GLYPH_PIXEL = [255, 255, 255]
+
+def render_scroll_indices(sense_hat, text):
+    """
+    Renders all frames of text scrolling over LED matrix, as SenseHat.show_message does, as palette indices.
+
+    Args:
+        sense_hat (object): Sense HAT like object, provides glyphs with _get_char_pixels and _trim_whitespace
+        text (str): text to scroll
+
+    Returns:
+        tuple: 64 bytes per frame, index 0 is background and 1 is text, to be shown with SCROLL_ROTATION
+    """
+    # Text is preceded and followed by a blank screen, characters are separated by a blank row
+    indices = bytearray(64)
+
+    for character in text:
+        indices.extend(1 if pixel == GLYPH_PIXEL else 0
+            for pixel in sense_hat._trim_whitespace(sense_hat._get_char_pixels(character)))
+        indices.extend(bytearray(8))
+
+    indices.extend(bytearray(64))
+
+    # Every frame is shifted by one row of 8 pixels
+    return tuple(bytes(indices[start:start + 64]) for start in range(0, len(indices) - 64, 8))
+
+def render_scroll_frames(sense_hat, text, text_colour, back_colour):
+    """Renders all frames of text scrolling over LED matrix, returns tuple of IndexedFrame."""
+    palette = (tuple(back_colour), tuple(text_colour))
+    return tuple(IndexedFrame(indices, palette) for indices in render_scroll_indices(sense_hat, text))
+
+class ScrollFrameCache(object):
+    """
+    Scroll frames per message and colours, rendered on first use or in advance with prerender.
+
+    Glyphs are rendered once per text, the same text in other colours only gets another palette.
+    """
+
+    def __init__(self, sense_hat):
+        self._sense_hat = sense_hat
+        self._indices = {}
+        self._frames = {}
+
+    @property
+    def supported(self):
+        """Returns True if Sense HAT like object provides glyphs, otherwise its show_message should be used."""
+        return hasattr(self._sense_hat, '_get_char_pixels') and hasattr(self._sense_hat, '_trim_whitespace')
+
+    def frames(self, text, text_colour, back_colour=(0, 0, 0)):
+        """Returns cached scroll frames of text, renders them if there are none yet."""
+        key = (text, tuple(text_colour), tuple(back_colour))
+        frames = self._frames.get(key)
+
+        if frames is None:
+            indices = self._indices.get(text)
+
+            if indices is None:
+                indices = self._indices[text] = render_scroll_indices(self._sense_hat, text)
+
+            palette = (key[2], key[1])
+            frames = self._frames[key] = tuple(IndexedFrame(frame_indices, palette) for frame_indices in indices)
+
+        return frames
+
+    def prerender(self, messages):
+        """Renders frames for iterable of (text, text_colour, back_colour) tuples."""
+        for message in messages:
+            self.frames(*message)
+
+class ScrollPlayer(object):
+    """
+    Plays scroll frames through display writer, frames are due every frame interval of clock.
+
+    Once started, frames are shown in player thread. Without thread, e.g. with virtual clock which
+    can not be waited on by several threads, frames due by clock time are shown whenever player is used.
+    Playing new frames or cancelling stops current playback at once, the frame being written is
+    written in full, so any display write done after play or cancel call is not overdrawn.
+    Callback passed to play is called once all frames are shown, not if cancelled.
+    Callback errors are logged and failed display write drops the playback, so player keeps running.
+    """
+
+    def __init__(self, display, frame_interval, clock=None):
+        self._display = display
+        self._frame_interval = frame_interval
+        self._clock = clock or SystemClock()
+        self._condition = Condition()
+        self._running = False
+        self._thread = None
+
+        # Current playback, frames is None if nothing is played
+        self._frames = None
+        self._rotation = SCROLL_ROTATION
+        self._on_finished = None
+        self._index = 0
+        self._deadline = 0
+
+        # Playback counters
+        self.started = 0
+        self.finished = 0
+        self.cancelled = 0
+        self.frames_shown = 0
+
+    @property
+    def playing(self):
+        """Returns True if frames are being played."""
+        self._catch_up()
+        return self._frames is not None
+
+    @property
+    def stats(self):
+        """Returns dictionary of playback counters."""
+        self._catch_up()
+
+        return {
+            'started': self.started,
+            'finished': self.finished,
+            'cancelled': self.cancelled,
+            'frames_shown': self.frames_shown
+        }
+
+    def start(self):
+        """Starts player thread."""
+        self._running = True
+        self._thread = Thread(target=self._run, name='ScrollPlayer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops player thread and waits for it, current playback is cancelled."""
+        self._catch_up()
+
+        with self._condition:
+            self._running = False
+            self._cancel()
+            self._condition.notify()
+
+        if self._thread:
+            self._thread.join()
+
+    def play(self, frames, rotation=SCROLL_ROTATION, on_finished=None):
+        """Starts playing frames, replacing current playback."""
+        self._catch_up()
+
+        with self._condition:
+            self._cancel()
+            self._frames = frames
+            self._rotation = rotation
+            self._on_finished = on_finished
+            self._index = 0
+            self._deadline = self._clock.monotonic()
+            self.started += 1
+            self._condition.notify()
+
+    def cancel(self):
+        """Stops current playback, if any."""
+        self._catch_up()
+
+        with self._condition:
+            self._cancel()
+            self._condition.notify()
+
+    def _cancel(self):
+        """Internal. Drops current playback, called with condition acquired."""
+        if self._frames is not None:
+            self._frames = None
+            self._on_finished = None
+            self.cancelled += 1
+
+    def _show_due(self, now):
+        """
+        Internal. Shows frames due by now, called with condition acquired.
+
+        Frame is written holding condition, so it can not overdraw writes done after cancel.
+        If write fails playback is cancelled, so failing frame is not retried forever.
+
+        Returns:
+            function: callback to be called without condition, if playback is finished
+        """
+        while self._frames is not None and self._deadline <= now:
+            try:
+                self._display.write(self._frames[self._index], self._rotation)
+            except:
+                self._cancel()
+                raise
+
+            self.frames_shown += 1
+            self._index += 1
+            self._deadline += self._frame_interval
+
+            if self._index == len(self._frames):
+                on_finished = self._on_finished
+                self._frames = None
+                self._on_finished = None
+                self.finished += 1
+                return on_finished
+
+        return None
+
+    def _catch_up(self):
+        """Internal. Shows frames due by clock time, if there is no player thread to show them."""
+        if self._running:
+            return
+
+        with self._condition:
+            on_finished = self._show_due(self._clock.monotonic())
+
+        self._notify_finished(on_finished)
+
+    def _notify_finished(self, on_finished):
+        """Internal. Calls finished callback if any, callback error is logged, so player is not stopped by it."""
+        if not on_finished:
+            return
+
+        try:
+            on_finished()
+        except:
+            logging.warning('Unexpected error occured in scroll finished callback', exc_info=True)
+
+    def _run(self):
+        """Internal. Shows every frame at its deadline, until stopped."""
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+
+                if self._frames is None:
+                    self._condition.wait()
+                    continue
+
+                timeout = self._deadline - self._clock.monotonic()
+
+                # Waiting is interrupted by play, cancel or stop, which change what should be shown
+                if timeout > 0:
+                    self._clock.wait(self._condition, timeout)
+                    continue
+
+                try:
+                    on_finished = self._show_due(self._deadline)
+                except:
+                    logging.warning('Unexpected error occured while showing scroll frame', exc_info=True)
+                    continue
+
+            self._notify_finished(on_finished)
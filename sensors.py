@@ -0,0 +1,231 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Environmental sensors backends package.
+    Every backend reads each Sense HAT chip (HTS221 humidity, LPS25H pressure) once per sample
+    and returns all their channels together with one timestamp.
+********************************************************************************************************************'''
+
+from abc import ABCMeta, abstractmethod, abstractproperty
+from collections import namedtuple
+from threading import Lock
+
+import os
+
+# All environmental channels read for one sample, humidity in %rH, pressure in millibars, temperatures in celsius
+SensorsReading = namedtuple('SensorsReading', 'timestamp humidity temp_from_humidity pressure temp_from_pressure')
+
+class SensorsBackend(object):
+    """Base class for environmental sensors backends."""
+    __metaclass__ = ABCMeta
+
+    @abstractproperty
+    def backend_name(self):
+        """Returns backend name."""
+        pass
+
+    @abstractmethod
+    def read(self):
+        """Reads every chip once, returns SensorsReading."""
+        pass
+
+    def close(self):
+        """Releases resources held by backend if any."""
+        pass
+
+class SenseHatSensors(SensorsBackend):
+    """
+    Reads sensors through sense_hat library.
+
+    Each chip is read by one RTIMU call returning its value and temperature together, the same call
+    sense_hat getters make one channel at a time. Sense HAT like objects without RTIMU sensors,
+    e.g. older library versions, are read with four getters.
+    """
+
+    def __init__(self, sense_hat, clock):
+        self._sense_hat = sense_hat
+        self._clock = clock
+        self._lock = Lock()
+        self._rtimu = hasattr(sense_hat, '_init_humidity') and hasattr(sense_hat, '_init_pressure')
+
+        if self._rtimu:
+            sense_hat._init_humidity()
+            sense_hat._init_pressure()
+
+    @property
+    def backend_name(self):
+        return 'rtimu' if self._rtimu else 'sense_hat'
+
+    def read(self):
+        with self._lock:
+            timestamp = self._clock.time()
+
+            if not self._rtimu:
+                return SensorsReading(
+                    timestamp,
+                    self._sense_hat.get_humidity(),
+                    self._sense_hat.get_temperature_from_humidity(),
+                    self._sense_hat.get_pressure(),
+                    self._sense_hat.get_temperature_from_pressure())
+
+            # Both return (value valid, value, temperature valid, temperature), invalid values are 0 as in sense_hat
+            humidity_valid, humidity, humidity_temp_valid, humidity_temp = self._sense_hat._humidity.humidityRead()
+            pressure_valid, pressure, pressure_temp_valid, pressure_temp = self._sense_hat._pressure.pressureRead()
+
+        return SensorsReading(
+            timestamp,
+            humidity if humidity_valid else 0,
+            humidity_temp if humidity_temp_valid else 0,
+            pressure if pressure_valid else 0,
+            pressure_temp if pressure_temp_valid else 0)
+
+def _signed(value, bits):
+    """Internal. Converts two's complement value of given bits to signed integer."""
+    return value - (1 << bits) if value & (1 << (bits - 1)) else value
+
+def _word(data, index):
+    """Internal. Returns signed 16 bits little endian word from data bytes at index."""
+    return _signed(data[index] | data[index + 1] << 8, 16)
+
+class I2cSensors(SensorsBackend):
+    """
+    Reads HTS221 and LPS25H registers directly over I2C.
+
+    Each chip output registers are read with one auto incremented block read, so humidity and its
+    temperature, pressure and its temperature are from the same conversion. HTS221 calibration is
+    read once. Chips are configured as RTIMU library does, including internal averaging.
+    """
+
+    I2C_DEVICE = '/dev/i2c-{}'
+
+    # Register address bit enabling address auto increment for block reads
+    AUTO_INCREMENT = 0x80
+
+    HTS221_ADDRESS = 0x5F
+    HTS221_AV_CONF = 0x10
+    HTS221_AVERAGING = 0x1B # 32 humidity and 16 temperature internal averages
+    HTS221_CTRL_REG1 = 0x20
+    HTS221_POWER_ON = 0x87 # powered, block data update, 12.5 Hz
+    HTS221_OUTPUT = 0x28 # humidity and temperature, 2 bytes each
+    HTS221_CALIBRATION = 0x30 # 16 bytes
+
+    LPS25H_ADDRESS = 0x5C
+    LPS25H_RES_CONF = 0x10
+    LPS25H_AVERAGING = 0x05 # 32 pressure and 16 temperature internal averages
+    LPS25H_CTRL_REG1 = 0x20
+    LPS25H_POWER_ON = 0xC4 # powered, 25 Hz, block data update
+    LPS25H_CTRL_REG2 = 0x21
+    LPS25H_FIFO_ENABLE = 0x40
+    LPS25H_FIFO_CTRL = 0x2E
+    LPS25H_FIFO_MEAN = 0xC0 # output is running mean of FIFO samples
+    LPS25H_OUTPUT = 0x28 # pressure 3 bytes and temperature 2 bytes
+
+    def __init__(self, clock, bus_number=1):
+        # Imported here, so smbus is needed only if I2C backend is used
+        try:
+            import smbus
+        except ImportError:
+            import smbus2 as smbus
+
+        self._clock = clock
+        self._lock = Lock()
+        self._bus = smbus.SMBus(bus_number)
+
+        try:
+            # The same registers and order as RTIMU library, so readings have the same noise as sense_hat ones
+            self._bus.write_byte_data(self.HTS221_ADDRESS, self.HTS221_CTRL_REG1, self.HTS221_POWER_ON)
+            self._bus.write_byte_data(self.HTS221_ADDRESS, self.HTS221_AV_CONF, self.HTS221_AVERAGING)
+            self._bus.write_byte_data(self.LPS25H_ADDRESS, self.LPS25H_CTRL_REG1, self.LPS25H_POWER_ON)
+            self._bus.write_byte_data(self.LPS25H_ADDRESS, self.LPS25H_RES_CONF, self.LPS25H_AVERAGING)
+            self._bus.write_byte_data(self.LPS25H_ADDRESS, self.LPS25H_FIFO_CTRL, self.LPS25H_FIFO_MEAN)
+            self._bus.write_byte_data(self.LPS25H_ADDRESS, self.LPS25H_CTRL_REG2, self.LPS25H_FIFO_ENABLE)
+            self._read_calibration()
+        except:
+            self._bus.close()
+            raise
+
+    @property
+    def backend_name(self):
+        return 'i2c'
+
+    @classmethod
+    def available(cls, bus_number=1):
+        """Returns True if I2C bus device exists and smbus module is installed."""
+        if not os.path.exists(cls.I2C_DEVICE.format(bus_number)):
+            return False
+
+        for module in ('smbus', 'smbus2'):
+            try:
+                __import__(module)
+                return True
+            except ImportError:
+                pass
+
+        return False
+
+    def _block(self, address, register, length):
+        """Internal. Reads length bytes starting from register with auto increment."""
+        return self._bus.read_i2c_block_data(address, register | self.AUTO_INCREMENT, length)
+
+    def _read_calibration(self):
+        """Internal. Reads HTS221 calibration, values are interpolated between two calibration points."""
+        data = self._block(self.HTS221_ADDRESS, self.HTS221_CALIBRATION, 16)
+
+        self._h0_rh = data[0] / 2.0
+        self._h1_rh = data[1] / 2.0
+        self._t0_degc = ((data[5] & 0x03) << 8 | data[2]) / 8.0
+        self._t1_degc = ((data[5] & 0x0C) << 6 | data[3]) / 8.0
+        self._h0_t0_out = _word(data, 6)
+        self._h1_t0_out = _word(data, 10)
+        self._t0_out = _word(data, 12)
+        self._t1_out = _word(data, 14)
+
+    def read(self):
+        with self._lock:
+            timestamp = self._clock.time()
+            hts221 = self._block(self.HTS221_ADDRESS, self.HTS221_OUTPUT, 4)
+            lps25h = self._block(self.LPS25H_ADDRESS, self.LPS25H_OUTPUT, 5)
+
+        humidity_out, temp_out = _word(hts221, 0), _word(hts221, 2)
+
+        humidity = self._h0_rh + (humidity_out - self._h0_t0_out) * (self._h1_rh - self._h0_rh) / float(self._h1_t0_out - self._h0_t0_out)
+        humidity_temp = self._t0_degc + (temp_out - self._t0_out) * (self._t1_degc - self._t0_degc) / float(self._t1_out - self._t0_out)
+
+        pressure = _signed(lps25h[0] | lps25h[1] << 8 | lps25h[2] << 16, 24) / 4096.0
+        pressure_temp = 42.5 + _word(lps25h, 3) / 480.0
+
+        return SensorsReading(timestamp, max(0.0, min(100.0, humidity)), humidity_temp, pressure, pressure_temp)
+
+    def close(self):
+        self._bus.close()
+
+def create_sensors_backend(sense_hat, clock, backend='auto'):
+    """
+    Creates sensors backend by its name.
+
+    Args:
+        sense_hat (object): Sense HAT like object, used by sense_hat backend
+        clock (object): clock timestamping readings
+        backend (str): one of 'auto', 'i2c', 'sense_hat', auto prefers I2C if it is available
+
+    Returns:
+        SensorsBackend: backend instance
+    """
+    if backend == 'sense_hat':
+        return SenseHatSensors(sense_hat, clock)
+
+    if backend == 'i2c':
+        return I2cSensors(clock)
+
+    if backend == 'auto':
+        if I2cSensors.available():
+            try:
+                return I2cSensors(clock)
+            except (IOError, OSError):
+                pass
+
+        return SenseHatSensors(sense_hat, clock)
+
+    raise ValueError('Unknown sensors backend: {}'.format(backend))
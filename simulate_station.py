@@ -0,0 +1,85 @@
+#!/usr/bin/python
+
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Runs Weather Station against simulated Sense HAT and virtual clock, no hardware or waiting required.
+    Uploads and readings history on disk are disabled, station output is hidden unless --verbose is used.
+
+    Examples:
+        python simulate_station.py --days 30
+        python simulate_station.py --days 7 --trace recorded.csv --joystick-interval 600
+********************************************************************************************************************'''
+
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import sys
+import time
+
+from clock import VirtualClock
+from config import Config
+from hardware import DIRECTION_DOWN, DIRECTION_LEFT, DIRECTION_RIGHT, DIRECTION_UP
+from simulation import CsvTrace, SimulatedCpuTemperature, SimulatedSenseHat, SyntheticTrace
+from weather_station import WeatherStation
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Runs Weather Station with simulated hardware and virtual clock.')
+    parser.add_argument('--days', type=float, default=30, help='simulated station run time in days')
+    parser.add_argument('--trace', help='CSV file with recorded readings, synthetic readings are used if omitted')
+    parser.add_argument('--seed', type=int, default=None, help='random seed for synthetic readings and joystick')
+    parser.add_argument('--joystick-interval', type=float, default=3600, help='seconds between joystick presses, 0 disables')
+    parser.add_argument('--verbose', action='store_true', help='show station console output')
+
+    return parser.parse_args()
+
+def main():
+    arguments = parse_arguments()
+
+    # Nothing leaves the simulated station
+    Config.WEATHER_UPLOAD = False
+    Config.HISTORY_BUFFER_PATH = None
+
+    clock = VirtualClock()
+    trace = CsvTrace(arguments.trace, clock.time()) if arguments.trace else SyntheticTrace(arguments.seed)
+    sense_hat = SimulatedSenseHat(clock, trace)
+    station = WeatherStation(clock, sense_hat, SimulatedCpuTemperature(clock, trace))
+
+    if arguments.joystick_interval:
+        directions = (DIRECTION_UP, DIRECTION_DOWN, DIRECTION_LEFT, DIRECTION_RIGHT)
+        joystick_random = random.Random(arguments.seed)
+        station.scheduler.add_job(
+            'Joystick', arguments.joystick_interval, lambda: sense_hat.stick.push(joystick_random.choice(directions)))
+
+    stdout = sys.stdout
+
+    if not arguments.verbose:
+        sys.stdout = open(os.devnull, 'w')
+
+    started = time.time()
+
+    try:
+        station.activate_sensors()
+        station.run_station(arguments.days * 86400)
+        station.stop_station()
+    finally:
+        sys.stdout = stdout
+
+    print('Simulated %s days in %.1f seconds' % (arguments.days, time.time() - started))
+    print('Sensor reads: %s, LED pixel writes: %s' % (sense_hat.sensor_reads, sense_hat.pixel_writes))
+    print('Display: %s' % station.display_stats)
+    print('Scroll: %s' % station.scroll_stats)
+    print('Rollups: %s' % station.rollups.stats if station.rollups else 'Rollups: disabled')
+
+    for job in station.scheduler.jobs:
+        print(job)
+
+    print('Latest snapshot: %s' % (station.latest_snapshot, ))
+    print(station.startup.report())
+
+if __name__ == '__main__':
+    main()
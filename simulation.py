@@ -0,0 +1,240 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Simulated hardware package.
+    Emulates Sense HAT sensors, LED matrix and joystick, and vcgencmd CPU temperature,
+    replaying recorded or synthetic sensors traces against station clock.
+********************************************************************************************************************'''
+
+from bisect import bisect_right
+from collections import namedtuple
+
+import csv
+import math
+import random
+
+from clock import SystemClock
+from cpu_temperature import CpuTemperatureSource
+from hardware import ACTION_RELEASED
+
+# Same fields as sense_hat.stick.InputEvent
+InputEvent = namedtuple('InputEvent', ('timestamp', 'direction', 'action'))
+
+# Raw readings of Sense HAT sensors and CPU at some moment
+TraceReading = namedtuple('TraceReading', 'temp_from_humidity temp_from_pressure humidity pressure cpu_temp')
+
+class SyntheticTrace(object):
+    """
+    Generates plausible readings: daily temperature cycle, humidity following temperature,
+    slow pressure waves and sensors heated by CPU, all with a bit of noise.
+    """
+
+    # Temperature compensation factor used by WeatherStation.get_temperature
+    CPU_FACTOR = 0.69
+
+    def __init__(self, seed=None, mean_temp=15.0, daily_amplitude=6.0, mean_pressure=1013.0, cpu_heat=25.0):
+        self._random = random.Random(seed)
+        self._mean_temp = mean_temp
+        self._daily_amplitude = daily_amplitude
+        self._mean_pressure = mean_pressure
+        self._cpu_heat = cpu_heat
+
+    def reading(self, timestamp):
+        """Returns TraceReading for given UNIX timestamp."""
+        noise = self._random.gauss
+
+        # Warmest at 15:00 and coldest at 03:00 UTC
+        day_phase = 2 * math.pi * ((timestamp % 86400) / 86400.0 - 0.375)
+        temp = self._mean_temp + self._daily_amplitude * math.sin(day_phase) + noise(0, 0.2)
+        humidity = max(0.0, min(100.0, 60 - 2.5 * (temp - self._mean_temp) + noise(0, 1)))
+        pressure = self._mean_pressure + 8 * math.sin(2 * math.pi * timestamp / (5 * 86400.0)) + noise(0, 0.3)
+        cpu_temp = temp + self._cpu_heat + noise(0, 0.5)
+
+        # Sensors are heated by CPU, so that station compensation gives back the ambient temperature
+        sensors_temp = (temp + cpu_temp / self.CPU_FACTOR) / (1 + 1 / self.CPU_FACTOR)
+
+        return TraceReading(sensors_temp + noise(0, 0.1), sensors_temp + noise(0, 0.1), humidity, pressure, cpu_temp)
+
+class CsvTrace(object):
+    """
+    Replays recorded readings from CSV file with header:
+    timestamp,temp_from_humidity,temp_from_pressure,humidity,pressure,cpu_temp
+
+    Recording is replayed relative to its first timestamp from given start time,
+    and looped if simulation runs longer than recording.
+    """
+
+    def __init__(self, path, start_time):
+        with open(path) as trace_file:
+            rows = sorted((float(row['timestamp']), TraceReading(*(float(row[field]) for field in TraceReading._fields)))
+                for row in csv.DictReader(trace_file))
+
+        if not rows:
+            raise ValueError('Trace {} has no readings'.format(path))
+
+        first = rows[0][0]
+        self._offsets = [timestamp - first for timestamp, _ in rows]
+        self._readings = [reading for _, reading in rows]
+        self._start_time = start_time
+
+        # Recording is looped with the step between its last two readings
+        step = self._offsets[-1] - self._offsets[-2] if len(rows) > 1 else 1
+        self._duration = self._offsets[-1] + step
+
+    def reading(self, timestamp):
+        offset = (timestamp - self._start_time) % self._duration
+        return self._readings[max(0, bisect_right(self._offsets, offset) - 1)]
+
+class SimulatedStick(object):
+    """Joystick emulation with sense_hat.stick handlers interface."""
+
+    def __init__(self, clock):
+        self._clock = clock
+        self.direction_up = None
+        self.direction_down = None
+        self.direction_left = None
+        self.direction_right = None
+        self.direction_middle = None
+        self.direction_any = None
+
+    def push(self, direction, action=ACTION_RELEASED):
+        """Emulates joystick event, calls assigned handlers."""
+        event = InputEvent(self._clock.time(), direction, action)
+
+        for handler in (getattr(self, 'direction_{}'.format(direction)), self.direction_any):
+            if handler:
+                handler(event)
+
+class SimulatedRtimuSensor(object):
+    """Emulates RTIMU humidity or pressure sensor of sense_hat library, returns value and temperature together."""
+
+    def __init__(self, sense_hat):
+        self._sense_hat = sense_hat
+
+    def humidityRead(self):
+        reading = self._sense_hat._reading()
+        return (True, reading.humidity, True, reading.temp_from_humidity)
+
+    def pressureRead(self):
+        reading = self._sense_hat._reading()
+        return (True, reading.pressure, True, reading.temp_from_pressure)
+
+class SimulatedSenseHat(object):
+    """
+    Sense HAT emulation with sense_hat.SenseHat interface used by station.
+
+    Sensors return trace readings for the current time of the clock, LED matrix keeps pixels in memory.
+    Glyphs are made up from character codes, so scroll frames are rendered as for real Sense HAT.
+    Messages shown with show_message are not scrolled, they are recorded and the matrix is filled with background color.
+    """
+
+    def __init__(self, clock=None, trace=None):
+        self._clock = clock or SystemClock()
+        self.trace = trace or SyntheticTrace()
+        self.stick = SimulatedStick(self._clock)
+        self._rotation = 0
+        self._pixels = [[0, 0, 0] for _ in range(64)]
+
+        # Emulation statistics
+        self.sensor_reads = 0
+        self.pixel_writes = 0
+        self.messages = []
+
+    @property
+    def rotation(self):
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, value):
+        self.set_rotation(value)
+
+    def _reading(self):
+        """Internal. Returns trace reading for current time."""
+        self.sensor_reads += 1
+        return self.trace.reading(self._clock.time())
+
+    def _init_humidity(self):
+        self._humidity = SimulatedRtimuSensor(self)
+
+    def _init_pressure(self):
+        self._pressure = SimulatedRtimuSensor(self)
+
+    def get_temperature_from_humidity(self):
+        return self._reading().temp_from_humidity
+
+    def get_temperature_from_pressure(self):
+        return self._reading().temp_from_pressure
+
+    def get_temperature(self):
+        return self.get_temperature_from_humidity()
+
+    def get_humidity(self):
+        return self._reading().humidity
+
+    def get_pressure(self):
+        return self._reading().pressure
+
+    def set_rotation(self, r=0, redraw=True):
+        if r not in (0, 90, 180, 270):
+            raise ValueError('Rotation must be 0, 90, 180 or 270 degrees')
+
+        self._rotation = r
+
+        if redraw:
+            self.pixel_writes += 64
+
+    def set_pixels(self, pixel_list):
+        if len(pixel_list) != 64:
+            raise ValueError('Pixel lists must have 64 elements')
+
+        self._pixels = [list(pixel) for pixel in pixel_list]
+        self.pixel_writes += 64
+
+    def set_pixel(self, x, y, *args):
+        pixel = args[0] if len(args) == 1 else args
+        self._pixels[y * 8 + x] = list(pixel)
+        self.pixel_writes += 1
+
+    def get_pixels(self):
+        return [list(pixel) for pixel in self._pixels]
+
+    def clear(self, *args):
+        colour = (args[0] if len(args) == 1 else args) if args else (0, 0, 0)
+        self.set_pixels([colour] * 64)
+
+    def _get_char_pixels(self, s):
+        """Internal. Returns glyph of 5 rows of 8 pixels, white pixels are set bits of character code."""
+        code = 0 if s.isspace() else ord(s)
+        return [[255, 255, 255] if code >> ((row + column) % 8) & 1 else [0, 0, 0] for row in range(5) for column in range(8)]
+
+    def _trim_whitespace(self, char):
+        """Internal. Removes blank rows from glyph ends, blank glyph is kept as it is."""
+        if any(sum(pixel) for pixel in char):
+            while not any(sum(pixel) for pixel in char[:8]):
+                del char[:8]
+
+            while not any(sum(pixel) for pixel in char[-8:]):
+                del char[-8:]
+
+        return char
+
+    def show_message(self, text_string, scroll_speed=.1, text_colour=(255, 255, 255), back_colour=(0, 0, 0)):
+        self.messages.append(text_string)
+        self.clear(back_colour)
+
+class SimulatedCpuTemperature(CpuTemperatureSource):
+    """Emulates vcgencmd CPU temperature, reading it from the same trace as simulated Sense HAT."""
+
+    def __init__(self, clock, trace):
+        self._clock = clock
+        self._trace = trace
+
+    @property
+    def source_name(self):
+        return 'simulated vcgencmd'
+
+    def read(self):
+        # vcgencmd reports one decimal digit
+        return round(self._trace.reading(self._clock.time()).cpu_temp, 1)
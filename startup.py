@@ -0,0 +1,82 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Start up timing package.
+********************************************************************************************************************'''
+
+from contextlib import contextmanager
+from threading import Lock
+
+import os
+
+from clock import monotonic
+
+UPTIME_PATH = '/proc/uptime'
+
+def system_uptime():
+    """Returns seconds since system boot, None if unknown."""
+    if not os.path.isfile(UPTIME_PATH):
+        return None
+
+    with open(UPTIME_PATH) as uptime_file:
+        return float(uptime_file.read().split()[0])
+
+class StartupTimer(object):
+    """
+    Measures station start up phases and milestones, from timer creation.
+
+    Phases can run in parallel threads, each is reported with its offset from start and duration.
+    """
+
+    REPORT_TEMPLATE = '  %-20s +%7.1f ms %9.1f ms'
+
+    def __init__(self):
+        self._started = monotonic()
+        self._lock = Lock()
+
+        # Lists of (name, offset, duration) and (name, offset) in seconds
+        self.phases = []
+        self.milestones = []
+
+    def elapsed(self):
+        """Returns seconds since start."""
+        return monotonic() - self._started
+
+    @contextmanager
+    def phase(self, name):
+        """Measures with block as start up phase."""
+        started = self.elapsed()
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases.append((name, started, self.elapsed() - started))
+
+    def mark(self, name):
+        """Records milestone reached now, returns seconds since start."""
+        elapsed = self.elapsed()
+
+        with self._lock:
+            self.milestones.append((name, elapsed))
+
+        return elapsed
+
+    def report(self):
+        """Returns phases and milestones report, with system uptime if it is known."""
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+            milestones = tuple(self.milestones)
+
+        lines = ['Start up phases (offset, duration):']
+        lines.extend(self.REPORT_TEMPLATE % (name, offset * 1000, duration * 1000) for name, offset, duration in phases)
+        lines.extend('  %-20s +%7.1f ms' % (name, offset * 1000) for name, offset in milestones)
+
+        uptime = system_uptime()
+
+        if uptime is not None:
+            lines.append('  System uptime %.1f s' % uptime)
+
+        return '\n'.join(lines)
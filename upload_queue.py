@@ -0,0 +1,224 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Durable upload queue package.
+********************************************************************************************************************'''
+
+from __future__ import print_function
+from threading import Event, Lock, Thread
+from urllib import urlencode
+
+import datetime
+import json
+import logging
+import sqlite3
+import time
+import urllib2
+
+from metrics import STAGE_SECONDS, UPLOADS, UPLOAD_FAILURES
+
+def format_dateutc(timestamp):
+    """Formats UNIX timestamp to Weather Underground dateutc value."""
+    return datetime.datetime.utcfromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+def build_query(station_id, station_key, timestamp, data):
+    """Builds upload query string for observation http://wiki.wunderground.com/index.php/PWS_-_Upload_Protocol"""
+    weather_data = dict(data)
+    weather_data.update({
+        'action': 'updateraw',
+        'ID': station_id,
+        'PASSWORD': station_key,
+        'dateutc': format_dateutc(timestamp)
+    })
+
+    return urlencode(weather_data)
+
+class UploadQueue(object):
+    """
+    Persistent on-disk queue of outbound observations.
+
+    Every observation is stored with its real UTC timestamp, so it can be uploaded later with correct date.
+    Credentials are not stored, sender adds them while uploading.
+    """
+
+    def __init__(self, path):
+        self._lock = Lock()
+
+        # Connection is shared by station and sender threads, access is serialized with lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS observations (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp REAL, data TEXT)')
+        self._connection.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM observations').fetchone()[0]
+
+    def put(self, timestamp, data):
+        """Stores observation data dictionary with its UNIX timestamp."""
+        with self._lock:
+            self._connection.execute('INSERT INTO observations (timestamp, data) VALUES (?, ?)', (timestamp, json.dumps(data)))
+            self._connection.commit()
+
+    def peek(self, limit=1):
+        """Returns list of the oldest (id, timestamp, data) observations without removing them."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT id, timestamp, data FROM observations ORDER BY id LIMIT ?', (limit, )).fetchall()
+
+        return [(item_id, timestamp, json.loads(data)) for item_id, timestamp, data in rows]
+
+    def remove(self, item_id):
+        """Removes observation by its id, after it was uploaded."""
+        with self._lock:
+            self._connection.execute('DELETE FROM observations WHERE id = ?', (item_id, ))
+            self._connection.commit()
+
+    def close(self):
+        """Closes underlying database."""
+        with self._lock:
+            self._connection.close()
+
+class UploadSender(object):
+    """
+    Drains upload queue to Weather Underground in a background thread.
+
+    Observations are sent oldest first with their own dateutc, at most rate observations per second (no limit if 0).
+    If upload fails observation stays in the queue and sending is retried after retry interval,
+    so after an outage the queue is backfilled in order. Observations rejected by server are dropped.
+    """
+
+    # In seconds, single request should not hold the queue (and flush on exit) forever
+    REQUEST_TIMEOUT = 30
+
+    # In seconds, flush does not start request with less time left, it could not complete
+    MIN_FLUSH_REQUEST_TIMEOUT = 1
+
+    def __init__(self, queue, url, station_id, station_key, rate, retry_interval):
+        self._queue = queue
+        self._url = url
+        self._station_id = station_id
+        self._station_key = station_key
+        self._rate = rate
+        self._retry_interval = retry_interval
+
+        # Set when new observation is queued, to wake up sender
+        self._pending = Event()
+        self._stopped = Event()
+        self._send_lock = Lock()
+        self._thread = None
+
+    def build_url(self, timestamp, data):
+        """Builds upload URL for observation."""
+        return self._url + '?' + build_query(self._station_id, self._station_key, timestamp, data)
+
+    def notify(self):
+        """Wakes up sender, should be called after observation is queued."""
+        self._pending.set()
+
+    def start(self):
+        """Starts background sender thread."""
+        self._stopped.clear()
+        self._thread = Thread(target=self._run, name='UploadSender')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops background sender thread, pending observations stay in the queue."""
+        self._stopped.set()
+        self._pending.set()
+
+    def flush(self, timeout):
+        """
+        Sends pending observations ignoring rate, until queue is empty, upload fails or timeout expires.
+
+        Every request gets only time left, so flush does not take longer than timeout.
+
+        Returns:
+            int: number of observations left in the queue
+        """
+        deadline = time.time() + timeout
+
+        while True:
+            remaining = deadline - time.time()
+
+            if remaining < self.MIN_FLUSH_REQUEST_TIMEOUT or not self.send_next(min(remaining, self.REQUEST_TIMEOUT)):
+                break
+
+        return len(self._queue)
+
+    def send_next(self, timeout=None):
+        """
+        Sends the oldest queued observation.
+
+        Observation rejected by server (HTTP 4xx status) is removed, network and server (5xx) errors are retried.
+
+        Args:
+            timeout (float): request timeout in seconds, REQUEST_TIMEOUT if None
+
+        Returns:
+            bool: True if observation was sent or rejected, False if queue is empty or upload failed
+        """
+        with self._send_lock:
+            items = self._queue.peek()
+
+            if not items:
+                return False
+
+            item_id, timestamp, data = items[0]
+            upload_url = self.build_url(timestamp, data)
+
+            try:
+                with STAGE_SECONDS.time(stage='upload_request'):
+                    response = urllib2.urlopen(upload_url, timeout=timeout or self.REQUEST_TIMEOUT)
+                    html = response.read()
+
+                print('Server response: ', html)
+
+                # Close response object
+                response.close()
+            except urllib2.HTTPError as error:
+                if error.code >= 500:
+                    # Server is down or overloaded, e.g. during outage, observation is kept for backfill
+                    UPLOAD_FAILURES.inc()
+                    print('Weather Underground is unavailable: ', error)
+                    logging.warning('Weather Underground is unavailable: %s\r\nUpload URL: %s', error, upload_url)
+                    return False
+
+                # Server rejected observation, retry would be rejected as well and block the queue
+                UPLOAD_FAILURES.inc()
+                print('Weather Underground rejected observation: ', error)
+                logging.warning('Weather Underground rejected observation: %s\r\nWeather Data: %s\r\nUpload URL: %s', error, data, upload_url)
+                self._queue.remove(item_id)
+                return True
+            except:
+                UPLOAD_FAILURES.inc()
+                print('Could not upload to Weather Underground')
+                logging.warning('Could not upload to Weather Underground\r\nWeather Data: %s\r\nUpload URL: %s', data, upload_url, exc_info=True)
+                return False
+
+            # Server accepted request, observation is removed even if response body reports it invalid, retry would not help
+            self._queue.remove(item_id)
+            UPLOADS.inc()
+            return True
+
+    def _run(self):
+        """Internal. Sends queued observations until stopped."""
+        while not self._stopped.is_set():
+            self._pending.clear()
+
+            if self.send_next():
+                # Rate 0 or None sends without delay
+                wait = 1.0 / self._rate if self._rate else 0
+            elif len(self._queue):
+                wait = self._retry_interval
+            else:
+                wait = None
+
+            # Sleep, but wake up immediately on stop or, if queue was empty, on new observation
+            if wait is None:
+                self._pending.wait()
+            else:
+                self._stopped.wait(wait)
@@ -0,0 +1,469 @@
+'''*****************************************************************************************************************
+    Raspberry Pi + Raspbian Weather Station
+    By Uladzislau Bayouski
+    https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
+
+    Upload sinks package.
+    Every sink has its own queue, worker thread, batch size, flush interval and retry policy,
+    so one snapshot fans out to all sinks and a slow or unreachable sink does not hold the others.
+********************************************************************************************************************'''
+
+from abc import ABCMeta, abstractmethod, abstractproperty
+from collections import deque
+from threading import Condition, Event, Thread
+from urllib import urlencode
+from urlparse import urlparse
+
+import httplib
+import json
+import logging
+import math
+import numbers
+import os
+import urllib2
+
+from aggregation import RunningStats
+from clock import monotonic
+from metrics import SINK_DROPPED, SINK_FAILURES, SINK_SECONDS
+from sampler import finite_or_none
+from upload_queue import build_query
+
+def snapshot_to_json(snapshot):
+    """Returns JSON of SensorsSnapshot, NaN and infinite values are written as null like in HTTP API."""
+    data = snapshot._asdict()
+
+    try:
+        return json.dumps(data, allow_nan=False)
+    except ValueError:
+        # Filters and plugins may give NaN, strict JSON readers reject it, so line is cleaned only then
+        return json.dumps(finite_or_none(data), allow_nan=False)
+
+class RetryPolicy(object):
+    """
+    Exponential backoff between attempts to send a batch.
+
+    Args:
+        max_attempts (int): attempts before batch is dropped, 1 means no retries
+        initial_delay (float): seconds to wait after the first failure
+        max_delay (float): upper limit of wait in seconds
+        backoff (float): multiplier of wait after every failure
+    """
+
+    def __init__(self, max_attempts=5, initial_delay=5, max_delay=300, backoff=2):
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+
+    def delay(self, attempt):
+        """Returns seconds to wait after given failed attempt, counted from 1."""
+        return min(self.max_delay, self.initial_delay * math.pow(self.backoff, attempt - 1))
+
+class UploadSink(object):
+    """
+    Base class for upload sinks.
+
+    Snapshots put into sink are queued in memory and sent by sink worker thread in batches:
+    batch is sent when it has batch size snapshots, or flush interval after its first snapshot arrived.
+    If queue is full, because sink is down for long, the oldest snapshots are dropped.
+    """
+    __metaclass__ = ABCMeta
+
+    def __init__(self, batch_size=1, flush_interval=0, retry_policy=None, max_pending=1000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_policy = retry_policy or RetryPolicy()
+
+        self._pending = deque()
+        self._max_pending = max_pending
+        self._condition = Condition()
+        self._stopped = Event()
+        self._thread = None
+
+        # Sink statistics
+        self.sent = 0
+        self.failures = 0
+        self.dropped = 0
+
+    @abstractproperty
+    def sink_name(self):
+        """Returns sink name, used for reporting"""
+        pass
+
+    @abstractmethod
+    def send(self, snapshots):
+        """Sends list of SensorsSnapshot, raises exception if they were not accepted"""
+        pass
+
+    def close(self):
+        """Releases connections or files held by sink"""
+        pass
+
+    def put(self, snapshot):
+        """Queues snapshot for sending, never blocks."""
+        with self._condition:
+            if len(self._pending) >= self._max_pending:
+                self._pending.popleft()
+                self._drop(1)
+
+            self._pending.append(snapshot)
+            self._condition.notify()
+
+    def start(self):
+        """Starts sink worker thread."""
+        self._thread = Thread(target=self._run, name='UploadSink-{}'.format(self.sink_name))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Asks worker to send queued snapshots without retries and exit, does not wait for it."""
+        with self._condition:
+            self._stopped.set()
+            self._condition.notify()
+
+    def join(self, timeout=None):
+        """Waits up to timeout for stopped worker, closes sink if worker finished."""
+        if self._thread:
+            self._thread.join(timeout)
+
+            if self._thread.is_alive():
+                logging.warning('%s did not finish in time, %s snapshots left', self.sink_name, len(self._pending))
+                return
+
+        self.close()
+
+    def _drop(self, count):
+        """Internal. Counts dropped snapshots."""
+        self.dropped += count
+        SINK_DROPPED.inc(count, sink=self.sink_name)
+
+    def _next_batch(self):
+        """Internal. Waits until batch is full, its flush interval expires or sink is stopped, returns the batch."""
+        with self._condition:
+            while not self._pending and not self._stopped.is_set():
+                self._condition.wait()
+
+            deadline = monotonic() + self.flush_interval
+
+            while len(self._pending) < self.batch_size and not self._stopped.is_set():
+                remaining = deadline - monotonic()
+
+                if remaining <= 0:
+                    break
+
+                self._condition.wait(remaining)
+
+            return [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+
+    def _send_batch(self, batch):
+        """Internal. Sends batch retrying by policy, batch is dropped after the last failed attempt."""
+        attempt = 0
+
+        while True:
+            attempt += 1
+
+            try:
+                with SINK_SECONDS.time(sink=self.sink_name):
+                    self.send(batch)
+
+                self.sent += len(batch)
+                return
+            except:
+                self.failures += 1
+                SINK_FAILURES.inc(sink=self.sink_name)
+                logging.warning('%s could not send %s snapshots, attempt %s', self.sink_name, len(batch), attempt, exc_info=True)
+
+            # No retries while stopping, stop should not wait for unreachable sink
+            if attempt >= self.retry_policy.max_attempts or self._stopped.is_set():
+                self._drop(len(batch))
+                return
+
+            self._stopped.wait(self.retry_policy.delay(attempt))
+
+    def _run(self):
+        """Internal. Sends batches until stopped and queue is empty."""
+        while True:
+            batch = self._next_batch()
+
+            if not batch:
+                return
+
+            self._send_batch(batch)
+
+class WeatherUndergroundSink(UploadSink):
+    """
+    Queues observations for Weather Underground into durable upload queue.
+
+    Upload itself, with its own rate and retries, is done by UploadSender, so the sink only
+    has to get observations to disk and never drops them because of network outage.
+    """
+
+    def __init__(self, queue, sender, build_weather_data, **kwargs):
+        super(WeatherUndergroundSink, self).__init__(**kwargs)
+
+        self._queue = queue
+        self._sender = sender
+
+        # Function returning Weather Underground fields for snapshot
+        self._build_weather_data = build_weather_data
+
+    @property
+    def sink_name(self):
+        return 'Weather Underground'
+
+    def send(self, snapshots):
+        for snapshot in snapshots:
+            weather_data = self._build_weather_data(snapshot)
+            weather_data.update(snapshot.plugins_data)
+
+            # Observation keeps time of the snapshot, so it is uploaded with correct date even after an outage
+            self._queue.put(snapshot.timestamp, weather_data)
+
+        self._sender.notify()
+
+class WeatherUndergroundRapidFireSink(UploadSink):
+    """
+    Sends snapshots to Weather Underground RapidFire server as they are sampled, over one keep-alive connection.
+
+    Real time data gets stale in seconds, so only the latest snapshot waits for sending and failed requests
+    are not retried, the next snapshot is on its way anyway. Connection is reopened after any error.
+    """
+
+    # In seconds, request should not take longer than a few sample intervals
+    REQUEST_TIMEOUT = 10
+
+    def __init__(self, url, station_id, station_key, build_weather_data, frequency):
+        super(WeatherUndergroundRapidFireSink, self).__init__(retry_policy=RetryPolicy(max_attempts=1), max_pending=1)
+
+        parsed_url = urlparse(url)
+        self._connection_class = httplib.HTTPSConnection if parsed_url.scheme == 'https' else httplib.HTTPConnection
+        self._host = parsed_url.netloc
+        self._path = parsed_url.path
+        self._station_id = station_id
+        self._station_key = station_key
+        self._build_weather_data = build_weather_data
+        self._frequency = frequency
+        self._connection = None
+
+        # Seconds per successful request
+        self.latency = RunningStats()
+
+    @property
+    def sink_name(self):
+        return 'Weather Underground RapidFire'
+
+    @property
+    def stats(self):
+        """Returns dictionary of requests counters, error rate and latency in seconds."""
+        requests = self.sent + self.failures
+
+        return {
+            'requests': requests,
+            'failures': self.failures,
+            'skipped': self.dropped,
+            'error_rate': float(self.failures) / requests if requests else 0.0,
+            'latency_mean': self.latency.mean,
+            'latency_max': self.latency.max
+        }
+
+    def send(self, snapshots):
+        snapshot = snapshots[-1]
+        weather_data = self._build_weather_data(snapshot)
+        weather_data.update(snapshot.plugins_data)
+        weather_data.update({'realtime': 1, 'rtfreq': self._frequency})
+
+        path = self._path + '?' + build_query(self._station_id, self._station_key, snapshot.timestamp, weather_data)
+        started = monotonic()
+
+        try:
+            if not self._connection:
+                self._connection = self._connection_class(self._host, timeout=self.REQUEST_TIMEOUT)
+
+            self._connection.request('GET', path)
+            response = self._connection.getresponse()
+
+            # Response has to be read completely, otherwise connection can not be reused
+            body = response.read()
+        except:
+            self.close()
+            raise
+
+        if response.status != 200 or 'success' not in body:
+            raise IOError('RapidFire server responded {0}: {1}'.format(response.status, body.strip()))
+
+        self.latency.add(monotonic() - started)
+
+    def close(self):
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+
+class NdjsonFileSink(UploadSink):
+    """Appends snapshots to local file as newline delimited JSON, one object per line."""
+
+    def __init__(self, path, batch_size=12, flush_interval=60, **kwargs):
+        super(NdjsonFileSink, self).__init__(batch_size, flush_interval, **kwargs)
+
+        self._path = path
+        self._file = None
+
+    @property
+    def sink_name(self):
+        return 'NDJSON file'
+
+    def send(self, snapshots):
+        if not self._file:
+            self._file = open(self._path, 'a')
+
+        self._file.write(''.join(snapshot_to_json(snapshot) + '\n' for snapshot in snapshots))
+
+        # One sync per batch, so SD card is not written for every snapshot
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+class MqttSink(UploadSink):
+    """Publishes every snapshot as JSON message to MQTT broker over persistent connection."""
+
+    def __init__(self, host, port=1883, topic='weather_station/snapshots', qos=1, username=None, password=None, **kwargs):
+        super(MqttSink, self).__init__(**kwargs)
+
+        self._host = host
+        self._port = port
+        self._topic = topic
+        self._qos = qos
+        self._username = username
+        self._password = password
+        self._client = None
+
+    @property
+    def sink_name(self):
+        return 'MQTT'
+
+    def _connect(self):
+        """Internal. Connects to broker and starts network loop, paho is needed only if sink is used."""
+        import paho.mqtt.client as mqtt
+
+        client = mqtt.Client()
+
+        if self._username:
+            client.username_pw_set(self._username, self._password)
+
+        client.connect(self._host, self._port)
+        client.loop_start()
+
+        return client
+
+    def send(self, snapshots):
+        if not self._client:
+            self._client = self._connect()
+
+        for snapshot in snapshots:
+            # Publish returns result code first, both as a tuple in older paho and as MQTTMessageInfo
+            return_code = self._client.publish(self._topic, snapshot_to_json(snapshot), self._qos)[0]
+
+            if return_code:
+                # Client is recreated on retry
+                self.close()
+                raise IOError('MQTT publish failed with code {}'.format(return_code))
+
+    def close(self):
+        if self._client:
+            self._client.loop_stop()
+            self._client.disconnect()
+            self._client = None
+
+class InfluxLineSink(UploadSink):
+    """
+    Writes snapshots to InfluxDB HTTP API in line protocol, whole batch in one request.
+
+    Every snapshot is a point of measurement tagged with station, sensors and numeric plugins values are fields.
+    """
+
+    def __init__(self, url, database, station, measurement='weather', batch_size=12, flush_interval=60, **kwargs):
+        super(InfluxLineSink, self).__init__(batch_size, flush_interval, **kwargs)
+
+        self._write_url = '{0}/write?{1}'.format(url.rstrip('/'), urlencode({'db': database, 'precision': 's'}))
+        self._series = '{0},station={1}'.format(self.escape(measurement, ', '), self.escape(station, ', ='))
+
+    @property
+    def sink_name(self):
+        return 'InfluxDB'
+
+    @staticmethod
+    def escape(value, characters):
+        """Escapes characters of measurement, tag or field key with backslash."""
+        value = str(value)
+
+        for character in characters:
+            value = value.replace(character, '\\' + character)
+
+        return value
+
+    @staticmethod
+    def format_field(value):
+        """Formats field value, returns None for values which can not be written."""
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+
+        # All numbers are written as floats, so field type does not depend on value of the first point
+        if isinstance(value, numbers.Number):
+            return repr(float(value)) if not math.isnan(value) else None
+
+        if isinstance(value, basestring):
+            return '"{}"'.format(value.replace('\\', '\\\\').replace('"', '\\"'))
+
+        return None
+
+    def format_point(self, snapshot):
+        """Returns snapshot as line protocol point."""
+        values = dict(snapshot.plugins_data)
+        values.update((field, getattr(snapshot, field)) for field in ('temp_c', 'temp_f', 'humidity', 'pressure', 'cpu_temp'))
+
+        # Oversampled snapshot statistics are written as fields like temp_c_std
+        for channel, stats in (snapshot.aggregates or {}).items():
+            values.update(('{0}_{1}'.format(channel, name), value) for name, value in stats.items())
+
+        fields = ((self.escape(key, ', ='), self.format_field(value)) for key, value in sorted(values.items()))
+
+        return '{0} {1} {2}'.format(
+            self._series, ','.join('{0}={1}'.format(key, value) for key, value in fields if value is not None),
+            int(snapshot.timestamp))
+
+    def send(self, snapshots):
+        payload = '\n'.join(self.format_point(snapshot) for snapshot in snapshots)
+        request = urllib2.Request(self._write_url, payload, {'Content-Type': 'text/plain'})
+
+        response = urllib2.urlopen(request, timeout=30)
+        response.read()
+        response.close()
+
+class UploadFanout(object):
+    """Puts every snapshot into all sinks."""
+
+    def __init__(self, sinks):
+        self.sinks = tuple(sinks)
+
+    def start(self):
+        """Starts all sinks workers."""
+        for sink in self.sinks:
+            sink.start()
+
+    def put(self, snapshot):
+        """Queues snapshot in every sink, returns immediately."""
+        for sink in self.sinks:
+            sink.put(snapshot)
+
+    def stop(self, timeout):
+        """Stops all sinks at once, giving them together up to timeout seconds to send what is queued."""
+        deadline = monotonic() + timeout
+
+        for sink in self.sinks:
+            sink.stop()
+
+        for sink in self.sinks:
+            sink.join(max(deadline - monotonic(), 0))
@@ -2,20 +2,169 @@
     Raspberry Pi + Raspbian Weather Station
     By Uladzislau Bayouski
     https://www.linkedin.com/in/uladzislau-bayouski-a7474111b/
-    
+
     Visual styles package.
 ********************************************************************************************************************'''
-    
+
 from abc import ABCMeta, abstractmethod, abstractproperty
 
+import math
+
+from display import IndexedFrame
+
+# Pixel masks used to build frames: 'X' is positive color, 'O' is negative color, '.' is no color
+# Digits are 3 lines of 8 pixels, numbers are shown rotated (see NumericStyle.rotation)
+DIGIT_MASKS = {
+    '0': ('XXXXXXXX', 'X......X', 'XXXXXXXX'),
+    '1': ('XXXXXXXX', '.X......', '..X.....'),
+    '2': ('XXXXX..X', 'X...X..X', 'X...XXXX'),
+    '3': ('XXXXXXXX', 'X...X..X', 'X...X..X'),
+    '4': ('XXXXXXXX', '....X...', 'XXXXX...'),
+    '5': ('X...XXXX', 'X...X..X', 'XXXXX..X'),
+    '6': ('X...XXXX', 'X...X..X', 'XXXXXXXX'),
+    '7': ('XXXXXXXX', 'X.......', 'X.......'),
+    '8': ('XXXXXXXX', 'X...X..X', 'XXXXXXXX'),
+    '9': ('XXXXXXXX', 'X...X..X', 'XXXXX..X'),
+}
+
+# Infinity symbol used for bigger than 2 digits numbers
+INFINITY_MASK = (
+    '...XX...',
+    '..X..X..',
+    '..X..X..',
+    '...XX...',
+    '...XX...',
+    '..X..X..',
+    '..X..X..',
+    '...XX...',
+)
+
+# Arrow up symbol, arrow down is the same symbol upside down in negative color
+ARROW_UP_MASK = (
+    '...XX...',
+    '..XXXX..',
+    '.X.XX.X.',
+    'X..XX..X',
+    '...XX...',
+    '...XX...',
+    '...XX...',
+    '...XX...',
+)
+
+# Equals symbol
+EQUALS_MASK = (
+    '........',
+    '........',
+    'XXXXXXXX',
+    'XXXXXXXX',
+    'OOOOOOOO',
+    'OOOOOOOO',
+    '........',
+    '........',
+)
+
+# Empty line, used to build final number
+EMPTY_LINE_MASK = '........'
+
+class FrameShapes(object):
+    """
+    Palette indices of every frame visual styles can render, independent of colors.
+
+    Index 0 is no color, 1 is mask 'X' and 2 is mask 'O', shapes are built once on first request.
+    """
+
+    # Palette index of mask pixel
+    MASK_INDICES = {'.': 0, 'X': 1, 'O': 2}
+
+    _shapes = None
+
+    def __init__(self):
+        self.numbers = tuple(self.build(self.number_mask(number)) for number in range(100))
+        self.infinity = self.build(''.join(INFINITY_MASK))
+
+        # Square fill levels 0-64, filled part is index 1 and the rest is index 2
+        self.squares = tuple(bytes(bytearray((1, ) * level + (2, ) * (64 - level))) for level in range(65))
+
+        self.arrow_up = self.build(''.join(ARROW_UP_MASK))
+        self.arrow_down = self.build(''.join(ARROW_UP_MASK)[::-1])
+        self.equals = self.build(''.join(EQUALS_MASK))
+
+    @classmethod
+    def get(cls):
+        """Returns shared shapes, builds them on first request."""
+        if cls._shapes is None:
+            cls._shapes = FrameShapes()
+
+        return cls._shapes
+
+    @staticmethod
+    def number_mask(number):
+        """Builds 64 pixels mask for one/two digits number."""
+        str_value = str(number)
+
+        # If number is 2 digits build 2 digits pixel map
+        if len(str_value) == 2:
+            lines = DIGIT_MASKS[str_value[1]] + (EMPTY_LINE_MASK, ) * 2 + DIGIT_MASKS[str_value[0]] #0-2, 3-4, 5-7
+        # If number is one digit show one digit pixel map
+        else:
+            lines = (EMPTY_LINE_MASK, ) * 2 + DIGIT_MASKS[str_value] + (EMPTY_LINE_MASK, ) * 3       #0-1, 2-4, 5-7
+
+        return ''.join(lines)
+
+    @classmethod
+    def build(cls, mask):
+        """Builds 64 palette indices bytes from mask."""
+        return bytes(bytearray(cls.MASK_INDICES[pixel] for pixel in mask))
+
+class FrameTable(object):
+    """
+    Flyweight table of every frame visual styles can render for a pair of colors.
+
+    Table is built once per color pair and shared by all styles and weather entities using these colors.
+    Frames are immutable IndexedFrame objects, so styles return them as they are, without copying.
+    Frames of all tables share index bytes of FrameShapes, colors and polarity differ by palette only.
+    """
+
+    # Built tables: key is (positive color, negative color) tuple
+    _tables = {}
+
+    def __init__(self, positive_color, negative_color):
+        # No color for led
+        empty_color = (0, 0, 0)
+        shapes = FrameShapes.get()
+
+        # Palettes by polarity: positive shows 'X' in positive color, negative shows both 'X' and 'O' in negative color
+        positive = (empty_color, positive_color, negative_color)
+        negative = (empty_color, negative_color, negative_color)
+        polarities = (positive, negative)
+
+        # Numbers 0-99 and infinity for each polarity: index 0 is positive, index 1 is negative
+        self.numbers = tuple(tuple(IndexedFrame(indices, colors) for indices in shapes.numbers) for colors in polarities)
+        self.infinity = tuple(IndexedFrame(shapes.infinity, colors) for colors in polarities)
+
+        # Square fill levels 0-64 for each polarity, positive fills with positive color over negative, negative vice versa
+        swapped = (empty_color, negative_color, positive_color)
+        self.squares = tuple(tuple(IndexedFrame(indices, colors) for indices in shapes.squares) for colors in (positive, swapped))
+
+        self.arrow_up = IndexedFrame(shapes.arrow_up, positive)
+        self.arrow_down = IndexedFrame(shapes.arrow_down, negative)
+        self.equals = IndexedFrame(shapes.equals, positive)
+
+    @classmethod
+    def get(cls, positive_color, negative_color):
+        """Returns shared frame table for given colors, builds it on first request."""
+        key = (tuple(positive_color), tuple(negative_color))
+
+        if key not in cls._tables:
+            cls._tables[key] = FrameTable(*key)
+
+        return cls._tables[key]
+
 class VisualStyle(object):
     """Base class for all visual styles."""
     __metaclass__ = ABCMeta
 
     def __init__(self, positive_color, negative_color):
-        # No color for led
-        self._e = (0, 0, 0) 
-
         # We use positive and negative color tuples to figure out the color applied to visual style
         # For example:
         #   +23 Celsius is shown as 23 in red color
@@ -23,6 +172,9 @@ class VisualStyle(object):
         self._p = positive_color
         self._n = negative_color
 
+        # Precomputed frames, shared with other styles using the same colors
+        self._frames = FrameTable.get(positive_color, negative_color)
+
     @property
     def rotation(self):
         """Rotation to be applied to a pixel map."""
@@ -36,7 +188,7 @@ class VisualStyle(object):
 class ArrowStyle(VisualStyle):
     """
     Arrow visual style implementation.
-    
+
     Depends on previous and new values:
         a) if new/current value is bigger than previous shows arrow up
         b) if new/current values is less than previous shows arrow down
@@ -49,33 +201,6 @@ class ArrowStyle(VisualStyle):
         # Previous value to be used for style render
         self._previous_value = 0
 
-        # Arrow up pixels map
-        self._arrow_up = (
-            self._e, self._e, self._e, self._p, self._p, self._e, self._e, self._e, #0
-            self._e, self._e, self._p, self._p, self._p, self._p, self._e, self._e, #1
-            self._e, self._p, self._e, self._p, self._p, self._e, self._p, self._e, #2
-            self._p, self._e, self._e, self._p, self._p, self._e, self._e, self._p, #3
-            self._e, self._e, self._e, self._p, self._p, self._e, self._e, self._e, #4
-            self._e, self._e, self._e, self._p, self._p, self._e, self._e, self._e, #5
-            self._e, self._e, self._e, self._p, self._p, self._e, self._e, self._e, #6
-            self._e, self._e, self._e, self._p, self._p, self._e, self._e, self._e  #7
-        )
-
-        # Arrow down pixels map
-        self._arrow_down = tuple(self._n if pixel is self._p else self._e for pixel in self._arrow_up[::-1])
-
-        # Equals symbol pixels map
-        self._equals = (
-            self._e, self._e, self._e, self._e, self._e, self._e, self._e, self._e, #0
-            self._e, self._e, self._e, self._e, self._e, self._e, self._e, self._e, #1
-            self._p, self._p, self._p, self._p, self._p, self._p, self._p, self._p, #2
-            self._p, self._p, self._p, self._p, self._p, self._p, self._p, self._p, #3
-            self._n, self._n, self._n, self._n, self._n, self._n, self._n, self._n, #4
-            self._n, self._n, self._n, self._n, self._n, self._n, self._n, self._n, #5
-            self._e, self._e, self._e, self._e, self._e, self._e, self._e, self._e, #6
-            self._e, self._e, self._e, self._e, self._e, self._e, self._e, self._e, #7
-        )
-    
     def apply_style(self, value):
         # Need delta of current and previous values to figure what symbol to show
         new_value = value
@@ -84,89 +209,17 @@ class ArrowStyle(VisualStyle):
 
         # If no changes, show equals symbol
         if not new_value:
-            return self._equals
+            return self._frames.equals
 
-        return self._arrow_up if new_value > 0 else self._arrow_down
+        return self._frames.arrow_up if new_value > 0 else self._frames.arrow_down
 
 class NumericStyle(VisualStyle):
     """
     Numeric visual style implementation.
-    
+
     Shows one/two digits values.
     In case value has more than 2 digits shows infinity symbol.
     """
-    
-    def __init__(self, positive_color, negative_color):
-        super(NumericStyle, self).__init__(positive_color, negative_color)
-
-        # Empty line, used to build final number
-        self._empty_line = (self._e, self._e, self._e, self._e, self._e, self._e, self._e, self._e)
-        
-        # Numbers dictionary: key is number as string, value is its pixel map
-        self._numbers = {
-            '0': (
-                self._p, self._p, self._p, self._p, self._p, self._p, self._p, self._p,
-                self._p, self._e, self._e, self._e, self._e, self._e, self._e, self._p,
-                self._p, self._p, self._p, self._p, self._p, self._p, self._p, self._p,
-            ),
-            '1': (
-                self._p, self._p, self._p, self._p, self._p, self._p, self._p, self._p,
-                self._e, self._p, self._e, self._e, self._e, self._e, self._e, self._e,
-                self._e, self._e, self._p, self._e, self._e, self._e, self._e, self._e,
-            ),
-            '2': (
-                self._p, self._p, self._p, self._p, self._p, self._e, self._e, self._p,
-                self._p, self._e, self._e, self._e, self._p, self._e, self._e, self._p,
-                self._p, self._e, self._e, self._e, self._p, self._p, self._p, self._p,
-            ),
-            '3': (
-                self._p, self._p, self._p, self._p, self._p, self._p, self._p, self._p,
-                self._p, self._e, self._e, self._e, self._p, self._e, self._e, self._p,
-                self._p, self._e, self._e, self._e, self._p, self._e, self._e, self._p,
-            ),
-            '4': (
-                self._p, self._p, self._p, self._p, self._p, self._p, self._p, self._p,
-                self._e, self._e, self._e, self._e, self._p, self._e, self._e, self._e,
-                self._p, self._p, self._p, self._p, self._p, self._e, self._e, self._e,
-            ),
-            '5': (
-                self._p, self._e, self._e, self._e, self._p, self._p, self._p, self._p,
-                self._p, self._e, self._e, self._e, self._p, self._e, self._e, self._p,
-                self._p, self._p, self._p, self._p, self._p, self._e, self._e, self._p,
-            ),
-            '6': (
-                self._p, self._e, self._e, self._e, self._p, self._p, self._p, self._p,
-                self._p, self._e, self._e, self._e, self._p, self._e, self._e, self._p,
-                self._p, self._p, self._p, self._p, self._p, self._p, self._p, self._p,
-            ),
-            '7': (
-                self._p, self._p, self._p, self._p, self._p, self._p, self._p, self._p,
-                self._p, self._e, self._e, self._e, self._e, self._e, self._e, self._e,
-                self._p, self._e, self._e, self._e, self._e, self._e, self._e, self._e,
-            ),
-            '8': (
-                self._p, self._p, self._p, self._p, self._p, self._p, self._p, self._p,
-                self._p, self._e, self._e, self._e, self._p, self._e, self._e, self._p,
-                self._p, self._p, self._p, self._p, self._p, self._p, self._p, self._p,
-            ),
-            '9': (
-                self._p, self._p, self._p, self._p, self._p, self._p, self._p, self._p,
-                self._p, self._e, self._e, self._e, self._p, self._e, self._e, self._p,
-                self._p, self._p, self._p, self._p, self._p, self._e, self._e, self._p,
-            )
-        }
-
-        # Infinity symbol used for bigger than 2 digits numbers
-        self._infinity = (
-            self._e, self._e, self._e, self._p, self._p, self._e, self._e, self._e,
-            self._e, self._e, self._p, self._e, self._e, self._p, self._e, self._e,
-            self._e, self._e, self._p, self._e, self._e, self._p, self._e, self._e,
-            self._e, self._e, self._e, self._p, self._p, self._e, self._e, self._e,
-            self._e, self._e, self._e, self._p, self._p, self._e, self._e, self._e,
-            self._e, self._e, self._p, self._e, self._e, self._p, self._e, self._e,
-            self._e, self._e, self._p, self._e, self._e, self._p, self._e, self._e,
-            self._e, self._e, self._e, self._p, self._p, self._e, self._e, self._e,
-        )
 
     @property
     def rotation(self):
@@ -177,44 +230,25 @@ class NumericStyle(VisualStyle):
         # We need to get abs as we do not show minus symbol, we use different colors for this
         # We need to round value, we show only 2 digits and 25.8 is closer to 26 from UX perspecrtive
         # We call int to make sure we use integer rather than float
-        # We call str to convert 2 digits number to string for futher parsing
-        str_value = str(int(round(abs(value))))
-
-        # If number is 2 digits build 2 digits pixel map
-        if len(str_value) == 2:
-            result = list(self._numbers[str_value[1]]) #0-2
-            result += self._empty_line * 2             #3-4
-            result += self._numbers[str_value[0]]      #5-7
-        # If number is one digit show one digit pixel map
-        elif len(str_value) == 1:
-            result = list(self._empty_line * 2)        #0-1
-            result += self._numbers[str_value]         #2-4
-            result += self._empty_line * 3             #5-7
-        # Or show infinity symbol
-        else:
-            result = self._infinity
+        number = int(round(abs(value)))
 
         # Figure out what color to use depending on positive or negative value
-        if value <= 0:
-            result = tuple(self._n if pixel is self._p else self._e for pixel in result)
+        polarity = 1 if value <= 0 else 0
 
-        return result
-            
+        # Show number or infinity symbol if number has more than 2 digits
+        return self._frames.numbers[polarity][number] if number < 100 else self._frames.infinity[polarity]
 
 class SquareStyle(VisualStyle):
     """
     Square visual style implementation.
-    
+
     Visualize value as a square of different colored pixels.
     """
-    
-    def __init__(self, positive_color, negative_color):
-        super(SquareStyle, self).__init__(positive_color, negative_color)
 
     def apply_style(self, value):
         # Depending on value we use positive or negative color to fill pixels.
-        # We use range of 64 because the screen resolution is 8x8
+        # Number of filled pixels is the number of integers less than value, up to 64 because the screen resolution is 8x8
         if value > 0:
-            return tuple(self._p if i < value else self._n for i in range(64))
+            return self._frames.squares[0][min(64, int(math.ceil(value)))]
 
-        return tuple(self._n if i < -value else self._p for i in range(64))
+        return self._frames.squares[1][min(64, int(math.ceil(-value)))]
@@ -187,5 +187,14 @@ class TemperatureEntity(WeatherEntity):
     def entity_type(self):
         return WeatherEntityType.TEMPERATURE
 
-# Predefined weather entities tuple
-DEFAULT_WEATHER_ENTITIES = (TemperatureEntity(), HumidityEntity(), PressureEntity())
+# Predefined weather entities tuple, created on first use, so importing module does not build visual styles
+_default_weather_entities = None
+
+def default_weather_entities():
+    """Returns predefined weather entities tuple, the same one on every call."""
+    global _default_weather_entities
+
+    if _default_weather_entities is None:
+        _default_weather_entities = (TemperatureEntity(), HumidityEntity(), PressureEntity())
+
+    return _default_weather_entities
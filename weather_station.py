@@ -15,56 +15,187 @@
 ********************************************************************************************************************'''
 
 from __future__ import print_function
-from collections import deque
-from sense_hat import SenseHat, ACTION_RELEASED, DIRECTION_UP, DIRECTION_DOWN, DIRECTION_LEFT, DIRECTION_RIGHT
-from threading import Timer
-from urllib import urlencode
 
 import datetime
 import logging 
-import os
 import signal
 import sys
-import time
-import urllib2
 
+from threading import Thread
+
+from aggregation import WindowAggregator
+from clock import SystemClock
 from config import Config
-from weather_entities import DEFAULT_WEATHER_ENTITIES, CarouselContainer, WeatherEntityType
+from cpu_temperature import create_cpu_temperature_source
+from display import DisplayWriter
+from filters import ChannelFilters
+from hardware import create_sense_hat, ACTION_RELEASED, DIRECTION_UP, DIRECTION_DOWN, DIRECTION_LEFT, DIRECTION_RIGHT
+from plugins.plugin_runner import PluginRunner
+from metrics import STAGE_SECONDS
+from readings_buffer import ReadingsBuffer
+from rollups import Rollups
+from sampler import Sampler, SensorsSnapshot
+from scheduler import Scheduler
+from scroll_text import ScrollFrameCache, ScrollPlayer
+from sensors import create_sensors_backend
+from startup import StartupTimer
+from weather_entities import default_weather_entities, CarouselContainer, WeatherEntityType
 
 class WeatherStation(CarouselContainer):
     """Weather Station controlling class, setups and manages station run time."""
 
     # Constants
-    SMOOTH_READINGS_NUMBER = 3
+    RESUME_READINGS_NUMBER = 3
+    SCHEDULER_STOP_TIMEOUT = 30 # in seconds, Upload job may wait for plugins up to their deadline
+    OVERSAMPLED_CHANNELS = ('temp_c', 'humidity', 'pressure')
     READINGS_PRINT_TEMPLATE = 'Temp: %sC (%sF), Humidity: %s%%, Pressure: %s inHg'
+    AGGREGATES_PRINT_TEMPLATE = '  %s of %s readings: min %.2f, max %.2f, std %.3f'
+
+    def __init__(self, clock=None, sense_hat=None, cpu_temperature=None, sensors=None):
+        """
+        Creates station, by default for real hardware and time.
 
-    def __init__(self):
+        Clock, Sense HAT like object, CPU temperature source and sensors backend can be provided, e.g. simulated ones.
+        Provided Sense HAT like object is read through sense_hat backend, unless sensors backend is provided too.
+        """
         super(WeatherStation, self).__init__()
 
-        self._sense_hat = None
-        self._log_timer = None
-        self._upload_timer = None
-        self._update_timer = None
-        self._last_readings = None
+        # Start up is measured from station creation, until first upload is queued
+        self._startup = StartupTimer()
+        self._first_upload = True
+
+        self._clock = clock or SystemClock()
+        self._sense_hat = sense_hat
+        self._display = None
+        self._scroll_frames = None
+        self._scroll_player = None
+        self._cpu_temperature = cpu_temperature
+        self._sensors = sensors or (create_sensors_backend(sense_hat, self._clock, 'sense_hat') if sense_hat else None)
+        self._scheduler = Scheduler(self._clock)
+        self._filters = ChannelFilters(Config.FILTERS)
+
+        # Aggregation windows of oversampled readings, one per consumer interval
+        self._upload_window = None
+        self._log_window = None
+        self._readings_buffer = None
+        self._rollups = Rollups(Config.ROLLUP_TIERS) if Config.ROLLUP_TIERS else None
+        self._upload_queue = None
+        self._upload_sender = None
+        self._upload_fanout = None
+        self._rapid_fire_sink = None
+        self._metrics_server = None
+        self._api_server = None
+        self._collector_client = None
+
+        # Latest values collected from plugins, included in every snapshot
+        self._plugins_data = {}
+        self._plugin_runner = PluginRunner(Config.PLUGINS, Config.PLUGIN_WORKERS, Config.PLUGIN_DEADLINE)
+        self._sampler = Sampler(self._read_snapshot, Config.SAMPLE_HISTORY_SIZE)
 
     @property
     def carousel_items(self):
-        return DEFAULT_WEATHER_ENTITIES
+        return default_weather_entities()
 
     @property
     def current_style(self):
         return self.current_item.current_style
 
+    @property
+    def scheduler(self):
+        """Scheduler running station periodic jobs, extra jobs can be added to it."""
+        return self._scheduler
+
+    @property
+    def display_stats(self):
+        """Display write counters, shows how many LED matrix writes were avoided."""
+        return self._display.stats if self._display else {}
+
+    @property
+    def scroll_stats(self):
+        """Scroll player counters, shows how many messages were played to the end or interrupted."""
+        return self._scroll_player.stats if self._scroll_player else {}
+
+    @property
+    def latest_snapshot(self):
+        """Latest sensors snapshot, consumers should use it instead of reading sensors."""
+        return self._sampler.latest
+
+    @property
+    def rollups(self):
+        """Readings rollups tiers, None if disabled, long range consumers should use them instead of snapshots history."""
+        return self._rollups
+
+    @property
+    def startup(self):
+        """Start up timer, has phases durations and milestones of station start."""
+        return self._startup
+
     def activate_sensors(self):
-        """Activates sensors by requesting first values and assigning handlers."""
-        self._sense_hat = SenseHat()
+        """
+        Activates sensors by requesting first values and assigning handlers.
+
+        Init message scrolls in background and independent warm ups run in parallel,
+        so the first snapshot is taken as soon as sensors are ready.
+        """
+        startup = self._startup
+
+        with startup.phase('sense_hat'):
+            framebuffer = None
+
+            if not self._sense_hat:
+                self._sense_hat = create_sense_hat()
+
+                # Frames skip sense_hat per pixel conversion, if LED matrix framebuffer device is there
+                if Config.LED_FRAMEBUFFER:
+                    framebuffer = self._open_framebuffer()
+
+            self._display = DisplayWriter(self._sense_hat, framebuffer)
+            self._scroll_frames = ScrollFrameCache(self._sense_hat)
+            self._scroll_player = ScrollPlayer(self._display, Config.SCROLL_TEXT_SPEED, self._clock)
+
+            # Without player thread, frames due by virtual clock time are shown whenever player is used
+            if self._clock.realtime:
+                self._scroll_player.start()
 
-        # Scroll Init message over HAT screen
-        self._show_message('Init Sensors', (255, 255, 0), (0, 0, 255))
+        # Scroll Init message over HAT screen in background, latest sensors values are shown once it is over
+        self._play_message('Init Sensors', (255, 255, 0), (0, 0, 255), self._show_latest)
+        self._start_thread('ScrollWarmUp', self._prerender_messages)
 
         # Init sensors, to be sure first effective run uses correct sensors values
-        self._sense_hat.get_humidity()
-        self._sense_hat.get_pressure()
+        sensors_warm_up = self._start_thread('SensorsWarmUp', self._warm_up_sensors)
+        self._start_thread('UploadWarmUp', self._warm_up_upload)
+
+        with startup.phase('cpu_temperature'):
+            if not self._cpu_temperature:
+                self._cpu_temperature = create_cpu_temperature_source(Config.CPU_TEMP_SOURCE, Config.CPU_TEMP_CACHE_TTL)
+
+        # Resume history from readings buffer and persist every new snapshot there
+        if Config.HISTORY_BUFFER_PATH:
+            with startup.phase('history'):
+                self._readings_buffer = ReadingsBuffer(
+                    Config.HISTORY_BUFFER_PATH, Config.HISTORY_BUFFER_SIZE, Config.HISTORY_PLUGIN_FIELDS)
+                self._resume_history()
+                self._sampler.subscribe(self._readings_buffer.append)
+
+        # Push every new snapshot to collector shared by many stations
+        if Config.COLLECTOR_HOST:
+            with startup.phase('collector'):
+                # Imported here, so collector networking modules are loaded only if it is configured
+                from collector import CollectorClient
+
+                self._collector_client = CollectorClient(
+                    Config.COLLECTOR_HOST, Config.COLLECTOR_PORT, Config.STATION_ID, Config.COLLECTOR_PROTOCOL)
+                self._sampler.subscribe(self._collector_client.push)
+
+        # Roll every new snapshot up into tiers, sensors and plugins values alike
+        if self._rollups:
+            self._sampler.subscribe(self._rollups.add_snapshot)
+
+        sensors_warm_up.join()
+
+        # Take first snapshot, so consumers have data before sampling loop starts
+        with startup.phase('first_sample'):
+            self._sampler.sample()
 
         # Setup Sense Hat stick
         self._sense_hat.stick.direction_up = self._change_weather_entity
@@ -73,29 +204,144 @@ class WeatherStation(CarouselContainer):
         self._sense_hat.stick.direction_right = self._change_weather_entity
     
     def start_station(self):
-        """Launches multiple threads to handle configured behavior."""
-        if Config.LOG_TO_CONSOLE and Config.LOG_INTERVAL:
-            self._log_results(first_time=True)
+        """Schedules periodic jobs to handle configured behavior and launches scheduler thread."""
+        self._schedule_jobs()
+        self._scheduler.start()
+        self._startup.mark('scheduler_started')
+
+        if Config.METRICS_PORT:
+            from metrics_server import MetricsServer
+            self._metrics_server = MetricsServer(Config.METRICS_HOST, Config.METRICS_PORT)
+            self._metrics_server.start()
+
+        # API serves snapshots sampled by scheduler, its cached responses are dropped on every new one
+        if Config.API_PORT:
+            from http_api import ApiServer
+            self._api_server = ApiServer(Config.API_HOST, Config.API_PORT, self._sampler, self._rollups,
+                Config.API_MAX_CLIENTS, Config.API_CORS_ORIGIN)
+            self._api_server.start()
+            self._sampler.subscribe(self._api_server.api.invalidate)
+
+    def run_station(self, duration):
+        """Schedules periodic jobs and runs them in calling thread for duration seconds of station clock."""
+        self._schedule_jobs()
+        self._scheduler.run(duration)
+
+    def _schedule_jobs(self):
+        """Internal. Schedules periodic jobs to handle configured behavior."""
+        with self._startup.phase('schedule'):
+            self._add_jobs()
+
+    def _add_jobs(self):
+        """Internal. Creates consumers and adds scheduler job for each of them."""
+
+        # Sampling jobs are added first, so they run before consumers on the same interval boundary
+        if Config.OVERSAMPLE_INTERVAL:
+            self._upload_window = WindowAggregator(self.OVERSAMPLED_CHANNELS)
+            self._log_window = WindowAggregator(self.OVERSAMPLED_CHANNELS)
+            self._scheduler.add_job('Oversample', Config.OVERSAMPLE_INTERVAL, self._oversample)
+
+        self._scheduler.add_job('Sample', Config.SAMPLE_INTERVAL, self._sampler.sample)
 
-        if Config.WEATHER_UPLOAD and Config.UPLOAD_INTERVAL:
-            self._upload_results(first_time=True)
+        if Config.LOG_TO_CONSOLE and Config.LOG_INTERVAL:
+            self._scheduler.add_job('Log', Config.LOG_INTERVAL, self._log_results)
+
+        if Config.UPLOAD_INTERVAL and (Config.WEATHER_UPLOAD or Config.UPLOAD_SINKS):
+            # Imported here, so upload networking modules are loaded only if uploads are enabled
+            from upload_queue import UploadQueue, UploadSender
+            from upload_sinks import UploadFanout, WeatherUndergroundSink
+
+            sinks = list(Config.UPLOAD_SINKS)
+
+            if Config.WEATHER_UPLOAD:
+                self._upload_queue = UploadQueue(Config.UPLOAD_QUEUE_PATH)
+                self._upload_sender = UploadSender(
+                    self._upload_queue, Config.WU_URL, Config.STATION_ID, Config.STATION_KEY,
+                    Config.UPLOAD_QUEUE_RATE, Config.UPLOAD_RETRY_INTERVAL)
+                self._upload_sender.start()
+                sinks.insert(0, WeatherUndergroundSink(self._upload_queue, self._upload_sender, self.build_weather_data))
+
+            self._upload_fanout = UploadFanout(sinks)
+            self._upload_fanout.start()
+
+            # Plugins are collected in background, so waiting for them does not stall sampling and other jobs,
+            # uploads take the latest collected values. Virtual clock can not be waited on by another thread,
+            # so with it plugins are collected by Upload job itself
+            if Config.PLUGINS and self._clock.realtime:
+                self._plugin_runner.start(Config.UPLOAD_INTERVAL, self._update_plugins_data)
+            # The first upload is queued right away, rather than a whole upload interval after start
+            self._scheduler.add_job('Upload', Config.UPLOAD_INTERVAL, self._upload_results, run_now=True)
+
+        # RapidFire gets every snapshot right after it is sampled
+        if Config.WEATHER_UPLOAD and Config.WU_RAPIDFIRE:
+            from upload_sinks import WeatherUndergroundRapidFireSink
+
+            self._rapid_fire_sink = WeatherUndergroundRapidFireSink(
+                Config.WU_RAPIDFIRE_URL, Config.STATION_ID, Config.STATION_KEY, self.build_weather_data, Config.SAMPLE_INTERVAL)
+            self._rapid_fire_sink.start()
+            self._sampler.subscribe(self._rapid_fire_sink.put)
 
         if Config.UPDATE_DISPLAY and Config.UPDATE_INTERVAL:
-            self._update_display()
+            self._scheduler.add_job('Display', Config.UPDATE_INTERVAL, self._update_display, run_now=True)
 
     def stop_station(self):
         """Tries to stop active threads and clean up screen."""
-        if self._sense_hat:
-            self._sense_hat.clear()
+        self._scheduler.stop()
+        self._plugin_runner.stop()
+
+        # Jobs use display, sensors and readings buffer, so they are closed only after running job returns
+        if not self._scheduler.join(self.SCHEDULER_STOP_TIMEOUT):
+            logging.warning('Scheduler did not stop in %s seconds', self.SCHEDULER_STOP_TIMEOUT)
+
+        if self._metrics_server:
+            self._metrics_server.stop()
+
+        if self._api_server:
+            self._api_server.stop()
+
+        if self._scroll_player:
+            self._scroll_player.stop()
+
+        if self._display:
+            self._display.clear()
+            self._display.close()
 
-        if self._log_timer:
-            self._log_timer.cancel()
+        if self._cpu_temperature:
+            self._cpu_temperature.close()
 
-        if self._upload_timer:
-            self._upload_timer.cancel()
+        if self._sensors:
+            self._sensors.close()
 
-        if self._update_timer:
-            self._update_timer.cancel()
+        if self._readings_buffer:
+            self._readings_buffer.close()
+
+        if self._collector_client:
+            self._collector_client.close()
+
+        if self._rapid_fire_sink:
+            self._rapid_fire_sink.stop()
+            self._rapid_fire_sink.join(self._rapid_fire_sink.REQUEST_TIMEOUT)
+            print('RapidFire: %s' % self._rapid_fire_sink.stats)
+
+        # Let sinks send what is queued, then try to send pending observations, what is left will be sent on next start
+        if self._upload_fanout:
+            self._upload_fanout.stop(Config.UPLOAD_FLUSH_TIMEOUT)
+
+        if self._upload_sender:
+            self._upload_sender.stop()
+            pending = self._upload_sender.flush(Config.UPLOAD_FLUSH_TIMEOUT)
+
+            if pending:
+                logging.warning('%s observations left in upload queue', pending)
+
+        if self._upload_queue:
+            self._upload_queue.close()
+
+        for plugin in Config.PLUGINS:
+            try:
+                plugin.close()
+            except:
+                logging.warning('Could not close %s', plugin.plugin_name, exc_info=True)
 
     @staticmethod
     def to_fahrenheit(value):
@@ -110,7 +356,7 @@ class WeatherStation(CarouselContainer):
         """
         return temp - (100 - hum) / 5
 
-    def get_temperature(self):
+    def get_temperature(self, cpu_temp=None, reading=None):
         """
         Gets temperature and adjusts it with environmental impacts (like cpu temperature).
                 
@@ -120,17 +366,28 @@ class WeatherStation(CarouselContainer):
         We need to take CPU temp into account. The Pi foundation recommendeds using the following:
         http://yaab-arduino.blogspot.co.uk/2016/08/accurate-temperature-reading-sensehat.html        
         """
+        cpu_temp, avg_temp, adj_temp = self._read_temperatures(cpu_temp, reading)
+
+        print('\033[92mCPU temp: %s, Avg temp: %s, Adj temp: %s\033[0m' % (cpu_temp, avg_temp, adj_temp))
         
-        # Get temp readings from both sensors
-        humidity_temp = self._sense_hat.get_temperature_from_humidity()
-        pressure_temp = self._sense_hat.get_temperature_from_pressure()
+        # Smooth out value with configured temperature filter
+        return self._filters.update('temperature', adj_temp)
+
+    def _read_temperatures(self, cpu_temp=None, reading=None):
+        """Internal. Reads sensors temperature and compensates CPU heating, returns CPU, average and adjusted temperatures."""
+
+        # Get temp readings from both sensors, unless they were already read by caller
+        reading = reading or self._sensors.read()
+        humidity_temp = reading.temp_from_humidity
+        pressure_temp = reading.temp_from_pressure
         
         # avg_temp becomes the average of the temperatures from both sensors
         # We need to check for pressure_temp value is not 0, to not ruin avg_temp calculation
         avg_temp = (humidity_temp + pressure_temp) / 2 if pressure_temp else humidity_temp
         
-        # Get the CPU temperature
-        cpu_temp = self._get_cpu_temp()
+        # Get the CPU temperature, unless it was already read by caller
+        if cpu_temp is None:
+            cpu_temp = self._get_cpu_temp()
         
         # Calculate temperature compensation for CPU heating
         # Depending on Raspberry Pi model (2, 3 etc.) and case you may try different formulas
@@ -141,70 +398,187 @@ class WeatherStation(CarouselContainer):
         # However I found this one more efficient and used it for Raspberry Pi 2 and Zebra case:
         adj_temp = avg_temp - (cpu_temp - avg_temp) / 0.69
 
-        print('\033[92mCPU temp: %s, Avg temp: %s, Adj temp: %s\033[0m' % (cpu_temp, avg_temp, adj_temp))
-        
-        # Average out value across the last three readings
-        return self._get_smooth(adj_temp)
+        return (cpu_temp, avg_temp, adj_temp)
 
-    def get_humidity(self):
+    def get_humidity(self, reading=None):
         """Gets humidity sensor value."""
-        return self._sense_hat.get_humidity()
+        return (reading or self._sensors.read()).humidity
 
-    def get_pressure(self):
+    def get_pressure(self, reading=None):
         """Gets humidity sensor value and converts pressure from millibars to inHg before posting."""
-        return self._sense_hat.get_pressure() * 0.0295300
+        return (reading or self._sensors.read()).pressure * 0.0295300
     
-    def get_sensors_data(self):
-        """Returns sensors data tuple."""
-
-        temp_in_celsius = self.get_temperature()
+    def get_sensors_data(self, cpu_temp=None, reading=None):
+        """Returns sensors data tuple, all values are from one sensors reading."""
+        reading = reading or self._sensors.read()
+        temp_in_celsius = self.get_temperature(cpu_temp, reading)
 
         return (
             round(temp_in_celsius, 1), 
             round(self.to_fahrenheit(temp_in_celsius), 1), 
-            round(self.get_humidity(), 0), 
-            round(self.get_pressure(), 1)
-        )    
+            round(self._filters.update('humidity', self.get_humidity(reading)), 0), 
+            round(self._filters.update('pressure', self.get_pressure(reading)), 1)
+        )
+
+    def build_weather_data(self, snapshot):
+        """
+        Builds a weather data object for snapshot http://wiki.wunderground.com/index.php/PWS_-_Upload_Protocol
+
+        Action, credentials and dateutc are added by upload sender.
+        """
+        sensors_data = snapshot.sensors_data
+
+        return {
+            'tempf': sensors_data[1],
+            'humidity': sensors_data[2],
+            'baromin': sensors_data[3],
+            'dewptf': self.to_fahrenheit(self.calculate_dew_point(sensors_data[0], sensors_data[2]))
+        }
+
+    def _read_snapshot(self):
+        """Internal. Reads sensors and returns immutable timestamped snapshot, used by sampler only."""
+        with STAGE_SECONDS.time(stage='cpu_temperature'):
+            cpu_temp = self._get_cpu_temp()
+
+        with STAGE_SECONDS.time(stage='sensors'):
+            reading = self._sensors.read()
+
+        sensors_data = self.get_sensors_data(cpu_temp, reading)
+
+        return SensorsSnapshot(reading.timestamp, *(sensors_data + (cpu_temp, self._plugins_data)))
+
+    def _resume_history(self):
+        """Internal. Restores recent snapshots, plugins data and filters state from readings buffer."""
+        records = tuple(self._readings_buffer.records(last=Config.SAMPLE_HISTORY_SIZE))
+
+        if not records:
+            return
+
+        self._sampler.seed(SensorsSnapshot(*record[1:]) for record in records)
+        self._plugins_data = records[-1].plugins_data
+
+        # Filters state is restored only if the last readings are fresh enough to continue with
+        recent = records[-self.RESUME_READINGS_NUMBER:]
+
+        if self._clock.time() - recent[-1].timestamp < Config.SAMPLE_INTERVAL * self.RESUME_READINGS_NUMBER:
+            self._filters.seed({
+                'temperature': [record.temp_c for record in recent],
+                'humidity': [record.humidity for record in recent],
+                'pressure': [record.pressure for record in recent]
+            })
 
     def _change_weather_entity(self, event):
         """Internal. Switches to next/previous weather entity or next/previous visual style."""
         
         # We need to handle release event state
         if event.action == ACTION_RELEASED:
-            self._sense_hat.clear()
-
+            # Entity message scrolls in background and interrupts the one being scrolled, if any
             if event.direction == DIRECTION_UP:
                 next_entity = self.next_item
-                self._show_message(next_entity.entity_messsage, next_entity.positive_color)
-            elif event.direction == DIRECTION_DOWN:
+                self._play_message(next_entity.entity_messsage, next_entity.positive_color, on_finished=self._update_display)
+                return
+
+            if event.direction == DIRECTION_DOWN:
                 previous_entity = self.previous_item
-                self._show_message(previous_entity.entity_messsage, previous_entity.positive_color)
-            elif event.direction == DIRECTION_LEFT:
+                self._play_message(previous_entity.entity_messsage, previous_entity.positive_color, on_finished=self._update_display)
+                return
+
+            if event.direction == DIRECTION_LEFT:
                 self.current_item.previous_item
             else:
                 self.current_item.next_item
 
-            self._update_display(loop=False)
+            # Style is shown at once, so message being scrolled is interrupted
+            self._scroll_player.cancel()
+            self._display.clear()
+            self._update_display()
+
+    def _open_framebuffer(self):
+        """Internal. Returns memory mapped LED matrix framebuffer, None if it is not found or can not be opened."""
+        # Imported here, so mmap is loaded only for real Sense HAT
+        from framebuffer import open_led_framebuffer
 
-    def _show_message(self, message, message_color, background_color=(0, 0, 0)):
-        """Internal. Shows message by scrolling it over HAT screen."""
+        try:
+            return open_led_framebuffer()
+        except (IOError, OSError):
+            logging.warning('Could not open LED matrix framebuffer, sense_hat library is used', exc_info=True)
+            return None
+
+    def _start_thread(self, name, target):
+        """Internal. Starts daemon thread running target, returns the thread."""
+        thread = Thread(target=target, name=name)
+        thread.daemon = True
+        thread.start()
+
+        return thread
+
+    def _show_latest(self):
+        """Internal. Shows latest sensors values after Init message, if display is updated and there are values."""
+        if Config.UPDATE_DISPLAY and self.latest_snapshot:
+            self._update_display()
 
-        # Need to be sure we revert any changes to rotation
+    def _prerender_messages(self):
+        """Internal. Renders entity messages scroll frames in background, so joystick events get them from cache."""
+        if self._scroll_frames.supported:
+            self._scroll_frames.prerender(
+                (entity.entity_messsage, entity.positive_color, (0, 0, 0)) for entity in self.carousel_items)
+
+    def _warm_up_sensors(self):
+        """Internal. Requests first humidity and pressure values, first sensors readings are often invalid."""
+        with self._startup.phase('sensors_warm_up'):
+            if not self._sensors:
+                self._sensors = create_sensors_backend(self._sense_hat, self._clock, Config.SENSORS_BACKEND)
+
+            self._sensors.read()
+
+    def _warm_up_upload(self):
+        """Internal. Loads upload modules in background, while main thread waits for sensors."""
+        if Config.UPLOAD_INTERVAL and Config.WEATHER_UPLOAD:
+            with self._startup.phase('upload_warm_up'):
+                import upload_sinks
+
+    def _play_message(self, message, message_color, background_color=(0, 0, 0), on_finished=None):
+        """
+        Internal. Starts scrolling message over HAT screen and returns, on_finished is called once it is over.
+
+        Display updates are skipped while message scrolls, new message or style change interrupts it.
+        """
+        if self._scroll_frames.supported:
+            self._scroll_player.play(self._scroll_frames.frames(message, message_color, background_color), on_finished=on_finished)
+            return
+
+        # Sense HAT like object without glyphs can only scroll message blocking, need to revert any changes to rotation
         self._sense_hat.rotation = 0
         self._sense_hat.show_message(message, Config.SCROLL_TEXT_SPEED, message_color, background_color)
-    
-    def _log_results(self, first_time=False):
-        """Internal. Continuously logs sensors values."""
 
-        if not first_time:
-            print(self.READINGS_PRINT_TEMPLATE % self.get_sensors_data())
+        # Message was drawn bypassing display writer, so next frame should be written in full
+        self._display.invalidate()
+
+        if on_finished:
+            on_finished()
+
+    def _log_results(self):
+        """Internal. Logs latest sensors values, called by scheduler."""
+
+        snapshot = self.latest_snapshot
+
+        if snapshot and self._log_window:
+            snapshot = self._aggregate_snapshot(snapshot, self._log_window)
+
+        if snapshot:
+            print(self.READINGS_PRINT_TEMPLATE % snapshot.sensors_data)
+
+            for channel, stats in sorted((snapshot.aggregates or {}).items()):
+                print(self.AGGREGATES_PRINT_TEMPLATE % (channel, stats['count'], stats['min'], stats['max'], stats['std']))
 
-        self._log_timer = self._start_timer(Config.LOG_INTERVAL, self._log_results)
+    def _update_display(self):
+        """Internal. Updates screen with latest sensors values, called by scheduler and on joystick events."""
 
-    def _update_display(self, loop=True):
-        """Internal. Continuously updates screen with new sensors values."""
+        # Message is still scrolling, screen is updated once it is over
+        if self._scroll_player.playing:
+            return
 
-        sensors_data = self.get_sensors_data()
+        sensors_data = self.latest_snapshot.sensors_data
 
         if self.current_item.entity_type is WeatherEntityType.TEMPERATURE:
             pixels = self.current_item.show_pixels(sensors_data[0])
@@ -213,91 +587,101 @@ class WeatherStation(CarouselContainer):
         else:
             pixels = self.current_item.show_pixels(sensors_data[3])
 
-        self._sense_hat.set_rotation(self.current_style.rotation)
-        self._sense_hat.set_pixels(pixels)
-
-        if loop:
-            self._update_timer = self._start_timer(Config.UPDATE_INTERVAL, self._update_display)
-
-    def _upload_results(self, first_time=False):
-        """Internal. Continuously uploads new sensors values to Weather Underground."""
-
-        if not first_time:
-            print('Uploading data to Weather Underground')
-            sensors_data = self.get_sensors_data()
-
-            # Build a weather data object http://wiki.wunderground.com/index.php/PWS_-_Upload_Protocol
-            weather_data = {
-                'action': 'updateraw',
-                'ID': Config.STATION_ID,
-                'PASSWORD': Config.STATION_KEY,
-                'dateutc': 'now',
-                'tempf': sensors_data[1],
-                'humidity': sensors_data[2],
-                'baromin': sensors_data[3],
-                'dewptf': self.to_fahrenheit(self.calculate_dew_point(sensors_data[0], sensors_data[2]))
-            }
-
-            for plugin in Config.PLUGINS:
-                try:
-                    data = plugin.get_data()
-
-                    for error in plugin.errors:
-                        logging.warning('%s got an error: %s', plugin.plugin_name, error.message)
-
-                    if data:
-                         print('\033[94m%s got data: %s\033[0m' % (plugin.plugin_name, data))
-                         weather_data.update(data)
-                    else:
-                        print('\033[94m%s has no data\033[0m' % plugin.plugin_name)
-                        logging.warning('%s has no data', plugin.plugin_name)
-                except:
-                    logging.warning('Unexpected error occured in %s', plugin.plugin_name, exc_info=True)
+        self._display.write(pixels, self.current_style.rotation)
 
-            try:
-                upload_url = Config.WU_URL + '?' + urlencode(weather_data)
-                response = urllib2.urlopen(upload_url)
-                html = response.read()
-                print('Server response: ', html)
-                
-                # Close response object
-                response.close()
-            except:
-                print('Could not upload to Weather Underground')
-                logging.warning('Could not upload to Weather Underground\r\nWeather Data: %s\r\nUpload URL: %s', weather_data, upload_url, exc_info=True)
+    def _upload_results(self):
+        """Internal. Fans out latest sensors and plugins values to all upload sinks, called by scheduler."""
 
-        self._upload_timer = self._start_timer(Config.UPLOAD_INTERVAL, self._upload_results)
+        snapshot = self.latest_snapshot
 
-    def _start_timer(self, interval, callback):
-        """Internal. Starts timer with given interval and callback function."""
-        
-        timer = Timer(interval, callback)
-        timer.daemon = True
-        timer.start()
+        if snapshot and self._upload_window:
+            snapshot = self._aggregate_snapshot(snapshot, self._upload_window)
 
-        return timer
+        if snapshot:
+            print('Queueing data for upload sinks')
 
-    def _get_cpu_temp(self):
-        """"
-        Internal.
-        Executes a command at the OS to pull in the CPU temperature.
-        Thanks to https://www.raspberrypi.org/forums/viewtopic.php?f=104&t=111457
-        """
-        
-        res = os.popen('vcgencmd measure_temp').readline()
-        return float(res.replace('temp=', '').replace("'C\n", ''))
+            if Config.PLUGINS and not self._plugin_runner.running:
+                self._update_plugins_data(self._plugin_runner.collect())
 
-    def _get_smooth(self, value):
-        """Moving average to smooth reading."""
-        
-        # We use deque here as it is more efficient for in/out behaviour than regular list/tuple
-        if not self._last_readings:
-            self._last_readings = deque((value, ) * self.SMOOTH_READINGS_NUMBER, self.SMOOTH_READINGS_NUMBER)
-        else:
-            self._last_readings.appendleft(value)
-            
-        # Average last temperature readings
-        return sum(self._last_readings) / self.SMOOTH_READINGS_NUMBER
+            # Values collected last, the first upload after start has resumed ones if any, as collection is still running
+            plugins_data = self._plugins_data
+
+            # Sinks only queue snapshot, so a slow sink does not delay the others or the scheduler
+            self._upload_fanout.put(snapshot._replace(plugins_data=plugins_data))
+
+            if self._first_upload:
+                self._first_upload = False
+                self._report_startup()
+
+    def _report_startup(self):
+        """Internal. Prints and logs start up phases, once the first upload is queued."""
+        self._startup.mark('first_upload')
+        report = self._startup.report()
+
+        # Logged as warning, as station log level is WARNING, so report of every start gets to error log
+        print(report)
+        logging.warning(report)
+
+    def _update_plugins_data(self, result):
+        """Internal. Reports plugins collection result and keeps its data for snapshots and uploads."""
+        plugins_data = {}
+
+        for plugin in Config.PLUGINS:
+            for error in plugin.errors:
+                logging.warning('%s got an error: %s', plugin.plugin_name, error.message)
+
+        for plugin, data in result.data.items():
+            if data:
+                 print('\033[94m%s got data: %s\033[0m' % (plugin.plugin_name, data))
+                 plugins_data.update(data)
+            else:
+                print('\033[94m%s has no data\033[0m' % plugin.plugin_name)
+                logging.warning('%s has no data', plugin.plugin_name)
+
+        for plugin in result.late:
+            print('\033[94m%s did not return data in time\033[0m' % plugin.plugin_name)
+            logging.warning('%s did not return data in %s seconds', plugin.plugin_name, self._plugin_runner.deadline(plugin))
+
+        for plugin, exc_info in result.failed.items():
+            logging.warning('Unexpected error occured in %s', plugin.plugin_name, exc_info=exc_info)
+
+        # Plugins values are filtered here, so every consumer gets them already smoothed. New dictionary
+        # is assigned, so snapshots already taken keep their own plugins data
+        self._plugins_data = self._filters.update_values(plugins_data)
+
+    def _oversample(self):
+        """Internal. Adds unfiltered sensors readings to consumers aggregation windows, called by scheduler."""
+        with STAGE_SECONDS.time(stage='oversample'):
+            reading = self._sensors.read()
+
+        readings = {
+            'temp_c': self._read_temperatures(reading=reading)[2],
+            'humidity': self.get_humidity(reading),
+            'pressure': self.get_pressure(reading)
+        }
+
+        self._upload_window.add(readings)
+        self._log_window.add(readings)
+
+    def _aggregate_snapshot(self, snapshot, window):
+        """Internal. Closes aggregation window, returns snapshot with sensors values replaced by window means."""
+        stats = window.collect()
+
+        if not stats:
+            return snapshot
+
+        temp_in_celsius = stats['temp_c'].mean
+
+        return snapshot._replace(
+            temp_c=round(temp_in_celsius, 1),
+            temp_f=round(self.to_fahrenheit(temp_in_celsius), 1),
+            humidity=round(stats['humidity'].mean, 0),
+            pressure=round(stats['pressure'].mean, 1),
+            aggregates=dict((channel, channel_stats._asdict()) for channel, channel_stats in stats.items()))
+
+    def _get_cpu_temp(self):
+        """Internal. Gets CPU temperature from configured source (sysfs thermal zone or vcgencmd)."""
+        return self._cpu_temperature.read()
 
 
 # Check prerequisites and launch Weather Station
@@ -326,6 +710,9 @@ if __name__ == '__main__':
     print('Successfully read Weather Underground configuration values')
     print('Station ID: ', Config.STATION_ID)
 
+    if Config.WU_RAPIDFIRE:
+        print('RapidFire real time upload every %s seconds' % Config.SAMPLE_INTERVAL)
+
     def _terminate_application(signal=None, frame=None):
         """Nested. Internal. Tries to terminate weather station and make a clean up."""
 
@@ -345,7 +732,7 @@ if __name__ == '__main__':
 
         station.activate_sensors()
         print('Successfully initialized sensors')
-        print(station.READINGS_PRINT_TEMPLATE % station.get_sensors_data())
+        print(station.READINGS_PRINT_TEMPLATE % station.latest_snapshot.sensors_data)
 
         station.start_station()
         print('Weather Station successfully launched')